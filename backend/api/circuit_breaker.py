@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from config import Config
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker over a sliding window of recent call outcomes
+
+    The breaker opens once at least ``min_calls`` of the last ``window`` calls
+    were made and the failure rate reaches ``failure_rate``. While open no
+    request reaches the upstream; a background thread waits ``open_seconds``,
+    moves to half-open and runs ``probe()``. A successful probe closes the
+    breaker, a failed one re-opens it.
+    """
+
+    def __init__(self, name, probe=None, window=None, failure_rate=None, min_calls=None, open_seconds=None):
+        self.name = name
+        self.probe = probe
+        self.window = window or Config.BREAKER_WINDOW
+        self.failure_rate = failure_rate or Config.BREAKER_FAILURE_RATE
+        self.min_calls = min_calls or Config.BREAKER_MIN_CALLS
+        self.open_seconds = open_seconds or Config.BREAKER_OPEN_SECONDS
+
+        self._outcomes = deque(maxlen=self.window)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = None
+
+    def allow_request(self):
+        """Whether a regular request may call the upstream (only when closed)"""
+        return self.state == CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+            if self.state != CLOSED or len(self._outcomes) < self.min_calls:
+                return
+            failures, calls = self._outcomes.count(False), len(self._outcomes)
+            if failures / calls < self.failure_rate:
+                return
+            self._open()
+
+        print(f"Circuit breaker '{self.name}' opened after {failures}/{calls} failed calls")
+        threading.Thread(target=self._probe_loop, daemon=True, name=f'breaker-{self.name}').start()
+
+    def _open(self):
+        """Switch to open (caller holds the lock)"""
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._outcomes.clear()
+
+    def _probe_loop(self):
+        """Background half-open probing until the upstream answers again"""
+        while True:
+            time.sleep(self.open_seconds)
+            with self._lock:
+                self.state = HALF_OPEN
+
+            try:
+                healthy = bool(self.probe()) if self.probe else True
+            except Exception as e:
+                print(f"Circuit breaker '{self.name}' probe failed: {e}")
+                healthy = False
+
+            with self._lock:
+                if healthy:
+                    self.state = CLOSED
+                    self.opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._open()
+            if healthy:
+                print(f"Circuit breaker '{self.name}' closed")
+                return
+
+    def status(self):
+        """State and recent failure rate for monitoring"""
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                'state': self.state,
+                'recent_calls': calls,
+                'failure_rate': round(self._outcomes.count(False) / calls, 3) if calls else 0.0,
+                'opened_at': datetime.fromtimestamp(self.opened_at).isoformat() if self.opened_at else None
+            }
+
+
+class GuardedSource:
+    """
+    Circuit breaker plus last-good-value cache for one upstream source
+
+    ``fetch`` callables return a standardized result dict, or None on failure;
+    ``probe`` fetches ``probe_key`` the same way while the breaker is half-open.
+    Failures and open-breaker calls are answered with the last good result for
+    the same key, flagged ``stale``; ``fallback()`` (mock data) is only used
+    when nothing real has been fetched yet. With a ``shared`` cache
+    (SharedUpstreamCache) one worker process fetches per interval and the
+    others reuse its published result, including the last good one.
+    """
+
+    def __init__(self, name, fallback, probe=None, probe_key=None, shared=None):
+        self.name = name
+        self.fallback = fallback
+        self.probe = probe
+        self.probe_key = probe_key
+        self.shared = shared
+        self.breaker = CircuitBreaker(name, probe=self._run_probe if probe else None)
+        self._last_good = {}
+
+    def _run_probe(self):
+        """Half-open probe; a successful result also refreshes the probed key"""
+        if self.shared:
+            # A result another worker just fetched is as good a probe as our own
+            result, _ = self.shared.fetch(self.name, self.probe_key, self.probe)
+        else:
+            result = self.probe()
+        if result is None:
+            return False
+        self._last_good[self.probe_key] = (time.time(), result)
+        return True
+
+    @staticmethod
+    def key(lat, lon):
+        return round(lat, 4), round(lon, 4)
+
+    def call(self, key, fetch):
+        """Run ``fetch()`` through the breaker"""
+        if not self.breaker.allow_request():
+            return self.last_good(key)
+        if self.shared:
+            return self.complete(key, *self.shared.fetch(self.name, key, fetch))
+        return self.complete(key, fetch())
+
+    async def call_async(self, key, fetch):
+        """Await ``fetch()`` through the breaker"""
+        if not self.breaker.allow_request():
+            return self.last_good(key)
+        if self.shared:
+            return self.complete(key, *await self.shared.fetch_async(self.name, key, fetch))
+        return self.complete(key, await fetch())
+
+    def complete(self, key, result, fetched=True):
+        """
+        Record a fetch outcome and return what should be served; results this
+        process did not fetch itself (shared by another worker) leave the breaker alone
+        """
+        if result is None:
+            if fetched:
+                self.breaker.record_failure()
+            return self.last_good(key)
+        if fetched:
+            self.breaker.record_success()
+        self._last_good[key] = (time.time(), result)
+        return result
+
+    def last_good(self, key):
+        """Last real result for the key flagged as stale, or the fallback if there is none"""
+        entry = self._last_good.get(key)
+        if self.shared:
+            # Another worker may hold a newer good result than this process
+            shared_entry = self.shared.last_good(self.name, key)
+            if shared_entry and (entry is None or shared_entry[0] > entry[0]):
+                entry = shared_entry
+        if entry is None:
+            return self.fallback()
+        fetched_at, result = entry
+        return {
+            **result,
+            'stale': True,
+            'fetched_at': datetime.fromtimestamp(fetched_at).isoformat(),
+            'age_seconds': round(time.time() - fetched_at, 1)
+        }
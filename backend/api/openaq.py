@@ -1,7 +1,13 @@
 import requests
-import pandas as pd
+import time
 from datetime import datetime, timedelta
 from config import Config
+from api.circuit_breaker import GuardedSource
+from api.upstream_share import SharedUpstreamCache
+from utils import metrics
+
+# Parameters kept from OpenAQ results
+POLLUTANTS = ['pm25', 'pm10', 'no2', 'o3', 'so2', 'co']
 
 class OpenAQAPI:
     """
@@ -9,50 +15,168 @@ class OpenAQAPI:
     """
     
     def __init__(self):
-        self.base_url = "https://api.openaq.org/v2"
+        self.base_url = Config.OPENAQ_API_URL
         self.api_key = Config.OPENAQ_API_KEY
         self.headers = {
             'X-API-Key': self.api_key,
             'Content-Type': 'application/json'
         }
+        default = (Config.GOA_COORDINATES['latitude'], Config.GOA_COORDINATES['longitude'])
+        self.guard = GuardedSource(
+            'openaq', self._get_mock_data,
+            probe=lambda: self._fetch_latest(*default, 50000),
+            probe_key=GuardedSource.key(*default),
+            shared=SharedUpstreamCache()
+        )
     
     def get_latest_measurements(self, lat=Config.GOA_COORDINATES['latitude'],
                               lon=Config.GOA_COORDINATES['longitude'],
                               radius=50000):  # 50km radius
         """
         Get latest air quality measurements near Goa
+        Goes through the OpenAQ circuit breaker: when the API fails or the breaker is
+        open, the last good reading for these coordinates is returned flagged ``stale``
+        """
+        return self.guard.call(
+            self.guard.key(lat, lon),
+            lambda: self._fetch_latest(lat, lon, radius)
+        )
+    
+    async def get_latest_measurements_async(self, client, lat=Config.GOA_COORDINATES['latitude'],
+                                            lon=Config.GOA_COORDINATES['longitude'],
+                                            radius=50000):
         """
+        get_latest_measurements on an httpx.AsyncClient (no thread waits on the upstream)
+        """
+        return await self.guard.call_async(
+            self.guard.key(lat, lon),
+            lambda: self._fetch_latest_async(client, lat, lon, radius)
+        )
+    
+    def _fetch_latest(self, lat, lon, radius):
+        """One /latest request; None if it failed"""
+        started = time.perf_counter()
         try:
-            params = {
-                'coordinates': f'{lat},{lon}',
-                'radius': radius,
-                'order_by': 'datetime',
-                'sort': 'desc',
-                'limit': 100
-            }
-            
             response = requests.get(
                 f"{self.base_url}/latest",
                 headers=self.headers,
-                params=params,
+                params=self._latest_params(lat, lon, radius),
                 timeout=10
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                processed_data = self._process_measurements(data['results'])
-                return {
-                    'status': 'success',
-                    'data': processed_data,
-                    'source': 'OpenAQ'
-                }
-            else:
-                # Return mock data if API fails
-                return self._get_mock_data()
+            result = self._latest_result(response)
+            metrics.record_upstream('openaq', started, 'success' if result else 'error')
+            return result
+                
+        except Exception as e:
+            metrics.record_upstream('openaq', started, metrics.failure_outcome(e))
+            print(f"Error fetching OpenAQ data: {e}")
+            return None
+    
+    async def _fetch_latest_async(self, client, lat, lon, radius):
+        """_fetch_latest on an httpx.AsyncClient"""
+        started = time.perf_counter()
+        try:
+            response = await client.get(
+                f"{self.base_url}/latest",
+                headers=self.headers,
+                params=self._latest_params(lat, lon, radius),
+                timeout=10
+            )
+            result = self._latest_result(response)
+            metrics.record_upstream('openaq', started, 'success' if result else 'error')
+            return result
                 
         except Exception as e:
+            metrics.record_upstream('openaq', started, metrics.failure_outcome(e))
             print(f"Error fetching OpenAQ data: {e}")
-            return self._get_mock_data()
+            return None
+    
+    @staticmethod
+    def _latest_params(lat, lon, radius):
+        """Query parameters of a /latest request"""
+        return {
+            'coordinates': f'{lat},{lon}',
+            'radius': radius,
+            'order_by': 'datetime',
+            'sort': 'desc',
+            'limit': 100
+        }
+    
+    def _latest_result(self, response):
+        """Standardized result from a /latest response (requests or httpx), None on error status"""
+        if response.status_code == 200:
+            data = response.json()
+            processed_data = self._process_measurements(data['results'])
+            return {
+                'status': 'success',
+                'data': processed_data,
+                'source': 'OpenAQ'
+            }
+        else:
+            print(f"OpenAQ returned HTTP {response.status_code}")
+            return None
+    
+    def get_measurements(self, lat, lon, date_from, date_to, radius=50000, page_size=10000, throttle=None):
+        """
+        Hourly mean of every station's measurements near a point over [date_from, date_to)
+        Returns {hour (local time, ISO): {pollutant: value}}, or None if a request failed.
+        Pages through /measurements; throttle is called before each request.
+        """
+        hourly = {}
+        page = 1
+        try:
+            while True:
+                if throttle:
+                    throttle()
+                response = requests.get(
+                    f"{self.base_url}/measurements",
+                    headers=self.headers,
+                    params={
+                        'coordinates': f'{lat},{lon}',
+                        'radius': radius,
+                        'date_from': date_from.isoformat(),
+                        'date_to': date_to.isoformat(),
+                        'limit': page_size,
+                        'page': page
+                    },
+                    timeout=60
+                )
+                if response.status_code != 200:
+                    print(f"OpenAQ measurements returned HTTP {response.status_code}")
+                    return None
+                results = response.json()['results']
+                self._accumulate_hourly(results, hourly)
+                if len(results) < page_size:
+                    break
+                page += 1
+        except Exception as e:
+            print(f"Error fetching OpenAQ measurements: {e}")
+            return None
+        
+        return {
+            'status': 'success',
+            'data': {
+                hour: {parameter: total / count for parameter, (total, count) in sums.items()}
+                for hour, sums in hourly.items()
+            },
+            'source': 'OpenAQ'
+        }
+    
+    def _accumulate_hourly(self, results, hourly):
+        """Add /measurements results to {hour: {parameter: (sum, count)}} in place"""
+        for result in results:
+            parameter = result.get('parameter', '').lower()
+            value = result.get('value')
+            if parameter not in POLLUTANTS or value is None or value < 0:
+                continue
+            # Local time of the station, truncated to the hour
+            hour = datetime.fromisoformat(result['date']['local']).replace(
+                minute=0, second=0, microsecond=0, tzinfo=None
+            ).isoformat()
+            total, count = hourly.setdefault(hour, {}).get(parameter, (0.0, 0))
+            hourly[hour][parameter] = (
+                total + self._convert_units(value, result.get('unit', ''), parameter), count + 1
+            )
     
     def _process_measurements(self, results):
         """Process OpenAQ measurements into standardized format"""
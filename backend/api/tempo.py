@@ -1,8 +1,14 @@
+import numpy as np
 import requests
-import pandas as pd
 import json
+import threading
+import time
 from datetime import datetime, timedelta
 from config import Config
+from api.tempo_granules import TEMPO_PRODUCTS, TempoIngestor
+from api.tempo_grid import TempoGridCache
+from api.upstream_share import SharedUpstreamCache
+from utils import metrics
 
 class TempoAPI:
     """
@@ -16,13 +22,86 @@ class TempoAPI:
             'Authorization': f'Bearer {self.token}',
             'Content-Type': 'application/json'
         }
+        self.ingestor = TempoIngestor()
+        self.grid = TempoGridCache()
+        # One ingest per interval across worker processes (see start_ingest_scheduler)
+        self.shared = SharedUpstreamCache(interval=Config.TEMPO_INGEST_INTERVAL_SECONDS)
+        self._scheduler = None
+        self._scheduler_lock = threading.Lock()
+        # Callables invoked with the new grid version after each publish
+        self.publish_listeners = []
+    
+    def refresh_grid(self, force=False):
+        """
+        Ingest the newest granules and publish them to the shared grid if they changed
+        """
+        subsets = self.ingestor.ingest_latest()
+        if not subsets:
+            return None
+        
+        metadata = self.grid.metadata
+        granules = {pollutant: subset['granule'] for pollutant, subset in subsets.items()}
+        if not force and metadata and metadata['granules'] == granules:
+            return metadata['version']
+        
+        version = self.grid.publish(subsets)
+        for listener in self.publish_listeners:
+            listener(version)
+        return version
+    
+    def start_ingest_scheduler(self):
+        """
+        Ingest in a background thread every TEMPO_INGEST_INTERVAL_SECONDS (idempotent)
+        
+        Mirror sync, downloads and granule scans never run in a request. Across
+        worker processes the ingest is single-flight: the process holding the
+        shared lock ingests and publishes the grid, the others skip the cycle and
+        remap the published grid on their next lookup.
+        """
+        with self._scheduler_lock:
+            if self._scheduler is not None:
+                return
+            self._scheduler = threading.Thread(target=self._ingest_loop, daemon=True, name='tempo-ingest')
+            self._scheduler.start()
+    
+    def _ingest_loop(self):
+        while True:
+            try:
+                self.shared.fetch('tempo_ingest', ('grid',), self.refresh_grid)
+            except Exception as e:
+                print(f"Error ingesting TEMPO granules: {e}")
+            time.sleep(Config.TEMPO_INGEST_INTERVAL_SECONDS)
     
     def get_latest_data(self, lat=Config.GOA_COORDINATES['latitude'], 
                        lon=Config.GOA_COORDINATES['longitude']):
         """
         Get latest TEMPO data for specified coordinates
-        Note: This is a mock implementation as TEMPO API access requires specific endpoints
+        Interpolated from the shared ingested grid when available, otherwise mock data
         """
+        started = time.perf_counter()
+        
+        columns = self.grid.lookup_all(lat, lon)
+        # 'fallback' = no ingested grid covers the point, mock values are served
+        has_data = any(value is not None for value in columns.values())
+        metrics.record_upstream('tempo', started, 'success' if has_data else 'fallback')
+        if has_data:
+            metadata = self.grid.metadata
+            data = {
+                'timestamp': max(metadata['observed_at'].values()),
+                'latitude': lat,
+                'longitude': lon,
+                'column_units': metadata['units'],
+                'grid_version': metadata['version'],
+                'quality_flag': 'good'
+            }
+            data.update({f'{pollutant}_column': value for pollutant, value in columns.items()})
+            
+            return {
+                'status': 'success',
+                'data': data,
+                'source': 'TEMPO'
+            }
+        
         try:
             # Mock TEMPO data based on typical satellite measurements
             # In real implementation, you would use earthaccess library
@@ -72,6 +151,38 @@ class TempoAPI:
         base_value = random.uniform(5, 25)
         return round(base_value, 2)
     
+    def get_historical_columns(self, points, start, end, pollutants=('no2', 'o3')):
+        """
+        TEMPO columns at several points from the local granules observed in [start, end) UTC
+        points is [(lat, lon)]. Returns {hour (UTC datetime): {pollutant: array over points}}
+        in molecules/cm^2, NaN where a granule has no valid pixel near a point.
+        """
+        lats = np.array([lat for lat, _ in points], dtype=float)
+        lons = np.array([lon for _, lon in points], dtype=float)
+        columns = {}
+        
+        for product, spec in TEMPO_PRODUCTS.items():
+            pollutant = spec['pollutant']
+            if pollutant not in pollutants:
+                continue
+            for granule in self.ingestor.list_granules(product, start, end):
+                try:
+                    subset = self.ingestor.ingest(granule)
+                except Exception as e:
+                    print(f"Error ingesting TEMPO granule {granule['path']}: {e}")
+                    continue
+                if subset is None:
+                    continue
+                values = self.grid.sample(lats, lons, pollutant, state=self.grid.regridded({pollutant: subset}))
+                hour = granule['time'].replace(minute=0, second=0, microsecond=0)
+                # Several scans in one hour: later granules win where they have data
+                previous = columns.setdefault(hour, {}).get(pollutant)
+                if previous is not None:
+                    values = np.where(np.isfinite(values), values, previous)
+                columns[hour][pollutant] = values
+        
+        return columns
+    
     def get_historical_data(self, days=7):
         """Get historical TEMPO data for trend analysis"""
         historical_data = []
@@ -91,3 +202,12 @@ class TempoAPI:
             'data': historical_data,
             'source': 'TEMPO_HISTORICAL_MOCK'
         }
+
+
+if __name__ == '__main__':
+    from utils.tile_renderer import TileRenderer
+    
+    # Ingest cycle for cron/schedulers: publish the newest granules and pre-render map tiles
+    tempo_api = TempoAPI()
+    tempo_api.publish_listeners.append(lambda version: TileRenderer(tempo_api.grid).prerender())
+    print(tempo_api.refresh_grid(force=True))
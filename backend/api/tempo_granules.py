@@ -0,0 +1,372 @@
+import hashlib
+import os
+import re
+import numpy as np
+import requests
+from datetime import datetime
+from config import Config
+
+# TEMPO product short names -> pollutant key and column variable candidates.
+# NetCDF4 granules keep variables in groups; flat names cover classic-format mirrors and fixtures.
+TEMPO_PRODUCTS = {
+    'NO2': {'pollutant': 'no2', 'variables': ['product/vertical_column_troposphere', 'vertical_column_troposphere']},
+    'O3TOT': {'pollutant': 'o3', 'variables': ['product/column_amount_o3', 'column_amount_o3']},
+    'HCHO': {'pollutant': 'hcho', 'variables': ['product/vertical_column', 'vertical_column']}
+}
+
+QUALITY_FLAG_VARIABLES = ['product/main_data_quality_flag', 'main_data_quality_flag']
+LATITUDE_VARIABLES = ['latitude', 'geolocation/latitude']
+LONGITUDE_VARIABLES = ['longitude', 'geolocation/longitude']
+
+# e.g. TEMPO_NO2_L3_V03_20240901T123015Z_S003.nc or TEMPO_HCHO_L2_V03_20240901T123015Z_S003G05.nc
+GRANULE_PATTERN = re.compile(
+    r'^TEMPO_(?P<product>[A-Z0-9]+)_(?P<level>L[23])_V\d+_(?P<time>\d{8}T\d{6})Z_S\d{3}(G\d{2})?\.nc$'
+)
+
+COLUMN_UNITS = 'molecules/cm^2'
+
+
+def parse_granule_name(filename):
+    """Product, level and observation time from a TEMPO granule file name"""
+    match = GRANULE_PATTERN.match(os.path.basename(filename))
+    if not match or match.group('product') not in TEMPO_PRODUCTS:
+        return None
+    return {
+        'product': match.group('product'),
+        'pollutant': TEMPO_PRODUCTS[match.group('product')]['pollutant'],
+        'level': match.group('level'),
+        'time': datetime.strptime(match.group('time'), '%Y%m%dT%H%M%S')
+    }
+
+
+class TempoGranuleReader:
+    """
+    Read a bounding-box subset of one TEMPO granule without loading the swath
+
+    Uses netCDF4 (chunked hyperslab reads) when installed, otherwise
+    scipy's memory-mapped reader for classic-format files.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._dataset = None
+        self._backend = None
+
+    def __enter__(self):
+        try:
+            import netCDF4
+            self._dataset = netCDF4.Dataset(self.path, 'r')
+            self._dataset.set_auto_mask(False)
+            self._backend = 'netcdf4'
+        except ImportError:
+            from scipy.io import netcdf_file
+            self._dataset = netcdf_file(self.path, 'r', mmap=True)
+            self._backend = 'scipy'
+        return self
+
+    def __exit__(self, *exc):
+        self._dataset.close()
+        self._dataset = None
+
+    def _variable(self, candidates, required=True):
+        """Find the first candidate variable path present in the granule"""
+        for name in candidates:
+            node = self._dataset
+            try:
+                if self._backend == 'netcdf4':
+                    *groups, leaf = name.split('/')
+                    for group in groups:
+                        node = node.groups[group]
+                    return node.variables[leaf]
+                return node.variables[name]
+            except KeyError:
+                continue
+        if required:
+            raise KeyError(f"None of {candidates} found in {self.path}")
+        return None
+
+    @staticmethod
+    def _read(variable, index):
+        """Read only the requested hyperslab as float64 (copies out of the mmap)"""
+        return np.array(variable[index], dtype=np.float64)
+
+    @staticmethod
+    def _attribute(variable, name):
+        """Variable attribute for either backend, or None"""
+        value = getattr(variable, name, None)
+        if isinstance(value, np.ndarray):
+            value = value.item() if value.size == 1 else value
+        return value
+
+    def _row_col_window(self, lat_var, lon_var, bbox, chunk_rows=256):
+        """Rows/cols of a 2-D (L2 swath) geolocation grid that fall inside the bbox, scanned in chunks"""
+        n_rows = lat_var.shape[0]
+        row_hits = []
+        col_min, col_max = None, None
+
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            lat = self._read(lat_var, np.s_[start:stop, :])
+            lon = self._read(lon_var, np.s_[start:stop, :])
+            inside = (
+                (lat >= bbox['min_lat']) & (lat <= bbox['max_lat']) &
+                (lon >= bbox['min_lon']) & (lon <= bbox['max_lon'])
+            )
+            if inside.any():
+                rows = np.flatnonzero(inside.any(axis=1)) + start
+                cols = np.flatnonzero(inside.any(axis=0))
+                row_hits += [rows[0], rows[-1]]
+                col_min = cols[0] if col_min is None else min(col_min, cols[0])
+                col_max = cols[-1] if col_max is None else max(col_max, cols[-1])
+
+        if not row_hits:
+            return None
+        return slice(min(row_hits), max(row_hits) + 1), slice(col_min, col_max + 1)
+
+    def subset(self, product, bbox):
+        """
+        Extract one product's column over the bbox:
+        {'latitude', 'longitude', 'values'} with fill and flagged pixels as NaN
+        """
+        lat_var = self._variable(LATITUDE_VARIABLES)
+        lon_var = self._variable(LONGITUDE_VARIABLES)
+        column_var = self._variable(TEMPO_PRODUCTS[product]['variables'])
+        flag_var = self._variable(QUALITY_FLAG_VARIABLES, required=False)
+
+        if len(lat_var.shape) == 1:
+            # L3: regular grid, locate the bbox by binary search on the axes
+            lat_axis = self._read(lat_var, np.s_[:])
+            lon_axis = self._read(lon_var, np.s_[:])
+            lat_order = 1 if lat_axis[-1] >= lat_axis[0] else -1
+            lat_lo = np.searchsorted(lat_axis[::lat_order], bbox['min_lat'], side='left')
+            lat_hi = np.searchsorted(lat_axis[::lat_order], bbox['max_lat'], side='right')
+            if lat_order == -1:
+                lat_lo, lat_hi = len(lat_axis) - lat_hi, len(lat_axis) - lat_lo
+            lon_lo = np.searchsorted(lon_axis, bbox['min_lon'], side='left')
+            lon_hi = np.searchsorted(lon_axis, bbox['max_lon'], side='right')
+            if lat_hi <= lat_lo or lon_hi <= lon_lo:
+                return None
+            rows, cols = slice(lat_lo, lat_hi), slice(lon_lo, lon_hi)
+            latitude, longitude = lat_axis[rows], lon_axis[cols]
+        else:
+            # L2: curvilinear swath, scan geolocation in row chunks
+            window = self._row_col_window(lat_var, lon_var, bbox)
+            if window is None:
+                return None
+            rows, cols = window
+            latitude = self._read(lat_var, np.s_[rows, cols])
+            longitude = self._read(lon_var, np.s_[rows, cols])
+
+        # L3 columns carry a leading time dimension of length 1
+        leading = (0,) * (len(column_var.shape) - 2)
+        values = self._read(column_var, leading + (rows, cols))
+
+        fill_value = self._attribute(column_var, '_FillValue')
+        if fill_value is not None:
+            values[values == fill_value] = np.nan
+        values[values < -1e29] = np.nan
+
+        if flag_var is not None:
+            flags = self._read(flag_var, (0,) * (len(flag_var.shape) - 2) + (rows, cols))
+            values[flags != 0] = np.nan
+
+        return {'latitude': latitude, 'longitude': longitude, 'values': values}
+
+
+class TempoIngestor:
+    """
+    Ingest TEMPO L2/L3 granules from a local directory (optionally synced from a mirror),
+    caching each (granule, bbox) subset on disk
+    """
+
+    def __init__(self, granule_dir=None, cache_dir=None, bbox=None, mirror_url=None):
+        self.granule_dir = granule_dir or Config.TEMPO_GRANULE_DIR
+        self.cache_dir = cache_dir or Config.TEMPO_CACHE_DIR
+        self.bbox = bbox or Config.GOA_BBOX
+        self.mirror_url = mirror_url if mirror_url is not None else Config.TEMPO_MIRROR_URL
+        self._memo = {}
+        # Cache paths of granules known not to cover the bbox
+        self._uncovered = set()
+
+    def list_granules(self, product=None, start=None, end=None):
+        """
+        Local granules (optionally of one product, observed in [start, end) UTC) sorted oldest to newest
+        """
+        if not os.path.isdir(self.granule_dir):
+            return []
+
+        granules = []
+        for filename in os.listdir(self.granule_dir):
+            info = parse_granule_name(filename)
+            if not info or (product is not None and info['product'] != product):
+                continue
+            if (start is not None and info['time'] < start) or (end is not None and info['time'] >= end):
+                continue
+            info['path'] = os.path.join(self.granule_dir, filename)
+            granules.append(info)
+
+        return sorted(granules, key=lambda g: g['time'])
+
+    def _cache_path(self, granule_path, product):
+        """Cache file for a (granule, bbox) subset; size and mtime invalidate replaced granules"""
+        stat = os.stat(granule_path)
+        bbox = ','.join(f"{self.bbox[k]:.4f}" for k in ('min_lat', 'max_lat', 'min_lon', 'max_lon'))
+        key = f"{os.path.basename(granule_path)}|{stat.st_size}|{stat.st_mtime_ns}|{product}|{bbox}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + '.npz')
+
+    def ingest(self, granule):
+        """
+        Subset of one granule over the bbox, read from the disk cache when possible;
+        None when the granule does not cover the bbox (cached as an empty .npz)
+        """
+        cache_path = self._cache_path(granule['path'], granule['product'])
+        if cache_path in self._memo:
+            return self._memo[cache_path]
+        if cache_path in self._uncovered:
+            return None
+        
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as cached:
+                subset = {k: cached[k] for k in ('latitude', 'longitude', 'values')} if cached.files else None
+        else:
+            with TempoGranuleReader(granule['path']) as reader:
+                subset = reader.subset(granule['product'], self.bbox)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + '.tmp.npz'
+            np.savez(tmp_path, **(subset or {}))
+            os.replace(tmp_path, cache_path)
+        
+        if subset is None:
+            self._uncovered.add(cache_path)
+            return None
+
+        subset.update({
+            'pollutant': granule['pollutant'],
+            'product': granule['product'],
+            'level': granule['level'],
+            'time': granule['time'].isoformat(),
+            'granule': os.path.basename(granule['path']),
+            'units': COLUMN_UNITS
+        })
+        self._memo = {cache_path: subset, **{k: v for k, v in self._memo.items() if v['product'] != granule['product']}}
+        return subset
+
+    def ingest_latest(self):
+        """
+        Newest available subset per pollutant, e.g. {'no2': {...}, 'o3': {...}}
+        """
+        if self.mirror_url:
+            self.sync_from_mirror()
+
+        latest = {}
+        for product in TEMPO_PRODUCTS:
+            # Walk back from the newest granule until one actually covers the bbox
+            for granule in reversed(self.list_granules(product)):
+                try:
+                    subset = self.ingest(granule)
+                except Exception as e:
+                    print(f"Error ingesting TEMPO granule {granule['path']}: {e}")
+                    continue
+                if subset is not None and np.isfinite(subset['values']).any():
+                    latest[subset['pollutant']] = subset
+                    break
+
+        return latest
+
+    def list_mirror(self):
+        """
+        Granule names in the mirror's index.json, or None if it cannot be read
+        """
+        try:
+            response = requests.get(f"{self.mirror_url.rstrip('/')}/index.json", timeout=10)
+            response.raise_for_status()
+            return [n for n in response.json() if parse_granule_name(n)]
+        except Exception as e:
+            print(f"Error listing TEMPO mirror: {e}")
+            return None
+
+    def download(self, name):
+        """
+        Fetch one mirrored granule into the granule directory; True if it is present afterwards
+        """
+        path = os.path.join(self.granule_dir, name)
+        if os.path.exists(path):
+            return True
+        os.makedirs(self.granule_dir, exist_ok=True)
+        try:
+            with requests.get(f"{self.mirror_url.rstrip('/')}/{name}", stream=True, timeout=60) as r:
+                r.raise_for_status()
+                with open(path + '.part', 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=1 << 20):
+                        f.write(chunk)
+            os.replace(path + '.part', path)
+            return True
+        except Exception as e:
+            print(f"Error downloading TEMPO granule {name}: {e}")
+            return False
+
+    def sync_from_mirror(self, limit=None):
+        """
+        Download granules listed in the mirror's index.json that are not present locally
+        """
+        names = self.list_mirror()
+        if not names:
+            return []
+
+        downloaded = []
+        for name in sorted(names, key=lambda n: parse_granule_name(n)['time'], reverse=True)[:limit]:
+            if os.path.exists(os.path.join(self.granule_dir, name)):
+                continue
+            if self.download(name):
+                downloaded.append(name)
+
+        return downloaded
+
+
+def write_fixture_granule(directory, product='NO2', level='L3', time=None,
+                          bounds=(10.0, 20.0, 69.0, 79.0), resolution=0.02, seed=0):
+    """
+    Write a small synthetic classic-format granule for offline testing
+    Columns are smooth plumes (molecules/cm^2) with a few fill and flagged pixels
+    """
+    from scipy.io import netcdf_file
+
+    time = time or datetime.now().replace(minute=0, second=0, microsecond=0)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"TEMPO_{product}_{level}_V03_{time:%Y%m%dT%H%M%S}Z_S001.nc")
+
+    min_lat, max_lat, min_lon, max_lon = bounds
+    lat_axis = np.arange(min_lat, max_lat, resolution)
+    lon_axis = np.arange(min_lon, max_lon, resolution)
+    lon_grid, lat_grid = np.meshgrid(lon_axis, lat_axis)
+
+    rng = np.random.default_rng(seed)
+    base = {'NO2': 3e15, 'O3TOT': 8e18, 'HCHO': 8e15}[product]
+    values = base * (1 + 0.5 * np.exp(-((lat_grid - 15.4) ** 2 + (lon_grid - 73.9) ** 2) / 0.1))
+    values *= 1 + 0.05 * rng.standard_normal(values.shape)
+    flags = (rng.random(values.shape) < 0.01).astype(np.int16)
+    values[rng.random(values.shape) < 0.01] = -1e30
+
+    variable = TEMPO_PRODUCTS[product]['variables'][-1]
+    with netcdf_file(path, 'w') as nc:
+        if level == 'L3':
+            nc.createDimension('latitude', len(lat_axis))
+            nc.createDimension('longitude', len(lon_axis))
+            dims = ('latitude', 'longitude')
+            nc.createVariable('latitude', 'f4', ('latitude',))[:] = lat_axis
+            nc.createVariable('longitude', 'f4', ('longitude',))[:] = lon_axis
+        else:
+            nc.createDimension('mirror_step', len(lat_axis))
+            nc.createDimension('xtrack', len(lon_axis))
+            dims = ('mirror_step', 'xtrack')
+            # Slightly skewed swath geometry
+            nc.createVariable('latitude', 'f4', dims)[:] = lat_grid + 0.1 * (lon_grid - min_lon) / (max_lon - min_lon)
+            nc.createVariable('longitude', 'f4', dims)[:] = lon_grid
+        column = nc.createVariable(variable, 'f4', dims)
+        column[:] = values
+        column._FillValue = np.float32(-1e30)
+        column.units = COLUMN_UNITS
+        nc.createVariable('main_data_quality_flag', 'h', dims)[:] = flags
+
+    return path
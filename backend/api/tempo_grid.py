@@ -0,0 +1,228 @@
+import glob
+import json
+import os
+import threading
+import time
+import numpy as np
+from config import Config
+
+class TempoGridCache:
+    """
+    Latest TEMPO column subset held as a regular lat/lon grid in a memory-mapped file
+
+    Every worker maps the same file, so one ingest updates all of them and the
+    grid is held in the page cache once. Each publish writes a new versioned
+    data file before atomically replacing the metadata that points at it.
+    """
+
+    def __init__(self, directory=None, bbox=None, resolution=None):
+        self.directory = directory or Config.TEMPO_GRID_DIR
+        self.bbox = bbox or Config.GOA_BBOX
+        self.resolution = resolution or Config.TEMPO_GRID_RESOLUTION
+        self.metadata_path = os.path.join(self.directory, 'grid.json')
+
+        self._lock = threading.Lock()
+        # (grid, metadata) swapped as one tuple so readers never mix versions
+        self._state = (None, None)
+        self._metadata_mtime = None
+        self._checked_at = 0.0
+
+    def _grid_shape(self):
+        """Rows/cols of the target grid covering the bbox"""
+        ny = int(round((self.bbox['max_lat'] - self.bbox['min_lat']) / self.resolution)) + 1
+        nx = int(round((self.bbox['max_lon'] - self.bbox['min_lon']) / self.resolution)) + 1
+        return ny, nx
+
+    def _regrid(self, subset):
+        """Bin-average a (regular or swath) subset onto the target grid; empty cells are NaN"""
+        ny, nx = self._grid_shape()
+        latitude, longitude, values = subset['latitude'], subset['longitude'], subset['values']
+        if latitude.ndim == 1:
+            latitude, longitude = np.meshgrid(latitude, longitude, indexing='ij')
+
+        rows = np.rint((latitude - self.bbox['min_lat']) / self.resolution).astype(np.int64)
+        cols = np.rint((longitude - self.bbox['min_lon']) / self.resolution).astype(np.int64)
+        valid = np.isfinite(values) & (rows >= 0) & (rows < ny) & (cols >= 0) & (cols < nx)
+
+        cells = rows[valid] * nx + cols[valid]
+        sums = np.bincount(cells, weights=values[valid], minlength=ny * nx)
+        counts = np.bincount(cells, minlength=ny * nx)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (sums / counts).reshape(ny, nx)
+
+    def regridded(self, subsets):
+        """
+        In-memory (grid, metadata) of subsets on the target grid, without publishing
+        Pass it as ``state`` to sample(), e.g. to read historical granules
+        """
+        variables = sorted(subsets)
+        grid = np.stack([self._regrid(subsets[variable]) for variable in variables])
+        metadata = {
+            'variables': variables,
+            'min_lat': self.bbox['min_lat'],
+            'min_lon': self.bbox['min_lon'],
+            'resolution': self.resolution,
+            'shape': list(grid.shape[1:])
+        }
+        return grid, metadata
+
+    def publish(self, subsets):
+        """
+        Regrid ingested subsets ({pollutant: subset}) and publish them as the new shared grid
+        """
+        if not subsets:
+            return None
+
+        variables = sorted(subsets)
+        ny, nx = self._grid_shape()
+        version = time.time_ns()
+        os.makedirs(self.directory, exist_ok=True)
+
+        data_name = f'grid_{version}.npy'
+        tmp_path = os.path.join(self.directory, data_name + '.tmp')
+        grid = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(len(variables), ny, nx))
+        for k, variable in enumerate(variables):
+            grid[k] = self._regrid(subsets[variable])
+        grid.flush()
+        del grid
+        os.replace(tmp_path, os.path.join(self.directory, data_name))
+
+        metadata = {
+            'version': version,
+            'data_file': data_name,
+            'variables': variables,
+            'min_lat': self.bbox['min_lat'],
+            'min_lon': self.bbox['min_lon'],
+            'resolution': self.resolution,
+            'shape': [ny, nx],
+            'units': subsets[variables[0]].get('units'),
+            'observed_at': {v: subsets[v].get('time') for v in variables},
+            'granules': {v: subsets[v].get('granule') for v in variables},
+            'published_at': time.time()
+        }
+        tmp_metadata = self.metadata_path + '.tmp'
+        with open(tmp_metadata, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_metadata, self.metadata_path)
+
+        # Older grids stay readable by processes that still map them (unlink keeps the inode)
+        for path in glob.glob(os.path.join(self.directory, 'grid_*.npy')):
+            if os.path.basename(path) != data_name:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        return version
+
+    def _refresh(self):
+        """Remap the grid if another process published a new version (checked at most once a second)"""
+        now = time.monotonic()
+        if now - self._checked_at < 1.0 and self._state[0] is not None:
+            return
+        self._checked_at = now
+
+        try:
+            mtime = os.stat(self.metadata_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._metadata_mtime:
+            return
+
+        with self._lock:
+            try:
+                with open(self.metadata_path) as f:
+                    metadata = json.load(f)
+                grid = np.load(os.path.join(self.directory, metadata['data_file']), mmap_mode='r')
+            except (FileNotFoundError, ValueError):
+                # A newer publish replaced the files mid-read; keep the current grid and retry later
+                return
+            self._state = (grid, metadata)
+            self._metadata_mtime = mtime
+
+    @property
+    def metadata(self):
+        """Metadata of the currently mapped grid, or None if nothing is published"""
+        self._refresh()
+        return self._state[1]
+
+    def snapshot(self):
+        """
+        Consistent (grid view, metadata) pair for batch consumers, or (None, None)
+        """
+        self._refresh()
+        return self._state
+
+    def lookup(self, lat, lon, variable):
+        """
+        Bilinear interpolation of one variable at a point, read straight from the mapped grid
+        NaN corners are dropped and the remaining weights renormalized
+        """
+        grid, metadata = self.snapshot()
+        if grid is None or variable not in metadata['variables']:
+            return None
+
+        ny, nx = metadata['shape']
+        y = (lat - metadata['min_lat']) / metadata['resolution']
+        x = (lon - metadata['min_lon']) / metadata['resolution']
+        if not (0 <= y <= ny - 1 and 0 <= x <= nx - 1):
+            return None
+
+        i = min(int(y), ny - 2)
+        j = min(int(x), nx - 2)
+        fy, fx = y - i, x - j
+        k = metadata['variables'].index(variable)
+
+        total = weight = 0.0
+        for di, dj, w in ((0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+                          (1, 0, fy * (1 - fx)), (1, 1, fy * fx)):
+            value = grid[k, i + di, j + dj]
+            if w > 0 and value == value:  # skip NaN corners
+                total += w * float(value)
+                weight += w
+
+        return total / weight if weight > 0 else None
+
+    def lookup_all(self, lat, lon):
+        """
+        Interpolated value of every published variable at a point
+        """
+        metadata = self.metadata
+        if metadata is None:
+            return {}
+        return {variable: self.lookup(lat, lon, variable) for variable in metadata['variables']}
+    
+    def sample(self, lats, lons, variable, state=None):
+        """
+        Vectorized bilinear interpolation at arrays of points (NaN outside the grid or without data)
+        Pass ``state`` from snapshot() to sample several batches from one grid version
+        """
+        grid, metadata = state or self.snapshot()
+        lats = np.asarray(lats, dtype=np.float64)
+        if grid is None or variable not in metadata['variables']:
+            return np.full(lats.shape, np.nan)
+
+        ny, nx = metadata['shape']
+        y = (lats - metadata['min_lat']) / metadata['resolution']
+        x = (np.asarray(lons, dtype=np.float64) - metadata['min_lon']) / metadata['resolution']
+        inside = (y >= 0) & (y <= ny - 1) & (x >= 0) & (x <= nx - 1)
+
+        i = np.clip(np.floor(y).astype(np.int64), 0, ny - 2)
+        j = np.clip(np.floor(x).astype(np.int64), 0, nx - 2)
+        fy, fx = y - i, x - j
+        layer = grid[metadata['variables'].index(variable)]
+
+        total = np.zeros(lats.shape)
+        weight = np.zeros(lats.shape)
+        for di, dj, w in ((0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+                          (1, 0, fy * (1 - fx)), (1, 1, fy * fx)):
+            corner = layer[i + di, j + dj]
+            valid = np.isfinite(corner)
+            total += np.where(valid, w * corner, 0.0)
+            weight += np.where(valid, w, 0.0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = total / weight
+        values[~inside | (weight <= 0)] = np.nan
+        return values
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import time
+from config import Config
+from utils import metrics
+
+# File locks coordinate gunicorn workers on one host; without fcntl every process fetches for itself
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class SharedUpstreamCache:
+    """
+    Cross-process single-flight for upstream fetches
+
+    Each (source, location) has a lock file and a published JSON result in a
+    shared directory. A worker that finds no result attempted within the
+    interval tries the lock without blocking: the winner fetches and publishes,
+    the others poll until the result appears. Upstream calls per interval are
+    therefore one per source and location however many workers run. The last
+    successful result is kept alongside failures so every worker can serve it;
+    a failed attempt only answers for ``retry_interval``, then the upstream is
+    tried again.
+    """
+
+    def __init__(self, directory=None, interval=None, wait_seconds=None, retry_interval=None):
+        self.directory = directory or Config.UPSTREAM_SHARE_DIR
+        self.interval = Config.UPSTREAM_SHARE_SECONDS if interval is None else interval
+        self.retry_interval = min(
+            self.interval, Config.UPSTREAM_SHARE_RETRY_SECONDS if retry_interval is None else retry_interval
+        )
+        self.wait_seconds = wait_seconds or Config.UPSTREAM_SHARE_WAIT_SECONDS
+        self.enabled = fcntl is not None
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, source, key):
+        return os.path.join(self.directory, f"{source}_{'_'.join(str(part) for part in key)}")
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path + '.json') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _current(self, entry, since):
+        """Whether a published entry answers a request that started at ``since``"""
+        if entry is None:
+            return False
+        interval = self.interval if entry['ok'] else self.retry_interval
+        return time.time() - entry['attempted_at'] < interval or entry['attempted_at'] >= since
+
+    @staticmethod
+    def _result(entry):
+        return entry['result'] if entry['ok'] else None
+
+    @staticmethod
+    def _try_lock(path):
+        """Open and lock the key's lock file without blocking; None if another process holds it"""
+        fd = os.open(path + '.lock', os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except OSError:
+            os.close(fd)
+            return None
+
+    @staticmethod
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _publish(self, path, previous, result):
+        """Atomically publish an attempt, keeping the last good result on failure"""
+        now = time.time()
+        if result is not None:
+            entry = {'attempted_at': now, 'ok': True, 'fetched_at': now, 'result': result}
+        else:
+            entry = {
+                'attempted_at': now,
+                'ok': False,
+                'fetched_at': previous.get('fetched_at') if previous else None,
+                'result': previous.get('result') if previous else None
+            }
+        tmp_path = f'{path}.json.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path + '.json')
+
+    def fetch(self, source, key, fetch_fn):
+        """
+        ``fetch_fn()`` result for this interval, fetched by at most one process
+        Returns (result, fetched): result is None if the fetch failed (or the leader
+        did not publish in time), fetched whether this call ran ``fetch_fn`` itself
+        (only those outcomes say anything new about the upstream, e.g. to a breaker)
+        """
+        if not self.enabled:
+            return fetch_fn(), True
+
+        path = self._path(source, key)
+        since = time.time()
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            entry = self._read(path)
+            if self._current(entry, since):
+                metrics.record_cache('upstream_share', True)
+                return self._result(entry), False
+
+            fd = self._try_lock(path)
+            if fd is not None:
+                try:
+                    # Re-check: the previous leader may have published just before we got the lock
+                    entry = self._read(path)
+                    if self._current(entry, since):
+                        metrics.record_cache('upstream_share', True)
+                        return self._result(entry), False
+                    metrics.record_cache('upstream_share', False)
+                    result = fetch_fn()
+                    self._publish(path, entry, result)
+                    return result, True
+                finally:
+                    self._unlock(fd)
+
+            if time.monotonic() > deadline:
+                return None, False
+            time.sleep(0.05)
+
+    async def fetch_async(self, source, key, fetch_fn):
+        """fetch() for coroutine ``fetch_fn``; followers wait without blocking the event loop"""
+        if not self.enabled:
+            return await fetch_fn(), True
+
+        path = self._path(source, key)
+        since = time.time()
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            entry = self._read(path)
+            if self._current(entry, since):
+                metrics.record_cache('upstream_share', True)
+                return self._result(entry), False
+
+            fd = self._try_lock(path)
+            if fd is not None:
+                try:
+                    entry = self._read(path)
+                    if self._current(entry, since):
+                        metrics.record_cache('upstream_share', True)
+                        return self._result(entry), False
+                    metrics.record_cache('upstream_share', False)
+                    result = await fetch_fn()
+                    self._publish(path, entry, result)
+                    return result, True
+                finally:
+                    self._unlock(fd)
+
+            if time.monotonic() > deadline:
+                return None, False
+            await asyncio.sleep(0.05)
+
+    def last_good(self, source, key):
+        """(fetched_at, result) of the last successful fetch by any process, or None"""
+        if not self.enabled:
+            return None
+        entry = self._read(self._path(source, key))
+        if not entry or entry.get('result') is None:
+            return None
+        return entry['fetched_at'], entry['result']
@@ -1,7 +1,30 @@
+import numpy as np
 import requests
-import pandas as pd
+import threading
+import time
 from datetime import datetime, timedelta
 from config import Config
+from api.circuit_breaker import GuardedSource
+from api.upstream_share import SharedUpstreamCache
+from utils import metrics
+
+# Stored weather fields -> Open-Meteo hourly variables
+HOURLY_VARIABLES = {
+    'temperature': 'temperature_2m',
+    'humidity': 'relative_humidity_2m',
+    'wind_speed': 'wind_speed_10m'
+}
+
+# Hourly forecast variables cached for forecast inference
+FORECAST_VARIABLES = dict(HOURLY_VARIABLES, boundary_layer_height='boundary_layer_height')
+
+# Daily forecast fields -> Open-Meteo daily variables
+DAILY_VARIABLES = {
+    'temp_max': 'temperature_2m_max',
+    'temp_min': 'temperature_2m_min',
+    'humidity': 'relative_humidity_2m_mean',
+    'wind_speed': 'wind_speed_10m_max'
+}
 
 class WeatherAPI:
     """
@@ -10,45 +33,178 @@ class WeatherAPI:
     
     def __init__(self):
         self.base_url = Config.WEATHER_API_URL
+        default = (Config.GOA_COORDINATES['latitude'], Config.GOA_COORDINATES['longitude'])
+        self.guard = GuardedSource(
+            'open_meteo', self._get_mock_weather,
+            probe=lambda: self._fetch_current(*default),
+            probe_key=GuardedSource.key(*default),
+            shared=SharedUpstreamCache()
+        )
+        self.forecast = HourlyForecastCache(self)
     
     def get_current_weather(self, lat=Config.GOA_COORDINATES['latitude'],
                           lon=Config.GOA_COORDINATES['longitude']):
         """
         Get current weather conditions
+        Goes through the Open-Meteo circuit breaker: when the API fails or the breaker is
+        open, the last good conditions for these coordinates are returned flagged ``stale``
+        """
+        return self.guard.call(self.guard.key(lat, lon), lambda: self._fetch_current(lat, lon))
+    
+    async def get_current_weather_async(self, client, lat=Config.GOA_COORDINATES['latitude'],
+                                        lon=Config.GOA_COORDINATES['longitude']):
         """
+        get_current_weather on an httpx.AsyncClient (no thread waits on the upstream)
+        """
+        return await self.guard.call_async(
+            self.guard.key(lat, lon),
+            lambda: self._fetch_current_async(client, lat, lon)
+        )
+    
+    def _fetch_current(self, lat, lon):
+        """One current-conditions request; None if it failed"""
+        started = time.perf_counter()
         try:
-            params = {
-                'latitude': lat,
-                'longitude': lon,
-                'current': 'temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m',
-                'timezone': 'Asia/Kolkata'
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                current_weather = data.get('current', {})
+            response = requests.get(self.base_url, params=self._current_params(lat, lon), timeout=10)
+            result = self._current_result(response)
+            metrics.record_upstream('open_meteo', started, 'success' if result else 'error')
+            return result
                 
-                processed_data = {
-                    'temperature': current_weather.get('temperature_2m'),
-                    'humidity': current_weather.get('relative_humidity_2m'),
-                    'wind_speed': current_weather.get('wind_speed_10m'),
-                    'wind_direction': current_weather.get('wind_direction_10m'),
-                    'timestamp': current_weather.get('time', datetime.now().isoformat())
-                }
-                
-                return {
-                    'status': 'success',
-                    'data': processed_data,
-                    'source': 'Open-Meteo'
-                }
-            else:
-                return self._get_mock_weather()
+        except Exception as e:
+            metrics.record_upstream('open_meteo', started, metrics.failure_outcome(e))
+            print(f"Error fetching weather data: {e}")
+            return None
+    
+    async def _fetch_current_async(self, client, lat, lon):
+        """_fetch_current on an httpx.AsyncClient"""
+        started = time.perf_counter()
+        try:
+            response = await client.get(self.base_url, params=self._current_params(lat, lon), timeout=10)
+            result = self._current_result(response)
+            metrics.record_upstream('open_meteo', started, 'success' if result else 'error')
+            return result
                 
         except Exception as e:
+            metrics.record_upstream('open_meteo', started, metrics.failure_outcome(e))
             print(f"Error fetching weather data: {e}")
-            return self._get_mock_weather()
+            return None
+    
+    @staticmethod
+    def _current_params(lat, lon):
+        """Query parameters of a current-conditions request"""
+        return {
+            'latitude': lat,
+            'longitude': lon,
+            'current': 'temperature_2m,relative_humidity_2m,wind_speed_10m,wind_direction_10m',
+            'timezone': Config.LOCAL_TIMEZONE
+        }
+    
+    def _current_result(self, response):
+        """Standardized result from a current-conditions response (requests or httpx), None on error status"""
+        if response.status_code == 200:
+            data = response.json()
+            current_weather = data.get('current', {})
+            
+            processed_data = {
+                'temperature': current_weather.get('temperature_2m'),
+                'humidity': current_weather.get('relative_humidity_2m'),
+                'wind_speed': current_weather.get('wind_speed_10m'),
+                'wind_direction': current_weather.get('wind_direction_10m'),
+                'timestamp': current_weather.get('time', datetime.now().isoformat())
+            }
+            
+            return {
+                'status': 'success',
+                'data': processed_data,
+                'source': 'Open-Meteo'
+            }
+        else:
+            print(f"Open-Meteo returned HTTP {response.status_code}")
+            return None
+    
+    def get_archive_weather(self, points, start_date, end_date, throttle=None):
+        """
+        Hourly archived weather for several points in one multi-coordinate request
+        points is [(lat, lon)], dates are inclusive. Returns the hours (local time,
+        datetime64[h]) and a (point x hour x HOURLY_VARIABLES) array with NaN gaps,
+        or None if the request failed. throttle is called before the request.
+        """
+        params = {
+            'latitude': ','.join(str(lat) for lat, _ in points),
+            'longitude': ','.join(str(lon) for _, lon in points),
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'hourly': ','.join(HOURLY_VARIABLES.values()),
+            'timezone': Config.LOCAL_TIMEZONE
+        }
+        try:
+            if throttle:
+                throttle()
+            response = requests.get(Config.WEATHER_ARCHIVE_URL, params=params, timeout=60)
+            if response.status_code != 200:
+                print(f"Open-Meteo archive returned HTTP {response.status_code}")
+                return None
+            hours, values = self._hourly_arrays(response.json(), list(HOURLY_VARIABLES.values()))
+            return {
+                'status': 'success',
+                'data': {'time': hours, 'variables': list(HOURLY_VARIABLES), 'values': values},
+                'source': 'Open-Meteo'
+            }
+        except Exception as e:
+            print(f"Error fetching archived weather: {e}")
+            return None
+    
+    @staticmethod
+    def _hourly_arrays(body, variables):
+        """
+        (hours, point x hour x variable array) from an Open-Meteo hourly response;
+        multi-coordinate responses are a list with one object per point
+        """
+        locations = body if isinstance(body, list) else [body]
+        hours = np.array(locations[0]['hourly']['time'], dtype='datetime64[h]')
+        values = np.full((len(locations), len(hours), len(variables)), np.nan)
+        for i, location in enumerate(locations):
+            hourly = location['hourly']
+            for k, variable in enumerate(variables):
+                # None (missing hours) becomes NaN
+                values[i, :, k] = np.array(hourly.get(variable, [None] * len(hours)), dtype=float)
+        return hours, values
+    
+    def get_hourly_forecast(self, points, days=None):
+        """
+        Hourly forecast of FORECAST_VARIABLES for several points in one multi-coordinate
+        request: {'time': [ISO hours], 'values': point x hour x variable nested lists},
+        JSON-ready for sharing between workers. None if the request failed.
+        """
+        started = time.perf_counter()
+        try:
+            response = requests.get(self.base_url, params=self._forecast_params(points, days), timeout=10)
+            result = self._forecast_result(response)
+            metrics.record_upstream('open_meteo', started, 'success' if result else 'error')
+            return result
+        except Exception as e:
+            metrics.record_upstream('open_meteo', started, metrics.failure_outcome(e))
+            print(f"Error fetching hourly weather forecast: {e}")
+            return None
+    
+    @staticmethod
+    def _forecast_params(points, days=None):
+        """Query parameters of a multi-coordinate hourly forecast request"""
+        return {
+            'latitude': ','.join(str(lat) for lat, _ in points),
+            'longitude': ','.join(str(lon) for _, lon in points),
+            'hourly': ','.join(FORECAST_VARIABLES.values()),
+            'forecast_days': days or Config.WEATHER_FORECAST_DAYS,
+            'timezone': Config.LOCAL_TIMEZONE
+        }
+    
+    def _forecast_result(self, response):
+        """get_hourly_forecast result from a response (requests or httpx), None on error status"""
+        if response.status_code != 200:
+            print(f"Open-Meteo forecast returned HTTP {response.status_code}")
+            return None
+        hours, values = self._hourly_arrays(response.json(), list(FORECAST_VARIABLES.values()))
+        return {'time': [str(hour) for hour in hours], 'values': values.tolist()}
     
     def get_forecast_weather(self, days=7):
         """
@@ -58,9 +214,9 @@ class WeatherAPI:
             params = {
                 'latitude': Config.GOA_COORDINATES['latitude'],
                 'longitude': Config.GOA_COORDINATES['longitude'],
-                'daily': 'temperature_2m_max,temperature_2m_min,relative_humidity_2m_mean,wind_speed_10m_max',
+                'daily': ','.join(DAILY_VARIABLES.values()),
                 'forecast_days': days,
-                'timezone': 'Asia/Kolkata'
+                'timezone': Config.LOCAL_TIMEZONE
             }
             
             response = requests.get(self.base_url, params=params, timeout=10)
@@ -69,18 +225,14 @@ class WeatherAPI:
                 data = response.json()
                 daily_data = data.get('daily', {})
                 
-                forecast = []
                 dates = daily_data.get('time', [])
                 
-                for i, date in enumerate(dates):
-                    forecast_day = {
-                        'date': date,
-                        'temp_max': daily_data.get('temperature_2m_max', [])[i] if i < len(daily_data.get('temperature_2m_max', [])) else None,
-                        'temp_min': daily_data.get('temperature_2m_min', [])[i] if i < len(daily_data.get('temperature_2m_min', [])) else None,
-                        'humidity': daily_data.get('relative_humidity_2m_mean', [])[i] if i < len(daily_data.get('relative_humidity_2m_mean', [])) else None,
-                        'wind_speed': daily_data.get('wind_speed_10m_max', [])[i] if i < len(daily_data.get('wind_speed_10m_max', [])) else None
-                    }
-                    forecast.append(forecast_day)
+                # One column per field, padded with None where a series is short
+                columns = []
+                for variable in DAILY_VARIABLES.values():
+                    values = list(daily_data.get(variable) or [])[:len(dates)]
+                    columns.append(values + [None] * (len(dates) - len(values)))
+                forecast = [dict(zip(['date', *DAILY_VARIABLES], row)) for row in zip(dates, *columns)]
                 
                 return {
                     'status': 'success',
@@ -133,3 +285,92 @@ class WeatherAPI:
             'data': forecast,
             'source': 'Weather_MOCK'
         }
+
+
+class HourlyForecastCache:
+    """
+    Hourly Open-Meteo forecast for every location as one (location x hour x variable) array
+
+    All locations are fetched in one request per WEATHER_FORECAST_REFRESH_SECONDS;
+    with several workers one of them fetches and the others read its published
+    result. Refreshes run in a background thread, so readers never wait on the
+    network: they get the current array, or None until the first fetch lands.
+    """
+
+    SOURCE = 'open_meteo_forecast'
+    KEY = ('all',)
+    RETRY_SECONDS = 60
+
+    def __init__(self, weather_api, locations=None):
+        self.weather_api = weather_api
+        locations = locations or Config.GOA_LOCATIONS
+        self.points = [(loc['name'], loc['lat'], loc['lon']) for loc in locations]
+        if Config.GOA_COORDINATES['name'] not in {name for name, _, _ in self.points}:
+            self.points.append((Config.GOA_COORDINATES['name'], Config.GOA_COORDINATES['latitude'],
+                                Config.GOA_COORDINATES['longitude']))
+        self._index = {name: i for i, (name, _, _) in enumerate(self.points)}
+        self.variables = list(FORECAST_VARIABLES)
+        # A failed fetch is retried after RETRY_SECONDS, not a whole refresh cycle
+        self.shared = SharedUpstreamCache(
+            interval=Config.WEATHER_FORECAST_REFRESH_SECONDS, retry_interval=self.RETRY_SECONDS
+        )
+
+        # (hours as datetime64[h], values) swapped as one tuple
+        self._state = None
+        self._next_refresh = float('-inf')
+        self._refresh_lock = threading.Lock()
+
+        # Start from the forecast another worker already published, if any
+        published = self.shared.last_good(self.SOURCE, self.KEY)
+        if published:
+            self._load(published[1])
+
+    def _load(self, result):
+        self._state = (np.array(result['time'], dtype='datetime64[h]'), np.array(result['values'], dtype=float))
+
+    def _fetch(self):
+        return self.weather_api.get_hourly_forecast([(lat, lon) for _, lat, lon in self.points])
+
+    def refresh(self):
+        """Fetch (or read the shared) forecast now; True if one is available afterwards"""
+        result, _ = self.shared.fetch(self.SOURCE, self.KEY, self._fetch)
+        if result:
+            self._load(result)
+            self._next_refresh = time.monotonic() + Config.WEATHER_FORECAST_REFRESH_SECONDS
+        else:
+            # Retry sooner than a full cycle, still without hammering a failing upstream
+            self._next_refresh = time.monotonic() + self.shared.retry_interval
+        return self._state is not None
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing weather forecast: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _maybe_refresh(self):
+        """Start a background refresh when the cycle is over (one at a time per process)"""
+        if time.monotonic() < self._next_refresh or not self._refresh_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh_in_background, daemon=True, name='weather-forecast').start()
+
+    def ahead(self, location, start, hours):
+        """
+        {variable: array of ``hours`` values} for a location's hours from ``start`` (a local
+        datetime) onwards, NaN beyond the cached range; None if nothing covers them
+        """
+        self._maybe_refresh()
+        state = self._state
+        if state is None or location not in self._index:
+            return None
+
+        times, values = state
+        offsets = np.arange(hours) + int((np.datetime64(start, 'h') - times[0]) / np.timedelta64(1, 'h'))
+        covered = (offsets >= 0) & (offsets < len(times))
+        if not covered.any():
+            return None
+        rows = np.full((hours, len(self.variables)), np.nan)
+        rows[covered] = values[self._index[location], offsets[covered]]
+        return {variable: rows[:, k] for k, variable in enumerate(self.variables)}
@@ -1,8 +1,13 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
+import copy
+import importlib
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Add backend directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -18,9 +23,26 @@ except ImportError:
             'longitude': 74.1240,
             'name': 'Goa, India'
         }
+        GOA_LOCATIONS = [
+            {'name': 'Panaji', 'lat': 15.4909, 'lon': 73.8278, 'type': 'capital'},
+            {'name': 'Margao', 'lat': 15.2993, 'lon': 74.1240, 'type': 'city'},
+            {'name': 'Mapusa', 'lat': 15.5959, 'lon': 73.8137, 'type': 'town'},
+            {'name': 'Vasco da Gama', 'lat': 15.3947, 'lon': 73.8081, 'type': 'port'},
+            {'name': 'Ponda', 'lat': 15.4019, 'lon': 74.0070, 'type': 'town'}
+        ]
 
 app = Flask(__name__)
 
+# Request metrics (registered first so they time the other response hooks too) and per-request trace spans
+from utils import metrics, tracing
+metrics.install_request_metrics(app)
+tracing.install_request_tracing(app)
+
+# orjson-backed jsonify plus gzip/brotli negotiation for every response
+from utils.response_encoding import install_json_provider, compress_response, negotiated_response
+install_json_provider(app)
+app.after_request(compress_response)
+
 # Production-ready CORS configuration
 CORS(app, origins=[
     "http://localhost:5173",  # Local development
@@ -29,15 +51,35 @@ CORS(app, origins=[
     "*"  # Allow all origins for now (restrict later)
 ])
 
-# Initialize components with error handling for deployment
+# Initialize components with error handling for deployment. The data processor
+# (the API clients) and the forecaster (scikit-learn, plus pandas for training)
+# are built on first use, or by warm_up() before workers fork, so importing the
+# app stays fast.
 try:
-    from models.data_processor import DataProcessor
-    from models.forecast import AirQualityForecaster
     from utils.aqi_calculator import AQICalculator
+    from utils.tile_renderer import TileRenderer, TILE_FORMATS, LAYER_RANGES, NO_DATA
+    from utils.lazy import LazyComponent, require_modules
+    require_modules('pandas', 'sklearn', 'joblib', 'requests')
+    
+    def _build_data_processor():
+        from models.data_processor import DataProcessor
+        processor = DataProcessor()
+        # Pre-render the Goa extent in the background after every TEMPO ingest
+        processor.tempo_api.publish_listeners.append(
+            lambda version: threading.Thread(target=tile_renderer.prerender, daemon=True).start()
+        )
+        # Granule ingest runs in the background, never in a request
+        processor.tempo_api.start_ingest_scheduler()
+        return processor
     
-    data_processor = DataProcessor()
-    forecaster = AirQualityForecaster()
+    def _build_forecaster():
+        from models.forecast import AirQualityForecaster
+        return AirQualityForecaster()
+    
+    data_processor = LazyComponent('data processor', _build_data_processor)
+    forecaster = LazyComponent('forecaster', _build_forecaster)
     aqi_calculator = AQICalculator()
+    tile_renderer = LazyComponent('tile renderer', lambda: TileRenderer(data_processor.tempo_api.grid))
     COMPONENTS_LOADED = True
 except ImportError as e:
     print(f"⚠️  Warning: Could not import components: {e}")
@@ -46,7 +88,7 @@ except ImportError as e:
     
     # Mock components for deployment
     class MockDataProcessor:
-        def get_integrated_current_data(self):
+        def get_integrated_current_data(self, location=None):
             return {
                 'status': 'success',
                 'data': {
@@ -58,7 +100,13 @@ except ImportError as e:
                 }
             }
         
-        def get_historical_trends(self, days=7):
+        def get_snapshot(self, location=None, requested_at=None):
+            result = self.get_integrated_current_data(location)
+            result['data']['validation'] = self.validate_data_quality(result['data'])
+            result['data']['pollutant_breakdown'] = aqi_calculator.pollutant_breakdown(result['data']['air_quality'])
+            return result
+        
+        def get_historical_trends(self, days=7, location=None):
             trends = []
             for i in range(days):
                 date = (datetime.now() - datetime.timedelta(days=i)).date()
@@ -74,9 +122,15 @@ except ImportError as e:
         
         def validate_data_quality(self, data):
             return {'confidence_score': 0.92, 'data_completeness': 0.95, 'source_reliability': 'high'}
+        
+        def get_lag_features(self, location_name):
+            return None
+        
+        def get_future_weather(self, location_name, hours=24):
+            return None
     
     class MockForecaster:
-        def predict_24h_forecast(self, air_quality_data, weather_data):
+        def predict_24h_forecast(self, air_quality_data, weather_data, historical_data=None, future_weather=None):
             forecasts = []
             base_time = datetime.now()
             for hour in range(24):
@@ -99,6 +153,9 @@ except ImportError as e:
             pm25 = data.get('pm25', 30)
             return max(50, min(300, pm25 * 2.5))
         
+        def calculate_composite_aqi_batch(self, pollutant_arrays):
+            return [self.calculate_composite_aqi({'pm25': pm25}) for pm25 in pollutant_arrays.get('pm25', [])]
+        
         def calculate_individual_aqi(self, value, pollutant):
             multipliers = {'pm25': 2.5, 'pm10': 1.8, 'no2': 2.0, 'o3': 1.5, 'so2': 3.0, 'co': 10}
             return value * multipliers.get(pollutant, 2.0)
@@ -114,11 +171,148 @@ except ImportError as e:
                 return {'aqi': aqi_value, 'category': 'Poor', 'color': '#ff0000', 'description': 'Air quality is poor.'}
             else:
                 return {'aqi': aqi_value, 'category': 'Severe', 'color': '#7e0023', 'description': 'Air quality is severe.'}
+        
+        def pollutant_breakdown(self, air_quality):
+            breakdown = {
+                pollutant: {'value': value, 'unit': 'µg/m³', 'aqi': self.calculate_individual_aqi(value, pollutant),
+                            'category': self.get_aqi_category(self.calculate_individual_aqi(value, pollutant))['category']}
+                for pollutant, value in air_quality.items()
+            }
+            dominant = max(breakdown, key=lambda k: breakdown[k]['aqi'])
+            for pollutant, entry in breakdown.items():
+                entry['is_primary_concern'] = pollutant == dominant
+            return {'pollutant_breakdown': breakdown, 'dominant_pollutant': dominant}
     
     # Use mock components
     data_processor = MockDataProcessor()
     forecaster = MockForecaster()
     aqi_calculator = MockAQICalculator()
+    tile_renderer = None
+
+from models.training_jobs import TrainingJobManager
+
+training_jobs = TrainingJobManager()
+
+def _install_forecaster(new_forecaster):
+    """Swap in a fully trained forecaster; rebinding the global is atomic"""
+    global forecaster
+    forecaster = new_forecaster
+
+def _new_forecaster():
+    """Fresh, untrained forecaster using the current backend"""
+    if COMPONENTS_LOADED:
+        from models.forecast import AirQualityForecaster
+        return AirQualityForecaster(backend=forecaster.backend)
+    return MockForecaster()
+
+def _current_snapshot(location=None):
+    """
+    Shared snapshot for a location. Under the ASGI server the request carries its arrival
+    time, so a snapshot prefetched for it is used even when the TTL is shorter than the fetch.
+    """
+    return data_processor.get_snapshot(location, requested_at=request.environ.get('airalert.requested_at'))
+
+def _find_location(location_name):
+    """Config.GOA_LOCATIONS entry matching a name (case-insensitive), or None"""
+    return next(
+        (loc for loc in Config.GOA_LOCATIONS if loc['name'].lower() == location_name.lower()),
+        None
+    )
+
+# Forecasters for locations with their own trained model (python -m models.forecast
+# train-locations): {location name: (monotonic time checked, forecaster or None)}
+_location_forecasters = {}
+
+def _forecaster_for(name):
+    """The location's own model when one was trained for it, otherwise the shared one"""
+    if not COMPONENTS_LOADED or not name:
+        return forecaster
+    checked_at, model = _location_forecasters.get(name, (float('-inf'), None))
+    if model is None and time.monotonic() - checked_at >= Config.MODEL_RELOAD_CHECK_SECONDS:
+        from models.forecast import AirQualityForecaster, has_location_model
+        if has_location_model(name):
+            candidate = AirQualityForecaster(backend=forecaster.backend, location=name)
+            model = candidate if candidate.load_model() else None
+        _location_forecasters[name] = (time.monotonic(), model)
+    return model or forecaster
+
+# Forecasts generated per snapshot: {location name: (snapshot timestamp, forecaster id, forecasts)}
+_forecast_cache = {}
+
+def _build_forecast(current_data):
+    """24-hour forecast with AQI per hour, computed once per snapshot and model"""
+    name = current_data.get('location', {}).get('name')
+    model = _forecaster_for(name)
+    cached = _forecast_cache.get(name)
+    hit = bool(cached) and cached[0] == current_data.get('timestamp') and cached[1] == id(model)
+    metrics.record_cache('forecast', hit)
+    if hit:
+        return cached[2]
+    
+    air_quality_data = current_data.get('air_quality', {})
+    weather_data = current_data.get('weather', {})
+    lag_features = data_processor.get_lag_features(name)
+    future_weather = data_processor.get_future_weather(name)
+    
+    # Generate forecast
+    forecasts = model.predict_24h_forecast(air_quality_data, weather_data, lag_features, future_weather)
+    
+    # Calculate AQI for each forecast point
+    with tracing.span('forecast.aqi_enrichment'):
+        aqi_values = aqi_calculator.calculate_composite_aqi_batch({
+            pollutant: [forecast[pollutant] for forecast in forecasts]
+            for pollutant in ('pm25', 'pm10', 'no2', 'o3')
+        })
+        for forecast, aqi_value in zip(forecasts, aqi_values):
+            forecast['aqi'] = aqi_calculator.get_aqi_category(int(round(aqi_value)))
+    
+    _forecast_cache[name] = (current_data.get('timestamp'), id(model), forecasts)
+    return forecasts
+
+def _build_alerts(aqi_value):
+    """Alerts for the current AQI value"""
+    alerts = []
+    
+    # Generate alerts based on AQI thresholds
+    if aqi_value > 200:
+        alerts.append({
+            'level': 'severe',
+            'title': 'Poor Air Quality Alert',
+            'message': 'Air quality is poor. Limit outdoor activities.',
+            'timestamp': datetime.now().isoformat()
+        })
+    elif aqi_value > 100:
+        alerts.append({
+            'level': 'moderate',
+            'title': 'Moderate Air Quality',
+            'message': 'Sensitive individuals should limit outdoor activities.',
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    return alerts
+
+def _project(value, fields):
+    """
+    Keep only the given dotted field paths (e.g. 'aqi.category') of a dict;
+    lists are projected element by element
+    """
+    if not fields:
+        return value
+    if isinstance(value, list):
+        return [_project(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    
+    # Group paths by their first segment; None marks "keep the whole field"
+    tree = {}
+    for field in fields:
+        head, _, rest = field.partition('.')
+        tree.setdefault(head, set()).add(rest or None)
+    
+    return {
+        head: value[head] if None in rests else _project(value[head], sorted(rests))
+        for head, rests in tree.items() if head in value
+    }
 
 @app.route('/')
 def home():
@@ -137,13 +331,10 @@ def home():
 def get_current_data():
     """Get current air quality data"""
     try:
-        result = data_processor.get_integrated_current_data()
+        # Shared snapshot already carries its validation results
+        result = _current_snapshot()
         
         if result['status'] == 'success':
-            # Validate data quality
-            validation = data_processor.validate_data_quality(result['data'])
-            result['data']['validation'] = validation
-            
             return jsonify(result)
         else:
             return jsonify(result), 500
@@ -159,7 +350,7 @@ def get_forecast():
     """Get 24-hour air quality forecast"""
     try:
         # Get current data for forecasting
-        current_result = data_processor.get_integrated_current_data()
+        current_result = _current_snapshot()
         
         if current_result['status'] != 'success':
             return jsonify({
@@ -167,34 +358,17 @@ def get_forecast():
                 'message': 'Failed to get current data for forecasting'
             }), 500
         
-        current_data = current_result['data']
-        air_quality_data = current_data.get('air_quality', {})
-        weather_data = current_data.get('weather', {})
+        forecasts = _build_forecast(current_result['data'])
         
-        # Generate forecast
-        forecasts = forecaster.predict_24h_forecast(air_quality_data, weather_data)
-        
-        # Calculate AQI for each forecast point
-        for forecast in forecasts:
-            pollutant_data = {
-                'pm25': forecast['pm25'],
-                'pm10': forecast['pm10'],
-                'no2': forecast['no2'],
-                'o3': forecast['o3']
-            }
-            
-            aqi_value = aqi_calculator.calculate_composite_aqi(pollutant_data)
-            aqi_info = aqi_calculator.get_aqi_category(aqi_value)
-            forecast['aqi'] = aqi_info
-        
-        return jsonify({
+        # ?format=columnar / msgpack shrink the 24 repeated forecast objects
+        return negotiated_response({
             'status': 'success',
             'data': {
                 'forecasts': forecasts,
                 'generated_at': datetime.now().isoformat(),
                 'location': Config.GOA_COORDINATES
             }
-        })
+        }, records_path=('data', 'forecasts'))
         
     except Exception as e:
         return jsonify({
@@ -207,8 +381,10 @@ def get_trends():
     """Get historical trends"""
     try:
         days = request.args.get('days', 7, type=int)
-        result = data_processor.get_historical_trends(days=days)
-        return jsonify(result)
+        # ?location=<name> for one location, otherwise all of them
+        location = request.args.get('location')
+        result = data_processor.get_historical_trends(days=days, location=location)
+        return negotiated_response(result, records_path=('data',))
         
     except Exception as e:
         return jsonify({
@@ -247,7 +423,7 @@ def get_alerts():
     """Get air quality alerts"""
     try:
         # Get current data
-        current_result = data_processor.get_integrated_current_data()
+        current_result = _current_snapshot()
         
         if current_result['status'] != 'success':
             return jsonify({
@@ -258,23 +434,7 @@ def get_alerts():
         current_aqi = current_result['data'].get('aqi', {})
         aqi_value = current_aqi.get('aqi', 0)
         
-        alerts = []
-        
-        # Generate alerts based on AQI thresholds
-        if aqi_value > 200:
-            alerts.append({
-                'level': 'severe',
-                'title': 'Poor Air Quality Alert',
-                'message': 'Air quality is poor. Limit outdoor activities.',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif aqi_value > 100:
-            alerts.append({
-                'level': 'moderate',
-                'title': 'Moderate Air Quality',
-                'message': 'Sensitive individuals should limit outdoor activities.',
-                'timestamp': datetime.now().isoformat()
-            })
+        alerts = _build_alerts(aqi_value)
         
         return jsonify({
             'status': 'success',
@@ -292,13 +452,75 @@ def get_alerts():
 
 @app.route('/api/train-model', methods=['POST'])
 def train_model():
-    """Manually trigger model training"""
+    """Queue model training on the background executor"""
     try:
-        result = forecaster.train_model()
+        def run():
+            new_forecaster = _new_forecaster()
+            return new_forecaster, new_forecaster.train_model()
+        
+        job = training_jobs.submit('full', run, _install_forecaster)
         return jsonify({
-            'status': 'success',
-            'data': result
-        })
+            'status': 'accepted',
+            'data': job
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/train-model/<string:job_id>', methods=['GET'])
+def get_training_job(job_id):
+    """Get status, metrics and duration of a training job"""
+    job = training_jobs.get(job_id)
+    
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown training job {job_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'data': job
+    })
+
+@app.route('/api/update-model', methods=['POST'])
+def update_model():
+    """Queue an incremental update from newly stored observations, with a full retrain on drift"""
+    try:
+        data = request.get_json(silent=True) or {}
+        auto_retrain = data.get('auto_retrain', True)
+        
+        def run():
+            store = data_processor.observation_store
+            # Load (or pick up a newer) saved model with its incremental state
+            forecaster.ensure_trained()
+            
+            # A model saved without incremental state (baseline MAE, normal equations):
+            # retrain a fresh forecaster, not one tuned for serving (n_jobs=1,
+            # warm-start estimator counts)
+            if not forecaster.is_trained or forecaster.baseline_mae is None:
+                new_forecaster = _new_forecaster()
+                return new_forecaster, new_forecaster.retrain_from_store(store)
+            
+            # Update a private copy so requests keep using the current model meanwhile
+            new_forecaster = copy.deepcopy(forecaster)
+            result = new_forecaster.update_from_store(store)
+            if auto_retrain and new_forecaster.needs_full_retrain():
+                new_forecaster = _new_forecaster()
+                result['full_retrain'] = new_forecaster.retrain_from_store(store)
+            elif result['status'] == 'updated':
+                # Other workers reload the saved artifact
+                new_forecaster.save_model()
+            return new_forecaster, result
+        
+        job = training_jobs.submit('incremental', run, _install_forecaster)
+        return jsonify({
+            'status': 'accepted',
+            'data': job
+        }), 202
         
     except Exception as e:
         return jsonify({
@@ -313,7 +535,7 @@ def get_health_recommendations():
         user_group = request.args.get('group', 'general')  # general, sensitive, elderly, children
         
         # Get current AQI
-        current_result = data_processor.get_integrated_current_data()
+        current_result = _current_snapshot()
         aqi_value = current_result['data'].get('aqi', {}).get('aqi', 0)
         
         recommendations = {
@@ -344,13 +566,7 @@ def get_health_recommendations():
 @app.route('/api/locations', methods=['GET'])
 def get_supported_locations():
     """Get list of supported locations in Goa"""
-    locations = [
-        {'name': 'Panaji', 'lat': 15.4909, 'lon': 73.8278, 'type': 'capital'},
-        {'name': 'Margao', 'lat': 15.2993, 'lon': 74.1240, 'type': 'city'},
-        {'name': 'Mapusa', 'lat': 15.5959, 'lon': 73.8137, 'type': 'town'},
-        {'name': 'Vasco da Gama', 'lat': 15.3947, 'lon': 73.8081, 'type': 'port'},
-        {'name': 'Ponda', 'lat': 15.4019, 'lon': 74.0070, 'type': 'town'}
-    ]
+    locations = Config.GOA_LOCATIONS
     
     return jsonify({
         'status': 'success',
@@ -364,18 +580,106 @@ def get_supported_locations():
 @app.route('/api/location/<string:location_name>/current', methods=['GET'])
 def get_location_data(location_name):
     """Get current data for specific location"""
-    # This would use the location coordinates to fetch specific data
-    # For now, return same data with location info
-    result = data_processor.get_integrated_current_data()
+    # Known locations use their own coordinates; unknown names get the Goa-wide data
+    result = _current_snapshot(_find_location(location_name))
     if result['status'] == 'success':
-        result['data']['requested_location'] = location_name
+        # Copy before annotating: the snapshot is shared
+        result = {**result, 'data': {**result['data'], 'requested_location': location_name}}
     return jsonify(result)
 
+# Sections available from /api/bulk, each assembled from a location's snapshot
+BULK_SECTIONS = {
+    'current': lambda data: data,
+    'forecast': lambda data: _build_forecast(data),
+    'alerts': lambda data: {
+        'alerts': _build_alerts(data.get('aqi', {}).get('aqi', 0)),
+        'current_aqi': data.get('aqi', {}).get('aqi', 0)
+    },
+    'pollutant_breakdown': lambda data: data.get('pollutant_breakdown')
+}
+
+_bulk_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='bulk')
+
+@app.route('/api/bulk', methods=['GET', 'POST'])
+def get_bulk_data():
+    """
+    Several sections for several locations in one response, with optional field projection.
+    POST {"locations": [...], "sections": [...], "fields": {"current": ["aqi.aqi", ...]}}
+    or GET ?locations=Panaji,Margao&sections=current,alerts&fields=current.aqi,forecast.pm25
+    """
+    try:
+        if request.method == 'POST':
+            body = request.get_json(silent=True) or {}
+            location_names = body.get('locations')
+            sections = body.get('sections') or list(BULK_SECTIONS)
+            fields = body.get('fields') or {}
+        else:
+            location_names = request.args.get('locations', type=lambda v: [n for n in v.split(',') if n])
+            sections = request.args.get('sections', type=lambda v: [n for n in v.split(',') if n]) or list(BULK_SECTIONS)
+            fields = {}
+            for path in request.args.get('fields', '').split(','):
+                section, _, field = path.partition('.')
+                if field:
+                    fields.setdefault(section, []).append(field)
+        
+        unknown_sections = [section for section in sections if section not in BULK_SECTIONS]
+        if unknown_sections:
+            return jsonify({
+                'status': 'error',
+                'message': f'Unknown sections: {unknown_sections}'
+            }), 400
+        
+        if location_names is None:
+            locations = list(Config.GOA_LOCATIONS)
+        else:
+            locations = [_find_location(name) or {'name': name, 'unknown': True} for name in location_names]
+        
+        # Fetch missing snapshots concurrently; fresh ones come straight from memory
+        requested_at = request.environ.get('airalert.requested_at')
+        known = [loc for loc in locations if not loc.get('unknown')]
+        snapshots = dict(zip(
+            [loc['name'] for loc in known],
+            _bulk_executor.map(
+                tracing.propagate(lambda loc: data_processor.get_snapshot(loc, requested_at=requested_at)), known
+            )
+        ))
+        
+        results = {}
+        for location in locations:
+            if location.get('unknown'):
+                results[location['name']] = {'status': 'error', 'message': 'Unknown location'}
+                continue
+            
+            snapshot = snapshots[location['name']]
+            if snapshot['status'] != 'success':
+                results[location['name']] = {'status': 'error', 'message': snapshot.get('message')}
+                continue
+            
+            results[location['name']] = {
+                'status': 'success',
+                **{
+                    section: _project(BULK_SECTIONS[section](snapshot['data']), fields.get(section))
+                    for section in sections
+                }
+            }
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'locations': results,
+                'sections': sections,
+                'generated_at': datetime.now().isoformat()
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/data-validation', methods=['GET'])
 def get_data_validation():
     """Compare and validate satellite vs ground-based data"""
     try:
-        # Mock comparison for deployment
+        # Mock comparison when the live components are unavailable
         comparison = {
             'satellite_no2': 45.2,
             'ground_no2': 42.8,
@@ -396,6 +700,19 @@ def get_data_validation():
             }
         }
         
+        if COMPONENTS_LOADED:
+            # Running satellite-vs-ground fit, read in O(1)
+            calibration = data_processor.calibration
+            summary = calibration.summary()
+            latest = summary['no2']['latest'] or {}
+            comparison.update({
+                'satellite_no2': calibration.calibrate('no2', latest.get('column')),
+                'ground_no2': latest.get('ground'),
+                'correlation': summary['no2']['agreement'],
+                'correlation_coefficient': summary['no2']['correlation'],
+                'calibration': summary
+            })
+        
         return jsonify({
             'status': 'success',
             'data': comparison
@@ -403,6 +720,34 @@ def get_data_validation():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/tiles/<string:layer>/<int:z>/<int:x>/<int:y>.<string:fmt>', methods=['GET'])
+def get_map_tile(layer, z, x, y, fmt):
+    """Heatmap tile from the TEMPO grid: PNG, or uint16 value tile with fmt=bin"""
+    if tile_renderer is None:
+        return jsonify({'status': 'error', 'message': 'Map tiles unavailable'}), 503
+    if layer not in LAYER_RANGES or fmt not in TILE_FORMATS:
+        return jsonify({'status': 'error', 'message': f'Unknown layer or format: {layer}.{fmt}'}), 404
+    if not (0 <= z <= Config.TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({'status': 'error', 'message': 'Tile coordinates out of range'}), 400
+    
+    try:
+        tile, version = tile_renderer.get_tile(layer, z, x, y, fmt)
+        if tile is None:
+            return jsonify({'status': 'error', 'message': 'No satellite grid ingested yet'}), 404
+        
+        response = Response(tile, mimetype=TILE_FORMATS[fmt])
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        response.headers['X-Grid-Version'] = str(version)
+        if fmt == 'bin':
+            low, high = LAYER_RANGES[layer]
+            response.headers['X-Value-Offset'] = repr(low)
+            response.headers['X-Value-Scale'] = repr((high - low) / (NO_DATA - 1))
+            response.headers['X-No-Data'] = str(NO_DATA)
+        response.set_etag(f'{version}-{layer}-{z}-{x}-{y}-{fmt}')
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/alerts/subscribe', methods=['POST'])
 def subscribe_alerts():
     """Subscribe to air quality alerts"""
@@ -423,7 +768,7 @@ def subscribe_alerts():
 @app.route('/api/emergency-alerts', methods=['GET'])
 def get_emergency_alerts():
     """Get emergency-level air quality alerts"""
-    current_result = data_processor.get_integrated_current_data()
+    current_result = _current_snapshot()
     aqi_value = current_result['data'].get('aqi', {}).get('aqi', 0)
     
     emergency_alerts = []
@@ -451,38 +796,14 @@ def get_emergency_alerts():
 def get_pollutant_breakdown():
     """Get individual AQI for each pollutant with health impacts"""
     try:
-        current_result = data_processor.get_integrated_current_data()
-        air_quality = current_result['data'].get('air_quality', {})
-        
-        pollutant_aqis = {}
-        health_impacts = {
-            'pm25': 'Respiratory and cardiovascular effects',
-            'pm10': 'Respiratory irritation, reduced lung function',
-            'no2': 'Respiratory inflammation, reduced immunity',
-            'o3': 'Respiratory irritation, chest pain',
-            'so2': 'Respiratory problems, eye irritation',
-            'co': 'Reduced oxygen delivery, heart problems'
-        }
-        
-        for pollutant, value in air_quality.items():
-            if value is not None:
-                individual_aqi = aqi_calculator.calculate_individual_aqi(value, pollutant)
-                aqi_info = aqi_calculator.get_aqi_category(individual_aqi)
-                
-                pollutant_aqis[pollutant] = {
-                    'value': value,
-                    'unit': 'µg/m³',
-                    'aqi': individual_aqi,
-                    'category': aqi_info.get('category') if aqi_info else 'Unknown',
-                    'health_impact': health_impacts.get(pollutant, 'Health impact data unavailable'),
-                    'is_primary_concern': individual_aqi == max([aqi_calculator.calculate_individual_aqi(v, k) for k, v in air_quality.items() if v is not None]) if individual_aqi else False
-                }
+        # Computed once per snapshot by the AQI engine; this is a pure read
+        current_result = _current_snapshot()
+        breakdown = current_result['data'].get('pollutant_breakdown', {})
         
         return jsonify({
             'status': 'success',
             'data': {
-                'pollutant_breakdown': pollutant_aqis,
-                'dominant_pollutant': max(pollutant_aqis.keys(), key=lambda k: pollutant_aqis[k]['aqi']) if pollutant_aqis else None,
+                **breakdown,
                 'timestamp': datetime.now().isoformat()
             }
         })
@@ -529,11 +850,16 @@ def get_api_documentation():
         },
         'machine_learning': {
             'model_type': 'Random Forest Regressor',
+            'estimator_backend': getattr(forecaster, 'backend', 'random_forest'),
             'features': ['Current pollutant levels', 'Weather conditions', 'Temporal patterns'],
             'forecast_horizon': '24 hours',
             'update_frequency': 'Real-time',
             'accuracy_metrics': 'MAE < 15 µg/m³ for PM2.5'
         },
+        'response_formats': {
+            'compression': 'gzip or br via Accept-Encoding',
+            'compact_encodings': 'format=columnar or format=msgpack (Accept: application/msgpack) on /api/forecast and /api/trends'
+        },
         'deployment_info': {
             'components_loaded': COMPONENTS_LOADED,
             'environment': 'production' if not os.environ.get('FLASK_ENV') == 'development' else 'development'
@@ -543,11 +869,90 @@ def get_api_documentation():
     
     return jsonify(docs)
 
+# Request trace inspection, off unless TRACE_ENDPOINT_ENABLED (traces expose request details)
+@app.route('/api/debug/traces')
+def get_debug_traces():
+    """
+    Recently kept request traces (slow, failed or sampled), newest first.
+    ?min_ms=<duration filter>&limit=<n>&format=otlp for OTLP/JSON
+    """
+    if not Config.TRACE_ENDPOINT_ENABLED:
+        return jsonify({'status': 'error', 'message': 'Not found'}), 404
+    
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        min_ms = request.args.get('min_ms', 0.0, type=float)
+        traces = tracing.tracer.recent(limit=limit, min_duration_ms=min_ms)
+        
+        if request.args.get('format') == 'otlp':
+            return jsonify({
+                'resourceSpans': [
+                    resource for _, spans in traces for resource in tracing.otlp_document(spans)['resourceSpans']
+                ]
+            })
+        
+        return jsonify({
+            'status': 'success',
+            'data': [tracing.trace_summary(root, spans) for root, spans in traces],
+            'sampling': {
+                'enabled': tracing.tracer.enabled,
+                'slow_ms': tracing.tracer.slow_ms,
+                'sample_rate': tracing.tracer.sample_rate
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+# Prometheus scrape endpoint
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metrics in text exposition format"""
+    if COMPONENTS_LOADED and data_processor.loaded:
+        for location, age in data_processor.snapshot_ages().items():
+            metrics.SNAPSHOT_AGE.labels(location).set(age)
+    
+    body = metrics.render_latest()
+    if body is None:
+        return Response('prometheus_client is not installed\n', status=503, mimetype='text/plain')
+    return Response(body, content_type=metrics.CONTENT_TYPE_LATEST)
+
 # Health check endpoint for deployment platforms
 @app.route('/health')
 def health_check():
     """Health check for deployment platforms"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()}), 200
+    health = {'status': 'healthy', 'timestamp': datetime.now().isoformat()}
+    if COMPONENTS_LOADED and data_processor.loaded:
+        # Circuit breaker state per upstream; an open breaker serves last good values, so still healthy
+        health['upstreams'] = {
+            'openaq': data_processor.openaq_api.guard.breaker.status(),
+            'open_meteo': data_processor.weather_api.guard.breaker.status()
+        }
+    return jsonify(health), 200
+
+def warm_up():
+    """
+    Pay the startup cost once: import the heavy modules, load (or train and
+    save) the forecast model and publish the first hourly weather forecast for
+    the workers to start from. Run before workers fork (PRELOAD_COMPONENTS=true
+    with gunicorn --preload) and they all share the result. The data processor
+    is still built in each worker: its SQLite connection and breaker threads
+    must not cross a fork.
+    """
+    if not COMPONENTS_LOADED:
+        return
+    
+    for module in ('models.data_processor', 'models.observation_store', 'models.feature_store',
+                   'api.tempo', 'api.openaq', 'api.weather'):
+        importlib.import_module(module)
+    forecaster.ensure_trained()
+    importlib.import_module('api.weather').WeatherAPI().forecast.refresh()
+
+if getattr(Config, 'PRELOAD_COMPONENTS', False):
+    warm_up()
 
 if __name__ == '__main__':
     # Get port from environment variable for deployment
@@ -569,7 +974,9 @@ if __name__ == '__main__':
         print("   - GET  /api/forecast              - 24h forecast")
         print("   - GET  /api/trends                - Historical trends")
         print("   - POST /api/aqi/calculate         - Calculate AQI")
-        print("   - POST /api/train-model           - Train ML model")
+        print("   - POST /api/train-model           - Train ML model (background job)")
+        print("   - GET  /api/train-model/<job_id>  - Training job status")
+        print("   - POST /api/update-model          - Incremental model update")
         print("")
         print("   === ALERT SYSTEM ===")
         print("   - GET  /api/alerts                - Air quality alerts")
@@ -583,6 +990,11 @@ if __name__ == '__main__':
         print("   === LOCATION SERVICES ===")
         print("   - GET  /api/locations             - Supported locations")
         print("   - GET  /api/location/<name>/current - Location-specific data")
+        print("   - GET/POST /api/bulk              - Many locations & sections in one call")
+        print("   - GET  /metrics                   - Prometheus metrics")
+        if Config.TRACE_ENDPOINT_ENABLED:
+            print("   - GET  /api/debug/traces          - Recent slow/sampled request traces")
+        print("   - GET  /api/tiles/<layer>/<z>/<x>/<y>.png - Satellite heatmap tiles")
         print("")
         print("   === DATA VALIDATION ===")
         print("   - GET  /api/data-validation       - Compare data sources")
@@ -590,7 +1002,7 @@ if __name__ == '__main__':
         print("   === API DOCUMENTATION ===")
         print("   - GET  /api/docs                  - Complete API documentation")
         print("")
-        print("📊 Total: 15 endpoints | 🌐 Server: http://localhost:5000")
+        print("📊 Total: 21 endpoints | 🌐 Server: http://localhost:5000")
         print("🏆 Ready for NASA Space Apps Challenge 2025!")
     
     app.run(debug=debug_mode, host='0.0.0.0', port=port)
@@ -0,0 +1,163 @@
+"""
+ASGI serving mode for the AirAlert Pro API
+
+    uvicorn asgi:application --workers 4
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+
+The Flask routes in app.py are served unchanged. Before a request that reads
+current data reaches them, the snapshots it needs are refreshed on the event
+loop with an async HTTP client, so the Flask handler itself only reads memory.
+Waiting on slow upstreams therefore holds no worker thread, and one process can
+keep thousands of requests in flight. The sync mode (gunicorn app:app) is
+unchanged.
+"""
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, unquote
+
+import httpx
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgiInstance
+
+from app import app, data_processor, _find_location, Config
+from utils import tracing
+
+# Routes served from the default-location snapshot
+SNAPSHOT_ROUTES = {
+    '/api/current',
+    '/api/forecast',
+    '/api/alerts',
+    '/api/health-recommendations',
+    '/api/emergency-alerts',
+    '/api/pollutant-breakdown'
+}
+
+
+class _WsgiInstance(WsgiToAsgiInstance):
+    """asgiref's WSGI adapter, tagging the environ with the request's arrival time"""
+
+    def __init__(self, wsgi_application, requested_at):
+        super().__init__(wsgi_application)
+        self.requested_at = requested_at
+
+    def build_environ(self, scope, body):
+        environ = super().build_environ(scope, body)
+        # Lets the handler use the snapshots prefetched for this request (see app._current_snapshot)
+        environ['airalert.requested_at'] = self.requested_at
+        return environ
+
+
+class AsyncSnapshotApp:
+    """
+    ASGI application: prefetch snapshots asynchronously, then hand the request to Flask
+    """
+
+    def __init__(self, wsgi_app, processor):
+        self.wsgi_app = wsgi_app
+        self.processor = processor
+        self.client = None
+
+    def _http_client(self):
+        """Shared connection-pooled client, created inside the serving loop"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=10,
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+            )
+        return self.client
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._http_client()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.client is not None:
+                    await self.client.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        """Buffer the request body; None if the client disconnected first"""
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return body
+
+    @staticmethod
+    def _locations_for(scope, body):
+        """
+        Locations whose snapshots the request will read ([None] = default location),
+        or None for routes that need no current data
+        """
+        path = scope['path']
+        if path in SNAPSHOT_ROUTES:
+            return [None]
+
+        if path.startswith('/api/location/') and path.endswith('/current'):
+            name = unquote(path[len('/api/location/'):-len('/current')])
+            return [_find_location(name)]
+
+        if path == '/api/bulk':
+            names = None
+            if scope['method'] == 'POST':
+                try:
+                    names = (json.loads(body or b'{}') or {}).get('locations')
+                except (ValueError, AttributeError):
+                    names = None
+            else:
+                query = parse_qs(scope.get('query_string', b'').decode())
+                if 'locations' in query:
+                    names = [n for n in query['locations'][0].split(',') if n]
+
+            if names is None:
+                return list(Config.GOA_LOCATIONS)
+            # Unknown names are reported by the handler; nothing to fetch for them
+            return [loc for loc in map(_find_location, names) if loc]
+
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        if scope['type'] != 'http':
+            return
+
+        requested_at = time.monotonic()
+        # The body is buffered up front (the bulk route needs it) and replayed to Flask
+        body = await self._read_body(receive)
+        if body is None:
+            return
+
+        # Root span covering the prefetch and the Flask request span (which runs as its child)
+        headers = dict(scope.get('headers') or [])
+        traceparent = headers.get(b'traceparent', b'').decode('latin-1')
+        with tracing.span(f"ASGI {scope['method']} {scope['path']}", {'http.method': scope['method']},
+                          remote_parent=tracing.parse_traceparent(traceparent)):
+            if hasattr(self.processor, 'get_snapshot_async'):
+                locations = self._locations_for(scope, body)
+                if locations:
+                    client = self._http_client()
+                    with tracing.span('asgi.prefetch', {'locations': len(locations)}):
+                        await asyncio.gather(*(
+                            self.processor.get_snapshot_async(location, client, requested_at)
+                            for location in locations
+                        ))
+
+            async def replay():
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            # A thread per request context, instead of asgiref's single shared thread for all Flask calls
+            async with ThreadSensitiveContext():
+                await _WsgiInstance(self.wsgi_app, requested_at)(scope, replay, send)
+
+
+application = AsyncSnapshotApp(app, data_processor)
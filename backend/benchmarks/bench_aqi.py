@@ -0,0 +1,33 @@
+"""AQI calculation: per-reading scalar path vs the array batch path"""
+import numpy as np
+import pytest
+
+from utils.aqi_calculator import AQICalculator
+
+POLLUTANTS = ('pm25', 'pm10', 'no2', 'o3', 'so2', 'co')
+
+
+@pytest.fixture(scope='module', params=[24, 1000], ids=lambda n: f'{n}_readings')
+def readings(request):
+    rng = np.random.default_rng(7)
+    scales = {'pm25': 120, 'pm10': 250, 'no2': 150, 'o3': 200, 'so2': 100, 'co': 5}
+    return {pollutant: rng.uniform(0, scale, request.param) for pollutant, scale in scales.items()}
+
+
+@pytest.mark.benchmark(group='aqi-composite')
+def bench_composite_aqi_scalar(benchmark, readings):
+    rows = [dict(zip(POLLUTANTS, values)) for values in zip(*(readings[p].tolist() for p in POLLUTANTS))]
+    result = benchmark(lambda: [AQICalculator.calculate_composite_aqi(row) for row in rows])
+    assert len(result) == len(rows)
+
+
+@pytest.mark.benchmark(group='aqi-composite')
+def bench_composite_aqi_batch(benchmark, readings):
+    result = benchmark(AQICalculator.calculate_composite_aqi_batch, readings)
+    assert len(result) == len(readings['pm25'])
+
+
+@pytest.mark.benchmark(group='aqi-breakdown')
+def bench_pollutant_breakdown(benchmark, reading):
+    result = benchmark(AQICalculator.pollutant_breakdown, reading['air_quality'])
+    assert result['dominant_pollutant']
@@ -0,0 +1,46 @@
+"""Satellite-vs-ground calibration: running fit cost and agreement with numpy"""
+import numpy as np
+import pytest
+
+from models.calibration import RunningRegression
+
+
+@pytest.fixture(scope='module')
+def pairs():
+    """A year of hourly (TEMPO column, ground NO2) pairs for five locations"""
+    rng = np.random.default_rng(11)
+    column = rng.gamma(4, 1.5e15, 24 * 365 * 5)
+    ground = 2.0 + 6e-15 * column + rng.normal(0, 4, column.size)
+    return column, ground
+
+
+def _assert_matches_numpy(fit, column, ground):
+    slope, intercept = np.polyfit(column, ground, 1)
+    assert fit.n == column.size
+    assert fit.slope == pytest.approx(slope, rel=1e-9)
+    assert fit.intercept == pytest.approx(intercept, rel=1e-9)
+    assert fit.correlation == pytest.approx(np.corrcoef(column, ground)[0, 1], rel=1e-9)
+
+
+@pytest.mark.benchmark(group='calibration')
+def bench_merge_arrays(benchmark, pairs):
+    column, ground = pairs
+
+    def fit_all():
+        fit = RunningRegression()
+        fit.merge_arrays(column, ground)
+        return fit
+
+    _assert_matches_numpy(benchmark(fit_all), column, ground)
+
+
+def bench_update_and_merge_agree(pairs):
+    """Welford updates and Chan merges of uneven batches give the numpy fit"""
+    column, ground = pairs
+    fit = RunningRegression()
+    for x, y in zip(column[:500], ground[:500]):
+        fit.update(x, y)
+    for batch in np.array_split(np.arange(500, column.size), [1, 7, 2000]):
+        fit.merge_arrays(column[batch], ground[batch])
+    fit.merge_arrays([], [])
+    _assert_matches_numpy(fit, column, ground)
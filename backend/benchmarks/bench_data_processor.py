@@ -0,0 +1,46 @@
+"""DataProcessor integration and validation steps"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.benchmark(group='data-processor')
+def bench_integrate_air_quality_data(benchmark, processor, reading):
+    result = benchmark(processor._integrate_air_quality_data, reading['tempo'], reading['openaq'])
+    assert result['pm25'] == reading['openaq']['pm25']
+
+
+@pytest.mark.benchmark(group='data-processor')
+def bench_validate_data_quality(benchmark, processor, reading):
+    result = benchmark(processor.validate_data_quality, reading)
+    assert 'confidence_score' in result
+
+
+@pytest.mark.benchmark(group='data-processor')
+def bench_get_integrated_current_data(benchmark, processor, no_snapshot_cache):
+    result = benchmark(processor.get_integrated_current_data)
+    assert result['status'] == 'success'
+
+
+@pytest.fixture(scope='module')
+def observation_history():
+    """A year of hourly readings for every location, as backfill would ingest them"""
+    from config import Config
+    from models.data_quality import POLLUTANTS
+
+    rng = np.random.default_rng(7)
+    start = datetime(2025, 1, 1)
+    return [
+        {'location': location['name'], 'observed_at': (start + timedelta(hours=hour)).isoformat(),
+         **dict(zip(POLLUTANTS, rng.gamma(4, [12, 22, 8, 18, 4, 0.3])))}
+        for location in Config.GOA_LOCATIONS for hour in range(24 * 365)
+    ]
+
+
+@pytest.mark.benchmark(group='data-quality')
+def bench_flag_observations(benchmark, observation_history):
+    from models.data_quality import flag_observations
+
+    rows = benchmark(flag_observations, observation_history)
+    assert all('quality_flags' in row for row in rows)
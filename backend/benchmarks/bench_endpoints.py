@@ -0,0 +1,33 @@
+"""Full request round-trips through the Flask test client with stubbed upstreams"""
+import pytest
+
+ROUTES = [
+    '/api/current',
+    '/api/forecast',
+    '/api/alerts',
+    '/api/pollutant-breakdown',
+    '/api/trends',
+    '/api/location/Panaji/current',
+    '/api/bulk?locations=Panaji,Margao,Mapusa,Vasco da Gama,Ponda&sections=current,forecast'
+]
+
+
+def _get(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, path
+    return response
+
+
+@pytest.mark.benchmark(group='endpoints-cached')
+@pytest.mark.parametrize('path', ROUTES)
+def bench_endpoint_cached(benchmark, client, path):
+    """Snapshot and forecast served from memory (steady state between refreshes)"""
+    _get(client, path)
+    benchmark(_get, client, path)
+
+
+@pytest.mark.benchmark(group='endpoints-refresh')
+@pytest.mark.parametrize('path', ROUTES)
+def bench_endpoint_refresh(benchmark, client, path, no_snapshot_cache):
+    """Every request refetches (stubbed) upstreams, re-integrates and re-forecasts"""
+    benchmark(_get, client, path)
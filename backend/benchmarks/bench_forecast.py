@@ -0,0 +1,48 @@
+"""AirQualityForecaster feature preparation, inference and training"""
+import pytest
+
+from models.forecast import AirQualityForecaster
+
+
+@pytest.fixture(scope='module')
+def lag_features(processor):
+    return processor.get_lag_features('Goa, India')
+
+
+@pytest.fixture(scope='module')
+def future_weather(processor):
+    return processor.get_future_weather('Goa, India')
+
+
+@pytest.mark.benchmark(group='forecast-inference')
+def bench_prepare_features(benchmark, forecaster, reading, lag_features):
+    benchmark(forecaster.prepare_features, reading['air_quality'], reading['weather'], lag_features)
+
+
+@pytest.mark.benchmark(group='forecast-inference')
+def bench_predict_24h_forecast(benchmark, forecaster, reading, lag_features):
+    result = benchmark(forecaster.predict_24h_forecast, reading['air_quality'], reading['weather'], lag_features)
+    assert len(result) == 24
+
+
+@pytest.mark.benchmark(group='forecast-inference')
+def bench_predict_24h_forecast_future_weather(benchmark, forecaster, reading, lag_features, future_weather):
+    result = benchmark(forecaster.predict_24h_forecast, reading['air_quality'], reading['weather'],
+                       lag_features, future_weather)
+    assert len(result) == 24 and 'boundary_layer_height' in result[0]['weather']
+
+
+@pytest.mark.benchmark(group='forecast-training')
+def bench_generate_training_data(benchmark):
+    df = benchmark(AirQualityForecaster().generate_training_data, days=60)
+    assert len(df) > 0
+
+
+@pytest.mark.benchmark(group='forecast-training')
+def bench_train_model(benchmark):
+    df = AirQualityForecaster().generate_training_data(days=60)
+    # A few full fits are enough for a stable median; each includes cross-validation
+    result = benchmark.pedantic(
+        lambda: AirQualityForecaster().train_model(save=False, df=df), rounds=3, iterations=1
+    )
+    assert result['mae'] > 0
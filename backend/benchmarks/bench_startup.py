@@ -0,0 +1,46 @@
+"""
+Cold import of the app: time budget and heavy dependencies kept off the import path
+
+The budget covers ``import app`` as reported by ``python -X importtime`` in a
+fresh interpreter (interpreter start-up and site imports are not counted).
+Override it with IMPORT_BUDGET_MS on slow machines.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 600))
+
+# Loaded on first use (or by app.warm_up), never by importing the app
+DEFERRED_MODULES = ('pandas', 'sklearn', 'joblib', 'requests', 'models.data_processor', 'models.forecast')
+
+
+def _import_app():
+    """(cumulative microseconds for `import app`, modules loaded) from a fresh interpreter"""
+    script = 'import sys, app; print(",".join(sys.modules))'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=BACKEND_DIR, env=dict(os.environ, PRELOAD_COMPONENTS='false'),
+        capture_output=True, text=True, check=True
+    )
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative = next(
+        int(line.split('|')[1]) for line in result.stderr.splitlines()
+        if line.startswith('import time:') and line.split('|')[-1].strip() == 'app'
+    )
+    return cumulative, set(result.stdout.strip().split(','))
+
+
+@pytest.mark.benchmark(group='startup')
+def bench_import_app(benchmark):
+    # Fresh interpreters are slow; a few rounds give a stable median
+    cumulative_us, modules = benchmark.pedantic(_import_app, rounds=5, iterations=1)
+
+    assert cumulative_us / 1000 < IMPORT_BUDGET_MS, (
+        f'import app took {cumulative_us / 1000:.0f} ms, budget is {IMPORT_BUDGET_MS:.0f} ms'
+    )
+    loaded = sorted(name for name in DEFERRED_MODULES if name in modules)
+    assert not loaded, f'importing the app loaded {loaded}'
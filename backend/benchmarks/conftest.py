@@ -0,0 +1,121 @@
+"""
+Benchmarks for the backend hot paths (pytest-benchmark)
+
+Run from backend/ after installing the test tools:
+
+    pip install -r requirements-dev.txt
+
+    python -m pytest benchmarks --benchmark-autosave       # save results/<machine>/NNNN_<commit>.json
+    python -m pytest benchmarks --benchmark-compare         # compare against the last saved run
+    python -m pytest benchmarks --benchmark-compare-fail=median:10%
+    python -m pytest benchmarks -k aqi                      # one group
+
+Upstream APIs are stubbed in-process with the loadtest stub bodies, and all
+on-disk state (observation store, shared upstream cache, TEMPO grid, tiles)
+goes to a temporary directory, so results do not depend on the network or on
+data left behind by a running server.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STATE_DIR = tempfile.mkdtemp(prefix='airalert-bench-')
+
+# Before anything imports config: keep benchmark state out of backend/data
+os.environ.setdefault('OBSERVATION_DB_PATH', os.path.join(_STATE_DIR, 'observations.db'))
+os.environ.setdefault('UPSTREAM_SHARE_DIR', os.path.join(_STATE_DIR, 'upstream'))
+os.environ.setdefault('TEMPO_GRANULE_DIR', os.path.join(_STATE_DIR, 'tempo', 'granules'))
+os.environ.setdefault('TEMPO_CACHE_DIR', os.path.join(_STATE_DIR, 'tempo', 'cache'))
+os.environ.setdefault('TEMPO_GRID_DIR', os.path.join(_STATE_DIR, 'tempo', 'grid'))
+os.environ.setdefault('TILE_DIR', os.path.join(_STATE_DIR, 'tiles'))
+os.environ.setdefault('TRAINING_JOB_DIR', os.path.join(_STATE_DIR, 'training_jobs'))
+os.environ.setdefault('TRACE_LOG_PATH', '')
+
+# Saved models are loaded from paths relative to backend/
+os.chdir(BACKEND_DIR)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import pytest
+
+
+class StubResponse:
+    """Just enough of a requests/httpx response for the API clients' result parsers"""
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+def stub_upstreams(processor):
+    """Answer OpenAQ and Open-Meteo fetches locally, still going through response parsing, breakers and caches"""
+    from loadtest.stub_upstream import openaq_latest, open_meteo_current, open_meteo_forecast
+
+    openaq, weather = processor.openaq_api, processor.weather_api
+
+    async def openaq_async(client, lat, lon, radius):
+        return openaq._latest_result(StubResponse(openaq_latest()))
+
+    async def weather_async(client, lat, lon):
+        return weather._current_result(StubResponse(open_meteo_current()))
+
+    openaq._fetch_latest = lambda lat, lon, radius: openaq._latest_result(StubResponse(openaq_latest()))
+    openaq._fetch_latest_async = openaq_async
+    weather._fetch_current = lambda lat, lon: weather._current_result(StubResponse(open_meteo_current()))
+    weather._fetch_current_async = weather_async
+    weather.get_hourly_forecast = lambda points, days=None: weather._forecast_result(
+        StubResponse(open_meteo_forecast(weather._forecast_params(points, days)))
+    )
+    weather.forecast.refresh()
+
+
+@pytest.fixture(scope='session')
+def backend():
+    """The app module with stubbed upstreams"""
+    random.seed(42)
+    import app
+    if not app.COMPONENTS_LOADED:
+        pytest.skip('backend components failed to load')
+    stub_upstreams(app.data_processor)
+    return app
+
+
+@pytest.fixture(scope='session')
+def processor(backend):
+    return backend.data_processor
+
+
+@pytest.fixture(scope='session')
+def forecaster(backend):
+    return backend.forecaster
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
+
+
+@pytest.fixture
+def no_snapshot_cache(backend, monkeypatch):
+    """Every request refreshes its snapshot (full upstream -> integrate -> AQI path)"""
+    monkeypatch.setattr(backend.Config, 'SNAPSHOT_TTL_SECONDS', 0)
+    for api in (backend.data_processor.openaq_api, backend.data_processor.weather_api):
+        monkeypatch.setattr(api.guard.shared, 'interval', 0)
+
+
+@pytest.fixture(scope='session')
+def reading():
+    """A typical integrated current reading"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'air_quality': {'pm25': 48.2, 'pm10': 91.5, 'no2': 31.0, 'o3': 72.4, 'so2': 14.8, 'co': 1.3},
+        'weather': {'temperature': 29.1, 'humidity': 74.0, 'wind_speed': 9.6, 'wind_direction': 240.0},
+        'tempo': {'no2_column': 2.1e15, 'o3_column': 8.5e18, 'hcho_column': 6.2e15, 'column_units': 'molecules/cm^2'},
+        'openaq': {'pm25': 48.2, 'pm10': 91.5, 'no2': 31.0, 'o3': 72.4, 'so2': 14.8, 'co': 1.3}
+    }
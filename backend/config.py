@@ -7,11 +7,52 @@ class Config:
     # NASA TEMPO API
     NASA_TOKEN = os.getenv('NASA_TOKEN', 'your_nasa_earthdata_token_here')
     
+    # TEMPO granule ingestion: local granule directory, optional mirror and subset cache
+    TEMPO_GRANULE_DIR = os.getenv('TEMPO_GRANULE_DIR', 'data/tempo/granules')
+    TEMPO_CACHE_DIR = os.getenv('TEMPO_CACHE_DIR', 'data/tempo/cache')
+    TEMPO_MIRROR_URL = os.getenv('TEMPO_MIRROR_URL')
+    TEMPO_INGEST_INTERVAL_SECONDS = int(os.getenv('TEMPO_INGEST_INTERVAL_SECONDS', 600))
+    
+    # Shared memory-mapped grid of the latest TEMPO columns (resolution in degrees)
+    TEMPO_GRID_DIR = os.getenv('TEMPO_GRID_DIR', 'data/tempo/grid')
+    TEMPO_GRID_RESOLUTION = float(os.getenv('TEMPO_GRID_RESOLUTION', 0.02))
+    
+    # Heatmap tiles rendered from the TEMPO grid
+    TILE_DIR = os.getenv('TILE_DIR', 'data/tiles')
+    TILE_CACHE_SIZE = int(os.getenv('TILE_CACHE_SIZE', 4096))
+    TILE_PRERENDER_ZOOMS = [int(z) for z in os.getenv('TILE_PRERENDER_ZOOMS', '8,9,10,11,12').split(',')]
+    TILE_MAX_ZOOM = int(os.getenv('TILE_MAX_ZOOM', 16))
+    
     # OpenAQ API
     OPENAQ_API_KEY = os.getenv('OPENAQ_API_KEY', 'your_openaq_api_key_here')
     
+    OPENAQ_API_URL = os.getenv('OPENAQ_API_URL', 'https://api.openaq.org/v2')
+    
+    # Per-source circuit breakers: open when the failure rate over the last
+    # BREAKER_WINDOW calls (at least BREAKER_MIN_CALLS) reaches BREAKER_FAILURE_RATE
+    BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', 20))
+    BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 5))
+    BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', 0.5))
+    BREAKER_OPEN_SECONDS = int(os.getenv('BREAKER_OPEN_SECONDS', 30))
+    
+    # Cross-process sharing of upstream results: one worker fetches each source and
+    # location per UPSTREAM_SHARE_SECONDS, the others read its published result
+    UPSTREAM_SHARE_DIR = os.getenv('UPSTREAM_SHARE_DIR', 'data/upstream')
+    UPSTREAM_SHARE_SECONDS = int(os.getenv('UPSTREAM_SHARE_SECONDS', 60))
+    UPSTREAM_SHARE_WAIT_SECONDS = int(os.getenv('UPSTREAM_SHARE_WAIT_SECONDS', 15))
+    # A failed attempt is only shared this long, so the next worker soon retries the upstream
+    UPSTREAM_SHARE_RETRY_SECONDS = int(os.getenv('UPSTREAM_SHARE_RETRY_SECONDS', 10))
+    
     # Weather API (Open-Meteo is free)
-    WEATHER_API_URL = 'https://api.open-meteo.com/v1/forecast'
+    WEATHER_API_URL = os.getenv('WEATHER_API_URL', 'https://api.open-meteo.com/v1/forecast')
+    WEATHER_ARCHIVE_URL = os.getenv('WEATHER_ARCHIVE_URL', 'https://archive-api.open-meteo.com/v1/archive')
+    
+    # Hourly weather forecast for every location: one multi-coordinate request per cycle
+    WEATHER_FORECAST_REFRESH_SECONDS = int(os.getenv('WEATHER_FORECAST_REFRESH_SECONDS', 3600))
+    WEATHER_FORECAST_DAYS = int(os.getenv('WEATHER_FORECAST_DAYS', 3))
+    
+    # Time zone of the Goa locations: Open-Meteo and OpenAQ local times, backfilled hours
+    LOCAL_TIMEZONE = 'Asia/Kolkata'
     
     # Goa coordinates for data fetching
     GOA_COORDINATES = {
@@ -30,6 +71,93 @@ class Config:
         'Severe': {'min': 401, 'max': 500, 'color': '#7e0023'}
     }
     
+    # Bounding box of Goa used to subset satellite granules
+    GOA_BBOX = {
+        'min_lat': 14.85,
+        'max_lat': 15.85,
+        'min_lon': 73.60,
+        'max_lon': 74.40
+    }
+    
+    # Monitoring locations across Goa
+    GOA_LOCATIONS = [
+        {'name': 'Panaji', 'lat': 15.4909, 'lon': 73.8278, 'type': 'capital'},
+        {'name': 'Margao', 'lat': 15.2993, 'lon': 74.1240, 'type': 'city'},
+        {'name': 'Mapusa', 'lat': 15.5959, 'lon': 73.8137, 'type': 'town'},
+        {'name': 'Vasco da Gama', 'lat': 15.3947, 'lon': 73.8081, 'type': 'port'},
+        {'name': 'Ponda', 'lat': 15.4019, 'lon': 74.0070, 'type': 'town'}
+    ]
+    
+    # Seconds an integrated current-data snapshot is shared before refetching upstream
+    SNAPSHOT_TTL_SECONDS = int(os.getenv('SNAPSHOT_TTL_SECONDS', 60))
+    
+    # Response compression (gzip/brotli) for bodies at least this many bytes
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+    
+    # Forecasting model backend: random_forest, hist_gradient_boosting or linear
+    FORECAST_BACKEND = os.getenv('FORECAST_BACKEND', 'random_forest')
+    
+    # Model training: rolling-origin CV folds and per-location training processes (0 = all cores)
+    TRAINING_CV_SPLITS = int(os.getenv('TRAINING_CV_SPLITS', 5))
+    TRAINING_WORKERS = int(os.getenv('TRAINING_WORKERS', 0))
+    
+    # Incremental model updates and drift-triggered full retrains
+    INCREMENTAL_TREES = int(os.getenv('INCREMENTAL_TREES', 10))
+    INCREMENTAL_MAX_TREES = int(os.getenv('INCREMENTAL_MAX_TREES', 150))
+    # Trees and boosting iterations added by an update are fitted on this many recent hours
+    INCREMENTAL_WINDOW_HOURS = int(os.getenv('INCREMENTAL_WINDOW_HOURS', 24 * 7))
+    INCREMENTAL_BOOSTING_ITERS = int(os.getenv('INCREMENTAL_BOOSTING_ITERS', 20))
+    INCREMENTAL_MAX_BATCHES = int(os.getenv('INCREMENTAL_MAX_BATCHES', 24))
+    DRIFT_MAE_RATIO = float(os.getenv('DRIFT_MAE_RATIO', 1.5))
+    # Smaller batches are too noisy to judge drift by their MAE
+    DRIFT_MIN_BATCH_ROWS = int(os.getenv('DRIFT_MIN_BATCH_ROWS', 24))
+    
+    # Training job records shared by all workers, and how often each worker checks
+    # for a model saved by another one
+    TRAINING_JOB_DIR = os.getenv('TRAINING_JOB_DIR', 'data/training_jobs')
+    MODEL_RELOAD_CHECK_SECONDS = float(os.getenv('MODEL_RELOAD_CHECK_SECONDS', 5))
+    MIN_STORE_TRAINING_ROWS = int(os.getenv('MIN_STORE_TRAINING_ROWS', 24 * 14))
+    
+    # Satellite-vs-ground calibration: TEMPO columns fill missing surface values once the
+    # running fit has this many co-located hours and at least this correlation
+    CALIBRATION_MIN_PAIRS = int(os.getenv('CALIBRATION_MIN_PAIRS', 48))
+    CALIBRATION_MIN_CORRELATION = float(os.getenv('CALIBRATION_MIN_CORRELATION', 0.3))
+    # Seconds between merges of newly closed hours into the fit (every worker reads the same
+    # store), and between full refits, which take in backfilled and later-updated hours
+    CALIBRATION_REFRESH_SECONDS = float(os.getenv('CALIBRATION_REFRESH_SECONDS', 300))
+    CALIBRATION_REBUILD_SECONDS = float(os.getenv('CALIBRATION_REBUILD_SECONDS', 6 * 3600))
+    
+    # Local hourly observation store
+    OBSERVATION_DB_PATH = os.getenv('OBSERVATION_DB_PATH', 'data/observations.db')
+    
+    # Historical backfill (python -m models.backfill): days per chunk, chunks fetched at once,
+    # requests per second per source, retries per request and the resumable checkpoint file
+    BACKFILL_CHUNK_DAYS = int(os.getenv('BACKFILL_CHUNK_DAYS', 7))
+    BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 8))
+    BACKFILL_RATE_LIMITS = {
+        'openaq': float(os.getenv('BACKFILL_OPENAQ_RPS', 1)),
+        'open_meteo': float(os.getenv('BACKFILL_OPEN_METEO_RPS', 5)),
+        'tempo': float(os.getenv('BACKFILL_TEMPO_RPS', 10))
+    }
+    BACKFILL_MAX_RETRIES = int(os.getenv('BACKFILL_MAX_RETRIES', 4))
+    BACKFILL_CHECKPOINT_PATH = os.getenv('BACKFILL_CHECKPOINT_PATH', 'data/backfill_checkpoint.json')
+    
+    # Import the heavy modules and load the forecast model at app import (for gunicorn --preload)
+    # instead of on first use in every worker
+    PRELOAD_COMPONENTS = os.getenv('PRELOAD_COMPONENTS', 'false').lower() == 'true'
+    
+    # Request tracing: traces slower than TRACE_SLOW_MS (or failed) are always kept,
+    # others with probability TRACE_SAMPLE_RATE; optional OTLP/JSON lines log
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+    TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', 500))
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.01))
+    TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 200))
+    TRACE_LOG_PATH = os.getenv('TRACE_LOG_PATH', '')
+    # /api/debug/traces is unauthenticated: only serve it where that is acceptable
+    TRACE_ENDPOINT_ENABLED = os.getenv('TRACE_ENDPOINT_ENABLED', 'false').lower() == 'true'
+    
     # Flask Config
     DEBUG = True
     SECRET_KEY = 'your_secret_key_here'
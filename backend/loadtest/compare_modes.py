@@ -0,0 +1,168 @@
+"""
+Load-test the sync (gunicorn sync workers) and async (ASGI) serving modes against a stub upstream
+
+    python -m loadtest.compare_modes --workers 2 --concurrency 200 --duration 20 --latency-ms 500
+
+Run from the backend directory. Snapshot and shared-result reuse are disabled
+(SNAPSHOT_TTL_SECONDS=0, UPSTREAM_SHARE_SECONDS=0) so every request depends on
+the upstream unless it joins a fetch already in flight; requests rotate over
+the configured Goa locations.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from config import Config
+
+SERVER_COMMANDS = {
+    'sync': ['gunicorn', 'app:app', '--worker-class', 'sync'],
+    # Longer keep-alive: gunicorn's 2 s default makes uvicorn drop pooled client connections mid-run
+    'async': ['gunicorn', 'asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker', '--keep-alive', '30']
+}
+
+
+def start_process(command, env=None):
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_process(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def wait_until_up(url, timeout=300):
+    """Poll until the server answers (model loading/training can take a while on first start)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f'{url} did not come up within {timeout}s')
+
+
+async def drive(base_url, paths, concurrency, duration, timeout):
+    """
+    Closed-loop load: ``concurrency`` virtual users issue requests back to back for ``duration`` seconds
+    """
+    latencies = []
+    errors = {'timeout': 0, 'http': 0, 'connection': 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        deadline = time.monotonic() + duration
+
+        async def user(index):
+            n = index
+            while time.monotonic() < deadline:
+                path = paths[n % len(paths)]
+                n += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors['http'] += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+                except httpx.TimeoutException:
+                    errors['timeout'] += 1
+                except httpx.HTTPError:
+                    errors['connection'] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1)
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        summary.update({'p50_ms': round(p50, 1), 'p95_ms': round(p95, 1), 'p99_ms': round(p99, 1)})
+    return summary
+
+
+def run_mode(mode, args, upstream_url):
+    """Start one serving mode against the stub upstream, load it, stop it"""
+    port = args.port
+    env = dict(
+        os.environ,
+        OPENAQ_API_URL=f'{upstream_url}/v2',
+        WEATHER_API_URL=f'{upstream_url}/v1/forecast',
+        SNAPSHOT_TTL_SECONDS='0',
+        UPSTREAM_SHARE_SECONDS='0'
+    )
+    command = SERVER_COMMANDS[mode] + [
+        '--workers', str(args.workers), '--bind', f'127.0.0.1:{port}', '--timeout', '600', '--backlog', '4096'
+    ]
+    server = start_process(command, env=env)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_until_up(f'{base_url}/health')
+        paths = [f"/api/location/{location['name']}/current" for location in Config.GOA_LOCATIONS]
+        # Warm every worker's model and connections before measuring
+        asyncio.run(drive(base_url, paths, args.workers * 2, 3, args.timeout))
+        return asyncio.run(drive(base_url, paths, args.concurrency, args.duration, args.timeout))
+    finally:
+        stop_process(server)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare sync and async serving modes')
+    parser.add_argument('--modes', nargs='+', default=['sync', 'async'], choices=sorted(SERVER_COMMANDS))
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--timeout', type=float, default=30, help='client timeout per request (s)')
+    parser.add_argument('--latency-ms', type=float, default=500, help='stub upstream latency')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--upstream-port', type=int, default=9100)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    # Train and save a missing/outdated model once, before the workers race to do it
+    subprocess.run([sys.executable, '-c', 'import app; app.warm_up()'], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    upstream_url = f'http://127.0.0.1:{args.upstream_port}'
+    upstream = start_process([
+        sys.executable, '-m', 'loadtest.stub_upstream',
+        '--port', str(args.upstream_port), '--latency-ms', str(args.latency_ms)
+    ])
+    try:
+        wait_until_up(f'{upstream_url}/v2/latest')
+        results = {}
+        for mode in args.modes:
+            print(f'Running {mode} mode...')
+            results[mode] = run_mode(mode, args, upstream_url)
+            print(f'  {mode}: {results[mode]}')
+    finally:
+        stop_process(upstream)
+
+    report = {
+        'config': {
+            'workers': args.workers,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'upstream_latency_ms': args.latency_ms
+        },
+        'results': results
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
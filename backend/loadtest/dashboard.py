@@ -0,0 +1,252 @@
+"""
+Replay dashboard traffic against the backend and report throughput and latency percentiles
+
+    python -m loadtest.dashboard --users 500 --duration 600 --time-scale 10 --workers 2 --mode async \\
+        --upstream-args "--latency lognormal:600:0.7 --error-rate 0.02 --timeout-rate 0.005"
+    python -m loadtest.dashboard --base-url http://staging:5000 --users 200 --duration 900
+
+Run from the backend directory. Each simulated user opens the dashboard and
+then polls the way the frontend does (src/context/AirQualityContext.jsx every
+5 minutes, src/hooks/useAlerts.js and LiveDataPreview every 2 minutes, each
+request carrying axios' ``_t`` cache-buster). Polls are open-loop, like
+setInterval: slow responses do not delay the next poll. ``--time-scale``
+compresses wall-clock time (10 = a 5-minute poll every 30 s), so N users at
+scale S offer the load of N*S real users; the server's snapshot and shared
+upstream intervals are shortened by the same factor to keep their ratio to
+the poll intervals. Without ``--base-url`` the stub upstreams and a local
+gunicorn server are started (see compare_modes).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+from config import Config
+from loadtest.compare_modes import SERVER_COMMANDS, drive, start_process, stop_process, wait_until_up
+
+# (interval seconds, requests issued together) per dashboard component
+DASHBOARD_POLLS = [
+    (5 * 60, ['/api/current', '/api/forecast', '/api/alerts', '/api/emergency-alerts']),  # AirQualityContext
+    (2 * 60, ['/api/alerts', '/api/emergency-alerts']),                                  # useAlerts
+    (2 * 60, ['/api/current'])                                                           # LiveDataPreview
+]
+
+# Traffic mixes: user kind -> polls; ``{location}`` is a location picked per user
+MIXES = {
+    'dashboard': DASHBOARD_POLLS,
+    'home': DASHBOARD_POLLS[1:],
+    'location': [(5 * 60, ['/api/location/{location}/current', '/api/alerts'])]
+}
+
+
+def parse_mix(spec):
+    """'dashboard=0.7,location=0.3' -> {'dashboard': 0.7, 'location': 0.3}"""
+    weights = {}
+    for item in spec.split(','):
+        kind, _, weight = item.partition('=')
+        if kind not in MIXES:
+            raise ValueError(f"Unknown traffic mix '{kind}', expected one of {sorted(MIXES)}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+class Recorder:
+    """Latencies and failures per route"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: {'timeout': 0, 'http': 0, 'connection': 0})
+        self.stale = 0
+
+    def summary(self, elapsed):
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            routes[route] = _percentiles(self.latencies[route], elapsed)
+            routes[route]['errors'] = dict(self.errors[route])
+        overall = _percentiles([l for ls in self.latencies.values() for l in ls], elapsed)
+        overall['errors'] = {
+            kind: sum(errors[kind] for errors in self.errors.values()) for kind in ('timeout', 'http', 'connection')
+        }
+        overall['stale_responses'] = self.stale
+        return {'overall': overall, 'routes': routes}
+
+
+def _percentiles(latencies, elapsed):
+    summary = {'requests': len(latencies), 'throughput_rps': round(len(latencies) / elapsed, 2)}
+    if latencies:
+        p50, p90, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 90, 95, 99])
+        summary.update({
+            'p50_ms': round(p50, 1), 'p90_ms': round(p90, 1), 'p95_ms': round(p95, 1),
+            'p99_ms': round(p99, 1), 'max_ms': round(max(latencies) * 1000, 1)
+        })
+    return summary
+
+
+async def _request(client, recorder, path):
+    route = path.split('?')[0]
+    start = time.perf_counter()
+    try:
+        response = await client.get(path, params={'_t': int(time.time() * 1000)})
+        if response.status_code >= 400:
+            recorder.errors[route]['http'] += 1
+            return
+        recorder.latencies[route].append(time.perf_counter() - start)
+        if b'"stale_sources"' in response.content:
+            recorder.stale += 1
+    except httpx.TimeoutException:
+        recorder.errors[route]['timeout'] += 1
+    except httpx.HTTPError:
+        recorder.errors[route]['connection'] += 1
+
+
+async def _user(client, recorder, polls, location, time_scale, deadline, in_flight):
+    """One browser tab: load everything, then run each poll on its own interval"""
+    async def poll(interval, paths):
+        # Tabs open at random moments: stagger the first refresh within one interval
+        next_at = time.monotonic() + random.uniform(0, interval / time_scale)
+        first = True
+        while True:
+            if not first:
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            if time.monotonic() >= deadline:
+                return
+            for path in paths:
+                task = asyncio.ensure_future(_request(client, recorder, path.format(location=location)))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            first = False
+            next_at += interval / time_scale
+
+    await asyncio.gather(*(poll(interval, paths) for interval, paths in polls))
+
+
+async def replay(base_url, users, mix, duration, time_scale, timeout):
+    """Run ``users`` simulated dashboards for ``duration`` seconds of wall-clock time"""
+    recorder = Recorder()
+    in_flight = set()
+    kinds = random.choices(list(mix), weights=list(mix.values()), k=users)
+    limits = httpx.Limits(max_connections=max(users, 10), max_keepalive_connections=max(users, 10))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(
+            _user(client, recorder, MIXES[kind], random.choice(Config.GOA_LOCATIONS)['name'],
+                  time_scale, deadline, in_flight)
+            for kind in kinds
+        ))
+        # Let requests issued before the deadline finish (they count towards latency, not throughput time)
+        if in_flight:
+            await asyncio.wait(set(in_flight), timeout=timeout)
+        elapsed = time.monotonic() - started
+
+    report = recorder.summary(elapsed)
+    report['offered_rps'] = round(sum(
+        users * mix[kind] / sum(mix.values()) * sum(len(paths) / interval for interval, paths in MIXES[kind])
+        for kind in mix
+    ) * time_scale, 2)
+    return report
+
+
+def warm_up(base_url, workers, timeout=600):
+    """
+    Repeat concurrent dashboard loads until requests are fast: each worker
+    trains or loads its forecast model on first use, which would otherwise
+    dominate the measurement
+    """
+    paths = [path for _, polls in DASHBOARD_POLLS for path in polls]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        summary = asyncio.run(drive(base_url, paths, workers * 4, 2, timeout))
+        if summary['requests'] and summary['p50_ms'] < 1000:
+            return
+    raise RuntimeError(f'{base_url} did not warm up within {timeout}s')
+
+
+def run_local(args, upstream_url):
+    """Start a local server against the stub upstreams, replay traffic, stop it"""
+    scaled = lambda seconds: str(max(1, round(seconds / args.time_scale)))
+    # Mirrored fixture granules stay out of the real TEMPO directories
+    tempo_dir = tempfile.mkdtemp(prefix='loadtest-tempo-')
+    env = dict(
+        os.environ,
+        TEMPO_GRANULE_DIR=os.path.join(tempo_dir, 'granules'),
+        TEMPO_CACHE_DIR=os.path.join(tempo_dir, 'cache'),
+        TEMPO_GRID_DIR=os.path.join(tempo_dir, 'grid'),
+        OPENAQ_API_URL=f'{upstream_url}/v2',
+        WEATHER_API_URL=f'{upstream_url}/v1/forecast',
+        TEMPO_MIRROR_URL=f'{upstream_url}/tempo',
+        SNAPSHOT_TTL_SECONDS=scaled(Config.SNAPSHOT_TTL_SECONDS),
+        UPSTREAM_SHARE_SECONDS=scaled(Config.UPSTREAM_SHARE_SECONDS),
+        TEMPO_INGEST_INTERVAL_SECONDS=scaled(Config.TEMPO_INGEST_INTERVAL_SECONDS)
+    )
+    command = SERVER_COMMANDS[args.mode] + [
+        '--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}', '--timeout', '600', '--backlog', '4096'
+    ]
+    server = start_process(command, env=env)
+    try:
+        base_url = f'http://127.0.0.1:{args.port}'
+        wait_until_up(f'{base_url}/health')
+        warm_up(base_url, args.workers)
+        return asyncio.run(replay(base_url, args.users, parse_mix(args.mix), args.duration,
+                                  args.time_scale, args.timeout))
+    finally:
+        stop_process(server)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay dashboard polling traffic')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--mix', default='dashboard=0.6,home=0.25,location=0.15',
+                        help=f'user kinds and weights, from {sorted(MIXES)}')
+    parser.add_argument('--duration', type=float, default=300, help='wall-clock seconds')
+    parser.add_argument('--time-scale', type=float, default=1.0, help='poll-interval compression factor')
+    parser.add_argument('--timeout', type=float, default=20, help='client timeout (the frontend uses 20 s)')
+    parser.add_argument('--base-url', help='existing server to load; otherwise a local one is started')
+    parser.add_argument('--mode', default='async', choices=sorted(SERVER_COMMANDS))
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--upstream-port', type=int, default=9100)
+    parser.add_argument('--upstream-args', default='', help='extra loadtest.stub_upstream arguments')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    config = {key: getattr(args, key) for key in ('users', 'mix', 'duration', 'time_scale', 'timeout')}
+    if args.base_url:
+        results = asyncio.run(replay(args.base_url, args.users, parse_mix(args.mix), args.duration,
+                                     args.time_scale, args.timeout))
+    else:
+        config.update(mode=args.mode, workers=args.workers, upstream_args=args.upstream_args)
+        # Train and save a missing/outdated model once, before the workers race to do it
+        subprocess.run([sys.executable, '-c', 'import app; app.warm_up()'], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        upstream_url = f'http://127.0.0.1:{args.upstream_port}'
+        upstream = start_process([
+            sys.executable, '-m', 'loadtest.stub_upstream', '--port', str(args.upstream_port)
+        ] + shlex.split(args.upstream_args))
+        try:
+            wait_until_up(f'{upstream_url}/stats')
+            results = run_local(args, upstream_url)
+            results['upstream_requests'] = httpx.get(f'{upstream_url}/stats').json()
+        finally:
+            stop_process(upstream)
+        results['per_worker_rps'] = round(results['overall']['throughput_rps'] / args.workers, 2)
+
+    report = {'config': config, 'results': results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
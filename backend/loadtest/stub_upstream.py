@@ -0,0 +1,287 @@
+"""
+Local stand-ins for the OpenAQ, Open-Meteo and TEMPO upstreams with configurable
+latency distributions, error rates and timeouts
+
+    python -m loadtest.stub_upstream --port 9100 --latency-ms 500
+    python -m loadtest.stub_upstream --latency lognormal:400:0.6 --error-rate 0.02 \\
+        --openaq latency=lognormal:900:0.8,error_rate=0.05,timeout_rate=0.01 --tempo latency=uniform:2000:6000
+
+Point the backend at it with OPENAQ_API_URL=http://127.0.0.1:9100/v2,
+WEATHER_API_URL=http://127.0.0.1:9100/v1/forecast,
+WEATHER_ARCHIVE_URL=http://127.0.0.1:9100/v1/archive and
+TEMPO_MIRROR_URL=http://127.0.0.1:9100/tempo (the mirror serves small synthetic
+L3 granules over Goa for the last --tempo-hours hours). OpenAQ /measurements
+and the Open-Meteo archive answer any date range, for models.backfill. Latency specs are fixed:<ms>, uniform:<lo_ms>:<hi_ms>,
+normal:<mean_ms>:<sd_ms> or lognormal:<median_ms>:<sigma>. A request picked
+as a timeout is held for --hang-seconds, longer than the backend's 10 s client
+timeout; an error is an HTTP 503. Counts per source are served at /stats.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs
+
+import uvicorn
+
+SOURCES = ('openaq', 'open_meteo', 'tempo')
+
+
+OPENAQ_VALUES = {'pm25': 45.0, 'pm10': 80.0, 'no2': 30.0, 'o3': 70.0, 'so2': 15.0, 'co': 1.2}
+
+# Offset of the local times in synthetic histories (Asia/Kolkata)
+LOCAL_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def openaq_latest(params=None):
+    """Body of an OpenAQ /v2/latest response"""
+    return {
+        'results': [
+            {'parameter': parameter, 'value': round(value * random.uniform(0.8, 1.2), 2), 'unit': 'µg/m³'}
+            for parameter, value in OPENAQ_VALUES.items()
+        ]
+    }
+
+
+def _hours(start, end):
+    """Whole hours in [start, end) as naive datetimes"""
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    hours = []
+    while hour < end:
+        hours.append(hour)
+        hour += timedelta(hours=1)
+    return hours
+
+
+def openaq_measurements(params):
+    """Body of an OpenAQ /v2/measurements page: one station, every parameter hourly over the range"""
+    start = datetime.fromisoformat(params['date_from']).replace(tzinfo=None)
+    end = datetime.fromisoformat(params['date_to']).replace(tzinfo=None)
+    limit, page = int(params.get('limit', 100)), int(params.get('page', 1))
+    series = [(hour, parameter, value) for hour in _hours(start, end) for parameter, value in OPENAQ_VALUES.items()]
+    return {
+        'meta': {'found': len(series), 'limit': limit, 'page': page},
+        'results': [
+            {
+                'parameter': parameter,
+                'value': round(value * random.uniform(0.8, 1.2), 2),
+                'unit': 'µg/m³',
+                'date': {'utc': f'{(hour - LOCAL_OFFSET).isoformat()}+00:00', 'local': f'{hour.isoformat()}+05:30'}
+            }
+            for hour, parameter, value in series[(page - 1) * limit:page * limit]
+        ]
+    }
+
+
+OPEN_METEO_RANGES = {
+    'temperature_2m': (24, 32), 'relative_humidity_2m': (60, 85), 'wind_speed_10m': (5, 15),
+    'wind_direction_10m': (0, 360), 'boundary_layer_height': (200, 1500)
+}
+
+
+def _open_meteo_hourly(params, start, end):
+    """Hourly series over [start, end) per requested coordinate (a list for several, like Open-Meteo)"""
+    times = [hour.strftime('%Y-%m-%dT%H:%M') for hour in _hours(start, end)]
+    bodies = [
+        {
+            'latitude': float(lat), 'longitude': float(lon),
+            'hourly': {'time': times, **{
+                variable: [round(random.uniform(*OPEN_METEO_RANGES.get(variable, (0, 1))), 1) for _ in times]
+                for variable in params['hourly'].split(',')
+            }}
+        }
+        for lat, lon in zip(params['latitude'].split(','), params['longitude'].split(','))
+    ]
+    return bodies if len(bodies) > 1 else bodies[0]
+
+
+def open_meteo_archive(params):
+    """Body of an Open-Meteo archive response (start_date to end_date inclusive)"""
+    start = datetime.fromisoformat(params['start_date'])
+    return _open_meteo_hourly(params, start, datetime.fromisoformat(params['end_date']) + timedelta(days=1))
+
+
+def open_meteo_forecast(params):
+    """Body of an Open-Meteo /v1/forecast response: hourly forecast when asked for, else current conditions"""
+    if 'hourly' not in params:
+        return open_meteo_current(params)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return _open_meteo_hourly(params, start, start + timedelta(days=int(params.get('forecast_days', 7))))
+
+
+def open_meteo_current(params=None):
+    """Body of an Open-Meteo current-conditions response"""
+    return {
+        'current': {
+            'time': datetime.now().strftime('%Y-%m-%dT%H:%M'),
+            'temperature_2m': round(random.uniform(24, 32), 1),
+            'relative_humidity_2m': round(random.uniform(60, 85), 1),
+            'wind_speed_10m': round(random.uniform(5, 15), 1),
+            'wind_direction_10m': round(random.uniform(0, 360), 1)
+        }
+    }
+
+
+ROUTES = {
+    '/v2/latest': ('openaq', openaq_latest),
+    '/v2/measurements': ('openaq', openaq_measurements),
+    '/v1/forecast': ('open_meteo', open_meteo_forecast),
+    '/v1/archive': ('open_meteo', open_meteo_archive)
+}
+
+
+def latency_sampler(spec):
+    """Callable returning one latency in ms from a distribution spec such as 'lognormal:400:0.6'"""
+    kind, *params = spec.split(':')
+    params = [float(p) for p in params]
+    samplers = {
+        'fixed': lambda ms: ms,
+        'uniform': random.uniform,
+        'normal': random.gauss,
+        'lognormal': lambda median, sigma: random.lognormvariate(0, sigma) * median
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution '{kind}', expected one of {sorted(samplers)}")
+    sample = samplers[kind]
+    return lambda: max(0.0, sample(*params))
+
+
+class UpstreamProfile:
+    """How one stand-in upstream behaves: latency distribution plus error and timeout rates"""
+
+    def __init__(self, latency='fixed:500', error_rate=0.0, timeout_rate=0.0, hang_seconds=15.0):
+        self.latency = latency
+        self.error_rate = float(error_rate)
+        self.timeout_rate = float(timeout_rate)
+        self.hang_seconds = float(hang_seconds)
+        self._sample = latency_sampler(latency)
+
+    def with_overrides(self, overrides):
+        """Copy with 'key=value,...' overrides applied, e.g. 'latency=fixed:50,error_rate=0.1'"""
+        settings = {
+            'latency': self.latency, 'error_rate': self.error_rate,
+            'timeout_rate': self.timeout_rate, 'hang_seconds': self.hang_seconds
+        }
+        for item in filter(None, (overrides or '').split(',')):
+            key, _, value = item.partition('=')
+            if key not in settings:
+                raise ValueError(f"Unknown upstream setting '{key}', expected one of {sorted(settings)}")
+            settings[key] = value
+        return UpstreamProfile(**settings)
+
+    async def outcome(self):
+        """Wait like the real upstream would; returns 'ok', 'error' or 'timeout'"""
+        draw = random.random()
+        if draw < self.timeout_rate:
+            await asyncio.sleep(self.hang_seconds)
+            return 'timeout'
+        await asyncio.sleep(self._sample() / 1000)
+        return 'error' if draw < self.timeout_rate + self.error_rate else 'ok'
+
+    def describe(self):
+        return {'latency': self.latency, 'error_rate': self.error_rate, 'timeout_rate': self.timeout_rate}
+
+
+def write_tempo_mirror(directory, hours=3):
+    """Synthetic NO2/O3/HCHO L3 granules over Goa for the last few hours; returns their file names"""
+    from api.tempo_granules import TEMPO_PRODUCTS, write_fixture_granule
+
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    names = []
+    for hour in range(hours):
+        for seed, product in enumerate(TEMPO_PRODUCTS):
+            path = write_fixture_granule(directory, product=product, time=now - timedelta(hours=hour),
+                                         bounds=(14.6, 16.1, 73.4, 74.6), seed=seed + hour)
+            names.append(os.path.basename(path))
+    return names
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+# Requests served per source and outcome, reported at /stats
+REQUEST_COUNTS = {source: {'ok': 0, 'error': 0, 'timeout': 0} for source in SOURCES}
+
+
+def make_app(latency_ms=500.0, jitter_ms=0.0, profiles=None, tempo_dir=None, tempo_hours=3):
+    """
+    ASGI app answering the upstream routes. ``profiles`` maps source -> UpstreamProfile;
+    sources without one wait latency_ms +/- jitter_ms and never fail. The TEMPO
+    mirror serves granules for the last ``tempo_hours`` hours.
+    """
+    default = UpstreamProfile(latency=f'uniform:{latency_ms - jitter_ms}:{latency_ms + jitter_ms}')
+    profiles = {source: (profiles or {}).get(source, default) for source in SOURCES}
+    tempo_names = write_tempo_mirror(tempo_dir, hours=tempo_hours) if tempo_dir else []
+
+    async def respond(send, status, body, content_type=b'application/json'):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        path = scope['path']
+        if path == '/stats':
+            return await respond(send, 200, json.dumps(REQUEST_COUNTS).encode())
+
+        if path in ROUTES:
+            source, handler = ROUTES[path]
+            params = {key: values[0] for key, values in parse_qs(scope['query_string'].decode()).items()}
+            payload = lambda: json.dumps(handler(params)).encode()
+        elif path.startswith('/tempo/') and tempo_dir:
+            source, name = 'tempo', path[len('/tempo/'):]
+            if name == 'index.json':
+                payload = lambda: json.dumps(tempo_names).encode()
+            elif name in tempo_names:
+                payload = lambda: _read_file(os.path.join(tempo_dir, name))
+            else:
+                return await respond(send, 404, b'{"error": "not found"}')
+        else:
+            return await respond(send, 404, b'{"error": "not found"}')
+
+        outcome = await profiles[source].outcome()
+        REQUEST_COUNTS[source][outcome] += 1
+        if outcome == 'ok':
+            content_type = b'application/x-netcdf' if path.endswith('.nc') else b'application/json'
+            await respond(send, 200, payload(), content_type)
+        else:
+            # Timed-out clients have gone away; answering late is harmless
+            await respond(send, 503, b'{"error": "upstream unavailable"}')
+
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub OpenAQ/Open-Meteo/TEMPO upstreams')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency-ms', type=float, default=500.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--latency', help='latency distribution for every source (overrides --latency-ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--hang-seconds', type=float, default=15.0)
+    for source in SOURCES:
+        parser.add_argument(f"--{source.replace('_', '-')}", metavar='KEY=VALUE,...',
+                            help=f'{source} overrides (latency, error_rate, timeout_rate, hang_seconds)')
+    parser.add_argument('--tempo-dir', help='where to write the mirrored granules (default: a temp dir)')
+    parser.add_argument('--tempo-hours', type=int, default=3, help='hours of mirrored granules, newest first')
+    args = parser.parse_args()
+
+    base = UpstreamProfile(
+        latency=args.latency or f'uniform:{args.latency_ms - args.jitter_ms}:{args.latency_ms + args.jitter_ms}',
+        error_rate=args.error_rate, timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds
+    )
+    profiles = {source: base.with_overrides(getattr(args, source)) for source in SOURCES}
+    tempo_dir = args.tempo_dir or tempfile.mkdtemp(prefix='tempo-mirror-')
+
+    uvicorn.run(make_app(profiles=profiles, tempo_dir=tempo_dir, tempo_hours=args.tempo_hours), host='127.0.0.1', port=args.port,
+                log_level='warning', backlog=4096)
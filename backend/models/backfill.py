@@ -0,0 +1,285 @@
+"""
+Backfill the observation store with historical OpenAQ, Open-Meteo archive and TEMPO data
+
+    python -m models.backfill --start 2025-01-01 --end 2026-01-01
+    python -m models.backfill --start 2025-01-01 --end 2026-01-01 --workers 16 --chunk-days 14
+
+The range (local dates, end exclusive) is split into chunks that are fetched
+concurrently. Every source sits behind its own rate limit shared by all
+workers (Config.BACKFILL_RATE_LIMITS) and failed requests are retried with
+exponential backoff. A finished chunk is quality-checked, written to the
+store in one transaction and recorded in the checkpoint file; running the
+same range again resumes after the completed chunks. Point OPENAQ_API_URL,
+WEATHER_ARCHIVE_URL and TEMPO_MIRROR_URL at loadtest.stub_upstream to try
+it offline.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from config import Config
+from models import data_quality
+from utils.clock import LOCAL_ZONE, to_local
+
+
+class RateLimiter:
+    """
+    Token bucket shared by threads: at most ``rate`` calls per second on average,
+    bursts of up to ``burst``. acquire() reserves a slot and sleeps until it is due.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def date_chunks(start, end, days):
+    """[start, end) split into consecutive (chunk_start, chunk_end) date pairs of at most ``days``"""
+    chunks = []
+    while start < end:
+        chunk_end = min(start + timedelta(days=days), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end
+    return chunks
+
+
+class BackfillCheckpoint:
+    """
+    Completed chunks of one backfill run, kept in a JSON file rewritten atomically
+    after each chunk. A checkpoint written for different run settings is ignored.
+    """
+
+    def __init__(self, path, run):
+        self.path = path
+        self.run = run
+        self.completed = {}
+        self._lock = threading.Lock()
+
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if saved.get('run') == run:
+            self.completed = saved.get('completed', {})
+        else:
+            print(f"Checkpoint {path} belongs to another run, starting over")
+
+    def done(self, key):
+        return key in self.completed
+
+    def mark(self, key, rows):
+        with self._lock:
+            self.completed[key] = rows
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'run': self.run, 'completed': self.completed}, f)
+            os.replace(tmp_path, self.path)
+
+
+class Backfill:
+    """
+    Historical ingest of Config.GOA_LOCATIONS into the observation store
+
+    Each chunk makes one OpenAQ /measurements query per location (paged), one
+    multi-coordinate Open-Meteo archive request and, with a TEMPO mirror, one
+    download per missing granule; TEMPO columns are sampled from the local
+    granules. Sources are merged per (location, hour) before the bulk write.
+    """
+
+    def __init__(self, start, end, locations=None, chunk_days=None, workers=None,
+                 checkpoint_path=None, observation_store=None):
+        # Import here so the CLI help does not wait for the API clients
+        from api.openaq import OpenAQAPI
+        from api.weather import WeatherAPI
+        from api.tempo import TempoAPI
+        from models.observation_store import ObservationStore
+
+        self.start, self.end = start, end
+        self.locations = locations or Config.GOA_LOCATIONS
+        self.chunk_days = chunk_days or Config.BACKFILL_CHUNK_DAYS
+        self.workers = workers or Config.BACKFILL_WORKERS
+
+        self.openaq_api = OpenAQAPI()
+        self.weather_api = WeatherAPI()
+        self.tempo_api = TempoAPI()
+        self.observation_store = observation_store or ObservationStore()
+        self.limiters = {source: RateLimiter(rate) for source, rate in Config.BACKFILL_RATE_LIMITS.items()}
+
+        self.checkpoint = BackfillCheckpoint(
+            checkpoint_path or Config.BACKFILL_CHECKPOINT_PATH,
+            {
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'chunk_days': self.chunk_days,
+                'locations': [loc['name'] for loc in self.locations]
+            }
+        )
+        self._mirror_names = None
+        self._mirror_lock = threading.Lock()
+
+    def _fetch(self, source, fetch):
+        """Call a client method under the source's rate limit, retrying failures with backoff"""
+        for attempt in range(Config.BACKFILL_MAX_RETRIES + 1):
+            result = fetch(self.limiters[source].acquire)
+            if result is not None:
+                return result
+            if attempt < Config.BACKFILL_MAX_RETRIES:
+                time.sleep(min(2 ** attempt, 30))
+        raise RuntimeError(f"{source} failed after {Config.BACKFILL_MAX_RETRIES + 1} attempts")
+
+    def _local_midnight(self, day):
+        return datetime(day.year, day.month, day.day, tzinfo=LOCAL_ZONE)
+
+    @staticmethod
+    def _utc_hour_to_local(hour):
+        """Naive local-time ISO hour for a naive UTC datetime"""
+        return to_local(hour.replace(tzinfo=timezone.utc)).replace(minute=0, second=0, microsecond=0).isoformat()
+
+    def _sync_tempo(self, start_utc, end_utc):
+        """Download the mirrored granules observed in [start_utc, end_utc) that are not local yet"""
+        from api.tempo_granules import parse_granule_name
+
+        ingestor = self.tempo_api.ingestor
+
+        def listing(throttle):
+            throttle()
+            return ingestor.list_mirror()
+
+        def download(name):
+            def fetch(throttle):
+                throttle()
+                return True if ingestor.download(name) else None
+            return fetch
+
+        with self._mirror_lock:
+            if self._mirror_names is None:
+                self._mirror_names = self._fetch('tempo', listing)
+        for name in self._mirror_names:
+            observed = parse_granule_name(name)['time']
+            if start_utc <= observed < end_utc and not os.path.exists(os.path.join(ingestor.granule_dir, name)):
+                self._fetch('tempo', download(name))
+
+    def run_chunk(self, chunk_start, chunk_end):
+        """Fetch, merge, quality-check and store one chunk; returns the number of rows written"""
+        start, end = self._local_midnight(chunk_start), self._local_midnight(chunk_end)
+        rows = {}
+
+        def row(name, hour):
+            return rows.setdefault((name, hour), {'location': name, 'observed_at': hour})
+
+        # Ground measurements, one paged query per location
+        for location in self.locations:
+            measurements = self._fetch('openaq', lambda throttle: self.openaq_api.get_measurements(
+                location['lat'], location['lon'], start, end, throttle=throttle
+            ))
+            for hour, values in measurements['data'].items():
+                # Only rows with ground readings carry an is_mock label (see ObservationStore.insert_many)
+                row(location['name'], hour).update(values, is_mock=False)
+
+        # Weather for every location in one request (end date inclusive)
+        points = [(location['lat'], location['lon']) for location in self.locations]
+        weather = self._fetch('open_meteo', lambda throttle: self.weather_api.get_archive_weather(
+            points, chunk_start, chunk_end - timedelta(days=1), throttle=throttle
+        ))['data']
+        hours = weather['time'].astype(datetime)
+        for i, location in enumerate(self.locations):
+            for t, hour in enumerate(hours):
+                values = weather['values'][i, t]
+                if np.isfinite(values).any():
+                    row(location['name'], hour.isoformat()).update({
+                        variable: float(value) for variable, value in zip(weather['variables'], values)
+                        if np.isfinite(value)
+                    })
+
+        # Satellite columns from the local (optionally mirrored) granules
+        start_utc = start.astimezone(timezone.utc).replace(tzinfo=None)
+        end_utc = end.astimezone(timezone.utc).replace(tzinfo=None)
+        if self.tempo_api.ingestor.mirror_url:
+            self._sync_tempo(start_utc, end_utc)
+        columns = self.tempo_api.get_historical_columns(points, start_utc, end_utc)
+        for hour, by_pollutant in columns.items():
+            local_hour = self._utc_hour_to_local(hour)
+            for pollutant, values in by_pollutant.items():
+                for i, location in enumerate(self.locations):
+                    if np.isfinite(values[i]):
+                        row(location['name'], local_hour)[f'tempo_{pollutant}'] = float(values[i])
+
+        rows = data_quality.flag_observations(list(rows.values()))
+        return self.observation_store.insert_many(rows) if rows else 0
+
+    def run(self):
+        """Backfill every chunk not yet in the checkpoint; returns a summary"""
+        started = time.perf_counter()
+        chunks = date_chunks(self.start, self.end, self.chunk_days)
+        pending = [chunk for chunk in chunks if not self.checkpoint.done(chunk[0].isoformat())]
+        print(f"Backfilling {len(pending)} of {len(chunks)} chunks "
+              f"({self.start} to {self.end}, {len(self.locations)} locations, {self.workers} workers)")
+
+        rows_written = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.run_chunk, *chunk): chunk for chunk in pending}
+            for future in as_completed(futures):
+                chunk_start, chunk_end = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    print(f"Error backfilling {chunk_start} to {chunk_end}: {e}")
+                    failed.append(chunk_start.isoformat())
+                    continue
+                self.checkpoint.mark(chunk_start.isoformat(), rows)
+                rows_written += rows
+                print(f"{chunk_start} to {chunk_end}: {rows} rows "
+                      f"({len(self.checkpoint.completed)}/{len(chunks)} chunks)")
+
+        return {
+            'chunks': len(chunks),
+            'skipped': len(chunks) - len(pending),
+            'completed': len(pending) - len(failed),
+            'failed': sorted(failed),
+            'rows': rows_written,
+            'total_time_s': round(time.perf_counter() - started, 2)
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill historical observations into the local store')
+    parser.add_argument('--start', type=date.fromisoformat, required=True, help='First local date (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, default=date.today(),
+                        help='Local date to stop before (default: today)')
+    parser.add_argument('--locations', help='Comma-separated location names (default: all)')
+    parser.add_argument('--chunk-days', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file (default: BACKFILL_CHECKPOINT_PATH)')
+    args = parser.parse_args()
+
+    locations = None
+    if args.locations:
+        wanted = {name.strip().lower() for name in args.locations.split(',')}
+        locations = [loc for loc in Config.GOA_LOCATIONS if loc['name'].lower() in wanted]
+        if not locations:
+            parser.error(f"No known location in {args.locations}")
+
+    print(Backfill(args.start, args.end, locations=locations, chunk_days=args.chunk_days,
+                   workers=args.workers, checkpoint_path=args.checkpoint).run())
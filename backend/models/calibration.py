@@ -0,0 +1,211 @@
+import copy
+import math
+import threading
+import time
+
+import numpy as np
+
+from api.tempo_granules import COLUMN_UNITS
+from config import Config
+from utils.clock import local_now
+
+# Satellite products calibrated against the ground pollutant they estimate
+CALIBRATED_POLLUTANTS = ['no2', 'o3']
+
+
+class RunningRegression:
+    """
+    Least-squares fit of y on x from running sums, updated one pair at a time
+
+    Means and centred second moments follow Welford's update (numerically
+    stable for TEMPO columns around 1e15), and batches are merged with Chan's
+    pairwise formula, so statistics over any history cost O(1) to read.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def update(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.n
+        dy = y - self.mean_y
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def merge_arrays(self, x, y):
+        """Fold a batch of pairs in at once"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n_b = len(x)
+        if n_b == 0:
+            return
+        mean_xb, mean_yb = x.mean(), y.mean()
+        dxb, dyb = x - mean_xb, y - mean_yb
+
+        n = self.n + n_b
+        delta_x, delta_y = mean_xb - self.mean_x, mean_yb - self.mean_y
+        weight = self.n * n_b / n
+        self.mean_x += delta_x * n_b / n
+        self.mean_y += delta_y * n_b / n
+        self.m2_x += float(dxb @ dxb) + delta_x * delta_x * weight
+        self.m2_y += float(dyb @ dyb) + delta_y * delta_y * weight
+        self.c_xy += float(dxb @ dyb) + delta_x * delta_y * weight
+        self.n = n
+
+    @property
+    def slope(self):
+        return self.c_xy / self.m2_x if self.m2_x > 0 else None
+
+    @property
+    def intercept(self):
+        slope = self.slope
+        return None if slope is None else self.mean_y - slope * self.mean_x
+
+    @property
+    def correlation(self):
+        if self.m2_x <= 0 or self.m2_y <= 0:
+            return None
+        return self.c_xy / math.sqrt(self.m2_x * self.m2_y)
+
+    @property
+    def rmse(self):
+        """Residual standard error of the fit"""
+        if self.n <= 2 or self.m2_x <= 0:
+            return None
+        return math.sqrt(max(self.m2_y - self.c_xy ** 2 / self.m2_x, 0.0) / (self.n - 2))
+
+    def predict(self, x):
+        return self.intercept + self.slope * x
+
+
+def correlation_label(r):
+    """Plain-language strength of a correlation coefficient"""
+    if r is None:
+        return 'insufficient data'
+    r = abs(r)
+    if r >= 0.8:
+        return 'strong'
+    if r >= 0.6:
+        return 'good'
+    if r >= 0.4:
+        return 'moderate'
+    return 'weak'
+
+
+class SatelliteCalibration:
+    """
+    Calibration of TEMPO tropospheric columns against co-located OpenAQ
+    surface readings, one regression per pollutant
+
+    The pairs are the observation store's real hourly rows holding both a
+    TEMPO column and a ground reading (the store keeps the latest reading of
+    each hour), counted once the hour is over. Every CALIBRATION_REFRESH_SECONDS,
+    in the background, the hours closed since the previous refresh are merged
+    into the running fits; every CALIBRATION_REBUILD_SECONDS the fits are
+    rebuilt from all stored pairs instead, which takes in backfilled hours and
+    hours updated after they were merged. Every worker reads the same shared
+    database, so all serve the same fit.
+    """
+
+    def __init__(self, observation_store):
+        self.observation_store = observation_store
+        self._fits = {pollutant: RunningRegression() for pollutant in CALIBRATED_POLLUTANTS}
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._next_refresh = float('-inf')
+        self._next_rebuild = float('-inf')
+        # Hours before this one are in the fits; None until the first full rebuild
+        self._merged_until = None
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self, rebuild=False):
+        """
+        Merge the hours closed since the last refresh into the fits now; with
+        ``rebuild`` (or when the rebuild interval is over) refit from every stored pair
+        """
+        rebuild = rebuild or self._merged_until is None or time.monotonic() >= self._next_rebuild
+        since = None if rebuild else self._merged_until
+        until = local_now().replace(minute=0, second=0, microsecond=0).isoformat()
+        with self._lock:
+            fits = {
+                pollutant: RunningRegression() if rebuild else copy.copy(self._fits[pollutant])
+                for pollutant in CALIBRATED_POLLUTANTS
+            }
+            latest = {} if rebuild else dict(self._latest)
+
+        for pollutant in CALIBRATED_POLLUTANTS:
+            rows = self.observation_store.satellite_pairs(pollutant, start=since, end=until)
+            if not rows:
+                continue
+            pairs = np.array([row[2:] for row in rows], dtype=float)
+            fits[pollutant].merge_arrays(pairs[:, 0], pairs[:, 1])
+            location, hour, column, ground = rows[-1]
+            latest[pollutant] = {'location': location, 'hour': hour, 'column': column, 'ground': ground}
+
+        with self._lock:
+            self._fits, self._latest = fits, latest
+            self._merged_until = until
+        now = time.monotonic()
+        self._next_refresh = now + Config.CALIBRATION_REFRESH_SECONDS
+        if rebuild:
+            self._next_rebuild = now + Config.CALIBRATION_REBUILD_SECONDS
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refreshing satellite calibration: {e}")
+            self._next_refresh = time.monotonic() + min(60, Config.CALIBRATION_REFRESH_SECONDS)
+        finally:
+            self._refresh_lock.release()
+
+    def _maybe_refresh(self):
+        """Start a background refresh when the interval is over (one at a time per process)"""
+        if time.monotonic() < self._next_refresh or not self._refresh_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh_in_background, daemon=True, name='calibration').start()
+
+    def ready(self, pollutant):
+        """Whether the fit for a pollutant is trustworthy enough to fill gaps"""
+        fit = self._fits.get(pollutant)
+        if fit is None or fit.n < Config.CALIBRATION_MIN_PAIRS:
+            return False
+        r = fit.correlation
+        return r is not None and r >= Config.CALIBRATION_MIN_CORRELATION
+
+    def calibrate(self, pollutant, column):
+        """Surface concentration estimate for a TEMPO column, or None without a usable fit"""
+        self._maybe_refresh()
+        if column is None or not self.ready(pollutant):
+            return None
+        with self._lock:
+            return max(0.0, self._fits[pollutant].predict(column))
+
+    def summary(self):
+        """Current fit per pollutant plus the latest co-located pair (O(1))"""
+        self._maybe_refresh()
+        with self._lock:
+            result = {}
+            for pollutant, fit in self._fits.items():
+                latest = self._latest.get(pollutant)
+                result[pollutant] = {
+                    'pairs': fit.n,
+                    'correlation': fit.correlation,
+                    'agreement': correlation_label(fit.correlation if fit.n >= 3 else None),
+                    'slope': fit.slope,
+                    'intercept': fit.intercept,
+                    'rmse': fit.rmse,
+                    'column_units': COLUMN_UNITS,
+                    'latest': dict(latest) if latest else None
+                }
+        for pollutant, entry in result.items():
+            entry['used_for_gap_filling'] = self.ready(pollutant)
+        return result
@@ -1,8 +1,18 @@
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import sys
 import os
+import asyncio
+import threading
+import time
+from config import Config
+from models import data_quality
+from models.calibration import CALIBRATED_POLLUTANTS
+from utils import metrics, tracing
+from utils.clock import local_now
+
+# Pollutants averaged per day for /api/trends
+TREND_POLLUTANTS = ['pm25', 'pm10', 'no2', 'o3']
 
 class DataProcessor:
     """
@@ -15,61 +25,167 @@ class DataProcessor:
         from api.openaq import OpenAQAPI
         from api.weather import WeatherAPI
         from utils.aqi_calculator import AQICalculator
+        from models.observation_store import ObservationStore
+        from models.feature_store import FeatureStore
+        from models.calibration import SatelliteCalibration
         
         self.tempo_api = TempoAPI()
         self.openaq_api = OpenAQAPI()
         self.weather_api = WeatherAPI()
         self.aqi_calculator = AQICalculator()
+        self.observation_store = ObservationStore()
+        self.feature_store = FeatureStore()
+        self.feature_store.warm_from_store(self.observation_store)
+        self.calibration = SatelliteCalibration(self.observation_store)
+        self.calibration.refresh()
+        
+        # Per-location snapshots shared by every endpoint: {name: (monotonic time, result)}
+        self._snapshots = {}
+        self._snapshot_locks = {}
+        self._snapshot_locks_guard = threading.Lock()
+        self._async_snapshot_locks = {}
+    
+    def _fresh_snapshot(self, name, requested_at=None):
+        """
+        Cached snapshot if still within the TTL, or if it was stored after ``requested_at``
+        (i.e. by the fetch this caller waited on); otherwise None
+        """
+        cached = self._snapshots.get(name)
+        if cached and (time.monotonic() - cached[0] < Config.SNAPSHOT_TTL_SECONDS or
+                       (requested_at is not None and cached[0] >= requested_at)):
+            return cached[1]
+        return None
+    
+    def _store_snapshot(self, name, result):
+        """Finish a fetched result (validation, pollutant breakdown) and share it"""
+        if result['status'] != 'success':
+            # Serve the previous snapshot rather than an error if we have one
+            cached = self._snapshots.get(name)
+            return cached[1] if cached else result
+        
+        result['data']['validation'] = self.validate_data_quality(result['data'])
+        # Per-pollutant sub-indices are computed once here; the breakdown endpoint only reads them
+        result['data']['pollutant_breakdown'] = self.aqi_calculator.pollutant_breakdown(
+            result['data'].get('air_quality', {})
+        )
+        self._snapshots[name] = (time.monotonic(), result)
+        return result
     
-    def get_integrated_current_data(self):
+    def get_snapshot(self, location=None, requested_at=None):
+        """
+        Integrated current data (with validation and pollutant breakdown) for a location, refreshed at most
+        once per Config.SNAPSHOT_TTL_SECONDS. Concurrent misses share one upstream fetch.
+        ``requested_at`` (time.monotonic()) also accepts any snapshot fetched since then.
+        The returned result is shared and must be treated as read-only.
+        """
+        name = self._resolve_location(location)[2]
+        cached = self._fresh_snapshot(name, requested_at)
+        metrics.record_cache('snapshot', cached is not None)
+        if cached:
+            return cached
+        if requested_at is None:
+            requested_at = time.monotonic()
+        
+        with self._snapshot_locks_guard:
+            lock = self._snapshot_locks.setdefault(name, threading.Lock())
+        
+        with lock:
+            # Another request may have refreshed it while we waited
+            cached = self._fresh_snapshot(name, requested_at)
+            if cached:
+                return cached
+            
+            with tracing.span('snapshot.refresh', {'location': name}):
+                return self._store_snapshot(name, self.get_integrated_current_data(location))
+    
+    async def get_snapshot_async(self, location=None, client=None, requested_at=None):
+        """
+        get_snapshot for the ASGI serving mode: upstream calls go through the shared
+        httpx.AsyncClient, so waiting on OpenAQ/Open-Meteo holds no thread.
+        Shares the snapshot cache with get_snapshot.
+        """
+        name = self._resolve_location(location)[2]
+        cached = self._fresh_snapshot(name, requested_at)
+        metrics.record_cache('snapshot', cached is not None)
+        if cached:
+            return cached
+        if requested_at is None:
+            requested_at = time.monotonic()
+        
+        # asyncio locks belong to the serving event loop (one per process)
+        lock = self._async_snapshot_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            cached = self._fresh_snapshot(name, requested_at)
+            if cached:
+                return cached
+            
+            with tracing.span('snapshot.refresh', {'location': name}):
+                return self._store_snapshot(name, await self.get_integrated_current_data_async(location, client))
+    
+    def snapshot_ages(self):
+        """Seconds since each location's snapshot was fetched"""
+        now = time.monotonic()
+        return {name: now - stored_at for name, (stored_at, _) in list(self._snapshots.items())}
+    
+    @staticmethod
+    def _resolve_location(location):
+        """(lat, lon, name) of a Config.GOA_LOCATIONS entry, defaulting to the Goa centre point"""
+        if location:
+            return location['lat'], location['lon'], location['name']
+        return (Config.GOA_COORDINATES['latitude'], Config.GOA_COORDINATES['longitude'],
+                Config.GOA_COORDINATES['name'])
+    
+    def get_integrated_current_data(self, location=None):
         """
         Fetch and integrate current data from all sources
+        location is an entry of Config.GOA_LOCATIONS; defaults to the Goa centre point
         """
         try:
+            lat, lon, name = self._resolve_location(location)
+            
             # Fetch data from all sources
-            tempo_response = self.tempo_api.get_latest_data()
-            openaq_response = self.openaq_api.get_latest_measurements()
-            weather_response = self.weather_api.get_current_weather()
+            with tracing.span('upstream.tempo'):
+                tempo_response = self.tempo_api.get_latest_data(lat=lat, lon=lon)
+            with tracing.span('upstream.openaq'):
+                openaq_response = self.openaq_api.get_latest_measurements(lat=lat, lon=lon)
+            with tracing.span('upstream.open_meteo'):
+                weather_response = self.weather_api.get_current_weather(lat=lat, lon=lon)
             
-            # Process and integrate data
-            integrated_data = {
-                'timestamp': datetime.now().isoformat(),
-                'location': {
-                    'latitude': 15.2993,
-                    'longitude': 74.1240,
-                    'name': 'Goa, India'
-                },
-                'air_quality': self._integrate_air_quality_data(
-                    tempo_response.get('data', {}),
-                    openaq_response.get('data', {})
-                ),
-                'weather': weather_response.get('data', {}),
-                'sources': {
-                    'satellite': tempo_response.get('source', 'unknown'),
-                    'ground': openaq_response.get('source', 'unknown'),
-                    'weather': weather_response.get('source', 'unknown')
-                }
-            }
+            return self._integrate_current_data(lat, lon, name, tempo_response, openaq_response, weather_response)
             
-            # Calculate AQI
-            pollutant_data = {
-                'pm25': integrated_data['air_quality'].get('pm25'),
-                'pm10': integrated_data['air_quality'].get('pm10'),
-                'no2': integrated_data['air_quality'].get('no2'),
-                'o3': integrated_data['air_quality'].get('o3'),
-                'so2': integrated_data['air_quality'].get('so2'),
-                'co': integrated_data['air_quality'].get('co')
+        except Exception as e:
+            print(f"Error integrating current data: {e}")
+            return {
+                'status': 'error',
+                'message': str(e),
+                'data': None
             }
+    
+    async def get_integrated_current_data_async(self, location=None, client=None):
+        """
+        get_integrated_current_data with OpenAQ and Open-Meteo fetched concurrently on
+        an httpx.AsyncClient; the TEMPO lookup (local grid, occasional ingest) and the
+        integration (SQLite write) run in threads
+        """
+        try:
+            lat, lon, name = self._resolve_location(location)
             
-            aqi_value = self.aqi_calculator.calculate_composite_aqi(pollutant_data)
-            aqi_info = self.aqi_calculator.get_aqi_category(aqi_value)
-            
-            integrated_data['aqi'] = aqi_info
+            tempo_response, openaq_response, weather_response = await asyncio.gather(
+                tracing.traced_await(
+                    'upstream.tempo', asyncio.to_thread(self.tempo_api.get_latest_data, lat=lat, lon=lon)
+                ),
+                tracing.traced_await(
+                    'upstream.openaq', self.openaq_api.get_latest_measurements_async(client, lat=lat, lon=lon)
+                ),
+                tracing.traced_await(
+                    'upstream.open_meteo', self.weather_api.get_current_weather_async(client, lat=lat, lon=lon)
+                )
+            )
             
-            return {
-                'status': 'success',
-                'data': integrated_data
-            }
+            # Integration blocks (store write, quality checks): keep it off the event loop
+            return await asyncio.to_thread(
+                self._integrate_current_data, lat, lon, name, tempo_response, openaq_response, weather_response
+            )
             
         except Exception as e:
             print(f"Error integrating current data: {e}")
@@ -79,6 +195,171 @@ class DataProcessor:
                 'data': None
             }
     
+    @tracing.traced('integrate.current_data')
+    def _integrate_current_data(self, lat, lon, name, tempo_response, openaq_response, weather_response):
+        """Combine the per-source responses into one reading with its AQI"""
+        # Process and integrate data
+        integrated_data = {
+            'timestamp': local_now().isoformat(),
+            'location': {
+                'latitude': lat,
+                'longitude': lon,
+                'name': name
+            },
+            'air_quality': self._integrate_air_quality_data(
+                tempo_response.get('data', {}),
+                openaq_response.get('data', {})
+            ),
+            'weather': weather_response.get('data', {}),
+            'sources': {
+                'satellite': tempo_response.get('source', 'unknown'),
+                'ground': openaq_response.get('source', 'unknown'),
+                'weather': weather_response.get('source', 'unknown')
+            }
+        }
+        
+        # Quality flags are computed once per reading, against the location's recent history
+        integrated_data['quality_flags'] = self._quality_flags(
+            name, integrated_data, tempo_response.get('data', {})
+        )
+        
+        # Calculate AQI
+        pollutant_data = {
+            'pm25': integrated_data['air_quality'].get('pm25'),
+            'pm10': integrated_data['air_quality'].get('pm10'),
+            'no2': integrated_data['air_quality'].get('no2'),
+            'o3': integrated_data['air_quality'].get('o3'),
+            'so2': integrated_data['air_quality'].get('so2'),
+            'co': integrated_data['air_quality'].get('co')
+        }
+        
+        aqi_value = self.aqi_calculator.calculate_composite_aqi(pollutant_data)
+        aqi_info = self.aqi_calculator.get_aqi_category(aqi_value)
+        
+        integrated_data['aqi'] = aqi_info
+        
+        # Sources served from their last good reading while the upstream is failing
+        stale_sources = {
+            source: response.get('age_seconds')
+            for source, response in (('ground', openaq_response), ('weather', weather_response))
+            if response.get('stale')
+        }
+        if stale_sources:
+            integrated_data['stale_sources'] = stale_sources
+        
+        # A stale ground reading is not a new observation
+        if 'ground' not in stale_sources:
+            ground_source = openaq_response.get('source', '')
+            ground_data = openaq_response.get('data', {})
+            satellite = {}
+            if not ground_source.endswith('_MOCK'):
+                satellite = self._satellite_columns(tempo_response.get('data', {}), ground_data)
+            self._record_observation(integrated_data, ground_source, ground_data, satellite)
+        
+        return {
+            'status': 'success',
+            'data': integrated_data
+        }
+    
+    def _quality_flags(self, name, integrated_data, tempo_data):
+        """
+        Packed data-quality flags (models.data_quality) for a new reading, checked
+        together with the location's stored readings from the last few hours
+        """
+        hour = datetime.fromisoformat(integrated_data['timestamp']).replace(minute=0, second=0, microsecond=0)
+        try:
+            history = self.observation_store.fetch(
+                location=name,
+                start=hour - timedelta(hours=data_quality.FLATLINE_HOURS),
+                include_mock=True
+            )
+        except Exception as e:
+            print(f"Error reading observation history: {e}")
+            history = []
+        # This hour's stored reading is about to be replaced by the new one
+        history = [row for row in history if row['observed_at'] < hour.isoformat()]
+        
+        satellite_no2 = np.full(len(history) + 1, np.nan)
+        estimate = self._satellite_estimate('no2', tempo_data)
+        if estimate is not None:
+            satellite_no2[-1] = estimate
+        
+        flags = data_quality.check(
+            data_quality.value_matrix(history + [integrated_data['air_quality']]),
+            data_quality.hour_index([row['observed_at'] for row in history] + [hour]),
+            satellite_no2
+        )
+        return int(data_quality.pack(flags[-1]))
+    
+    def _satellite_estimate(self, pollutant, tempo_data):
+        """
+        Surface concentration from TEMPO for a pollutant: real columns (molecules/cm^2)
+        go through the running calibration, mock values already are concentrations
+        """
+        if not tempo_data:
+            return None
+        column = tempo_data.get(f'{pollutant}_column')
+        if tempo_data.get('column_units') is None:
+            return column
+        return self.calibration.calibrate(pollutant, column)
+    
+    def _satellite_columns(self, tempo_data, ground_data):
+        """
+        Real TEMPO columns to store with the observation, only for pollutants with a
+        ground reading alongside: the stored pairs are what the calibration fits
+        """
+        if not tempo_data or tempo_data.get('column_units') is None or not ground_data:
+            return {}
+        return {
+            f'tempo_{pollutant}': tempo_data[f'{pollutant}_column']
+            for pollutant in CALIBRATED_POLLUTANTS
+            if tempo_data.get(f'{pollutant}_column') is not None and ground_data.get(pollutant) is not None
+        }
+    
+    def _record_observation(self, integrated_data, ground_source, ground_data, satellite=None):
+        """
+        Persist an integrated reading for incremental model updates and lag features
+        Only measured ground values are stored: gap-filled satellite estimates would
+        otherwise be paired with TEMPO columns and fed back into the calibration
+        """
+        self.feature_store.update(
+            integrated_data['location']['name'],
+            integrated_data['timestamp'],
+            integrated_data['air_quality']
+        )
+        
+        try:
+            self.observation_store.record(
+                integrated_data['location']['name'],
+                integrated_data['timestamp'],
+                {
+                    pollutant: value for pollutant, value in integrated_data['air_quality'].items()
+                    if ground_data.get(pollutant) is not None
+                },
+                integrated_data['weather'],
+                is_mock=ground_source.endswith('_MOCK'),
+                quality_flags=integrated_data['quality_flags'],
+                satellite=satellite
+            )
+        except Exception as e:
+            print(f"Error recording observation: {e}")
+    
+    def get_lag_features(self, location_name):
+        """
+        Lag and rolling-window features for a location from the in-memory feature store
+        """
+        return self.feature_store.features(location_name)
+    
+    def get_future_weather(self, location_name, hours=24):
+        """
+        Forecast weather for a location's next ``hours`` hours from the cached hourly
+        Open-Meteo forecast ({variable: array}); never waits on the network
+        """
+        # The cached series is in Config.LOCAL_TIMEZONE, like local_now()
+        start = local_now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        return self.weather_api.forecast.ahead(location_name, start, hours)
+    
+    @tracing.traced('integrate.air_quality')
     def _integrate_air_quality_data(self, tempo_data, openaq_data):
         """
         Integrate satellite and ground-based measurements
@@ -98,22 +379,33 @@ class DataProcessor:
             })
         
         # Fill missing values with satellite data
-        if tempo_data:
-            if integrated.get('no2') is None:
-                integrated['no2'] = tempo_data.get('no2_column')
-            if integrated.get('o3') is None:
-                integrated['o3'] = tempo_data.get('o3_column')
+        # Real TEMPO columns (molecules/cm^2) are converted by the ground-calibrated fit
+        # and left out until that fit has enough co-located hours
+        for pollutant in CALIBRATED_POLLUTANTS:
+            if integrated.get(pollutant) is None:
+                integrated[pollutant] = self._satellite_estimate(pollutant, tempo_data)
         
         # Remove None values
         integrated = {k: v for k, v in integrated.items() if v is not None}
         
         return integrated
     
-    def get_historical_trends(self, days=7):
+    @tracing.traced('trends.historical')
+    def get_historical_trends(self, days=7, location=None):
         """
-        Get historical data for trend analysis
+        Get historical data for trend analysis: daily means of the stored real
+        observations (live and backfilled) of one or all locations, newest day
+        first; mock data only while nothing real is stored for the period
         """
         try:
+            stored = self._stored_trends(days, location)
+            if stored:
+                return {
+                    'status': 'success',
+                    'data': stored,
+                    'source': 'observations'
+                }
+            
             # Get historical data from TEMPO
             tempo_historical = self.tempo_api.get_historical_data(days=days)
             
@@ -147,7 +439,8 @@ class DataProcessor:
             
             return {
                 'status': 'success',
-                'data': trends
+                'data': trends,
+                'source': tempo_historical.get('source')
             }
             
         except Exception as e:
@@ -158,43 +451,57 @@ class DataProcessor:
                 'data': []
             }
     
+    def _stored_trends(self, days, location=None):
+        """Daily mean pollutants and AQI from the observation store, newest day first"""
+        start = local_now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        daily = {}
+        for row in self.observation_store.fetch(location=location, start=start):
+            day = daily.setdefault(row['observed_at'][:10], {pollutant: [] for pollutant in TREND_POLLUTANTS})
+            for pollutant in TREND_POLLUTANTS:
+                if row[pollutant] is not None:
+                    day[pollutant].append(row[pollutant])
+        
+        trends = []
+        for date in sorted(daily, reverse=True):
+            point = {
+                pollutant: float(np.mean(values)) if values else None
+                for pollutant, values in daily[date].items()
+            }
+            if all(value is None for value in point.values()):
+                continue
+            point['aqi'] = self.aqi_calculator.calculate_composite_aqi(point)
+            trends.append({'date': date, **point})
+        return trends
+    
+    @tracing.traced('validation.data_quality')
     def validate_data_quality(self, data):
         """
         Validate data quality and consistency
+        Uses the quality flags computed when the reading was ingested (range, spike,
+        flatline and satellite/ground checks); readings without them get the
+        checks that need no history
         """
+        air_quality = data.get('air_quality', {})
+        flags = data.get('quality_flags')
+        if flags is None:
+            flags = int(data_quality.pack(data_quality.check(data_quality.value_matrix([air_quality]))[0]))
+        
         validation_results = {
             'is_valid': True,
-            'issues': [],
-            'confidence_score': 1.0
+            'issues': data_quality.issues(flags, air_quality),
+            'confidence_score': data_quality.confidence(flags),
+            'flags': data_quality.describe(flags)
         }
         
-        air_quality = data.get('air_quality', {})
-        
-        # Check for reasonable value ranges
-        checks = [
-            ('pm25', air_quality.get('pm25'), 0, 500),
-            ('pm10', air_quality.get('pm10'), 0, 600),
-            ('no2', air_quality.get('no2'), 0, 1000),
-            ('o3', air_quality.get('o3'), 0, 1000)
-        ]
-        
-        for param, value, min_val, max_val in checks:
-            if value is not None:
-                if value < min_val or value > max_val:
-                    validation_results['issues'].append(
-                        f"{param} value {value} outside expected range [{min_val}-{max_val}]"
-                    )
-                    validation_results['confidence_score'] *= 0.8
-        
         # Check data freshness
         try:
             timestamp = datetime.fromisoformat(data.get('timestamp', ''))
-            age_minutes = (datetime.now() - timestamp).total_seconds() / 60
+            age_minutes = (local_now() - timestamp).total_seconds() / 60
             
             if age_minutes > 60:  # Data older than 1 hour
                 validation_results['issues'].append(f"Data is {age_minutes:.1f} minutes old")
                 validation_results['confidence_score'] *= 0.9
-        except:
+        except (TypeError, ValueError):
             validation_results['issues'].append("Invalid timestamp")
             validation_results['confidence_score'] *= 0.9
         
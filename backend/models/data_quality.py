@@ -0,0 +1,190 @@
+import numpy as np
+
+# Pollutants checked, in column order of the value arrays
+POLLUTANTS = ['pm25', 'pm10', 'no2', 'o3', 'so2', 'co']
+
+# Plausible range per pollutant (µg/m³; CO in mg/m³), the CPCB breakpoint tables plus headroom
+VALID_RANGES = {
+    'pm25': (0, 500),
+    'pm10': (0, 600),
+    'no2': (0, 1000),
+    'o3': (0, 1000),
+    'so2': (0, 2000),
+    'co': (0, 50)
+}
+
+# Largest believable departure from the median of the previous SPIKE_WINDOW hours
+MAX_HOURLY_CHANGE = {
+    'pm25': 150,
+    'pm10': 250,
+    'no2': 200,
+    'o3': 200,
+    'so2': 300,
+    'co': 10
+}
+SPIKE_WINDOW = 3
+
+# Identical readings for this many consecutive observations suggest a stuck sensor
+FLATLINE_HOURS = 6
+
+# Satellite vs ground NO2: disagreement beyond this factor and this absolute gap (µg/m³)
+CROSS_SOURCE_MAX_RATIO = 3.0
+CROSS_SOURCE_MIN_GAP = 20.0
+
+# Check bits, packed per pollutant: pollutant i uses bits [4i, 4i + 4)
+RANGE, SPIKE, FLATLINE, CROSS_SOURCE = 1, 2, 4, 8
+FLAG_BITS = 4
+CHECKS = {
+    RANGE: ('range', 0.8),
+    SPIKE: ('spike', 0.85),
+    FLATLINE: ('flatline', 0.85),
+    CROSS_SOURCE: ('cross_source', 0.9)
+}
+
+_LOW, _HIGH = np.array([VALID_RANGES[p] for p in POLLUTANTS], dtype=float).T
+_MAX_CHANGE = np.array([MAX_HOURLY_CHANGE[p] for p in POLLUTANTS], dtype=float)
+_NO2 = POLLUTANTS.index('no2')
+
+
+def value_matrix(readings):
+    """(n, len(POLLUTANTS)) float array from reading dicts, NaN where a pollutant is missing"""
+    return np.array([
+        [np.nan if reading.get(p) is None else reading[p] for p in POLLUTANTS]
+        for reading in readings
+    ], dtype=float).reshape(len(readings), len(POLLUTANTS))
+
+
+def hour_index(timestamps):
+    """Hours since the epoch for ISO timestamps or datetimes"""
+    return np.array(timestamps, dtype='datetime64[us]').astype('datetime64[h]').astype(np.int64)
+
+
+def check(values, hours=None, satellite_no2=None):
+    """
+    Quality flags for a chronological series of observations from one location
+
+    values is (n, len(POLLUTANTS)) with NaN for missing readings, hours the
+    observation hour of each row (consecutive rows are assumed hourly when
+    omitted) and satellite_no2 an optional (n,) surface NO2 estimate from
+    TEMPO in µg/m³. Returns an (n, len(POLLUTANTS)) uint8 array of check bits.
+    Missing values are never flagged.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    hours = np.arange(n) if hours is None else np.asarray(hours)
+    present = ~np.isnan(values)
+    flags = np.zeros(values.shape, dtype=np.uint8)
+
+    # Range
+    with np.errstate(invalid='ignore'):
+        flags[present & ((values < _LOW) | (values > _HIGH))] |= RANGE
+
+    # Spike: departure from the median of the readings in the previous SPIKE_WINDOW hours
+    if n > 1:
+        padded = np.concatenate([np.full((SPIKE_WINDOW, values.shape[1]), np.nan), values])
+        previous = np.lib.stride_tricks.sliding_window_view(padded[:-1], SPIKE_WINDOW, axis=0)
+        padded_hours = np.concatenate([np.full(SPIKE_WINDOW, np.iinfo(np.int64).min // 2), hours])
+        previous_hours = np.lib.stride_tricks.sliding_window_view(padded_hours[:-1], SPIKE_WINDOW)
+        recent = (hours[:, None] - previous_hours) <= SPIKE_WINDOW
+        previous = np.where(recent[:, None, :], previous, np.nan)
+        has_baseline = ~np.isnan(previous).all(axis=2)
+        baseline = np.full(values.shape, np.nan)
+        if has_baseline.any():
+            baseline[has_baseline] = np.nanmedian(previous[has_baseline], axis=1)
+        with np.errstate(invalid='ignore'):
+            flags[present & has_baseline & (np.abs(values - baseline) > _MAX_CHANGE)] |= SPIKE
+
+    # Flatline: length of the run of identical readings ending at each row
+    same = np.zeros(values.shape, dtype=bool)
+    same[1:] = values[1:] == values[:-1]
+    rows = np.broadcast_to(np.arange(n)[:, None], values.shape)
+    run_start = np.maximum.accumulate(np.where(same, 0, rows), axis=0)
+    flags[present & (rows - run_start + 1 >= FLATLINE_HOURS)] |= FLATLINE
+
+    # Cross-source: TEMPO-derived vs ground NO2
+    if satellite_no2 is not None:
+        satellite = np.asarray(satellite_no2, dtype=float)
+        ground = values[:, _NO2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.maximum(satellite, ground) / np.minimum(satellite, ground)
+            disagree = (ratio > CROSS_SOURCE_MAX_RATIO) & (np.abs(satellite - ground) > CROSS_SOURCE_MIN_GAP)
+        flags[disagree & present[:, _NO2], _NO2] |= CROSS_SOURCE
+
+    return flags
+
+
+def pack(flags):
+    """Per-pollutant check bits -> one integer per observation, for storage"""
+    flags = np.asarray(flags, dtype=np.int64)
+    shifts = np.arange(flags.shape[-1]) * FLAG_BITS
+    return (flags << shifts).sum(axis=-1)
+
+
+def unpack(packed):
+    """Inverse of pack: (..., len(POLLUTANTS)) check bits"""
+    packed = np.asarray(packed, dtype=np.int64)
+    shifts = np.arange(len(POLLUTANTS)) * FLAG_BITS
+    return ((packed[..., None] >> shifts) & ((1 << FLAG_BITS) - 1)).astype(np.uint8)
+
+
+def describe(packed):
+    """{pollutant: [check names]} for one observation's packed flags (empty if clean)"""
+    row = unpack(packed)
+    return {
+        pollutant: [name for bit, (name, _) in CHECKS.items() if row[i] & bit]
+        for i, pollutant in enumerate(POLLUTANTS) if row[i]
+    }
+
+
+def issues(packed, air_quality):
+    """Readable issue per failed check of one observation, e.g. for API validation results"""
+    row = unpack(packed)
+    messages = []
+    for i, pollutant in enumerate(POLLUTANTS):
+        value = air_quality.get(pollutant)
+        if row[i] & RANGE:
+            low, high = VALID_RANGES[pollutant]
+            messages.append(f"{pollutant} value {value} outside expected range [{low}-{high}]")
+        if row[i] & SPIKE:
+            messages.append(f"{pollutant} value {value} departs from the last {SPIKE_WINDOW} hours "
+                            f"by more than {MAX_HOURLY_CHANGE[pollutant]}")
+        if row[i] & FLATLINE:
+            messages.append(f"{pollutant} unchanged at {value} for {FLATLINE_HOURS}+ readings")
+        if row[i] & CROSS_SOURCE:
+            messages.append(f"{pollutant} ground value {value} disagrees with the satellite estimate")
+    return messages
+
+
+def confidence(packed):
+    """Confidence multiplier for one observation: each failed check costs its penalty"""
+    row = unpack(packed)
+    score = 1.0
+    for bit, (_, penalty) in CHECKS.items():
+        score *= penalty ** int(np.count_nonzero(row & bit))
+    return score
+
+
+def flag_observations(rows, satellite_no2=None):
+    """
+    Set rows[i]['quality_flags'] (packed) for observation rows as stored by
+    ObservationStore, checked per location in chronological order
+
+    satellite_no2 optionally maps row index -> TEMPO surface NO2 estimate.
+    """
+    by_location = {}
+    for i, row in enumerate(rows):
+        by_location.setdefault(row['location'], []).append(i)
+
+    for indices in by_location.values():
+        indices.sort(key=lambda i: str(rows[i]['observed_at']))
+        satellite = None
+        if satellite_no2:
+            satellite = np.array([satellite_no2.get(i, np.nan) for i in indices], dtype=float)
+        packed = pack(check(
+            value_matrix([rows[i] for i in indices]),
+            hour_index([rows[i]['observed_at'] for i in indices]),
+            satellite
+        ))
+        for i, flags in zip(indices, packed):
+            rows[i]['quality_flags'] = int(flags)
+    return rows
@@ -0,0 +1,153 @@
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from utils.clock import local_now
+
+# Lag and rolling-window features served to the forecaster (hours)
+LAG_HOURS = [1, 3, 24]
+ROLLING_WINDOWS = [3, 24]
+LAGGED_POLLUTANTS = ['pm25', 'pm10']
+
+
+def lag_feature_names():
+    """Feature names produced by the store, in model order"""
+    names = []
+    for pollutant in LAGGED_POLLUTANTS:
+        names += [f'{pollutant}_lag{lag}' for lag in LAG_HOURS]
+        names += [f'{pollutant}_roll{window}' for window in ROLLING_WINDOWS]
+    return names
+
+
+class _RingBuffer:
+    """
+    Fixed-capacity hourly ring buffer with running window sums
+    """
+
+    def __init__(self, capacity, n_vars):
+        self.values = np.zeros((capacity, n_vars))
+        self.capacity = capacity
+        self.head = -1          # slot of the latest hour
+        self.count = 0
+        self.last_hour = None
+        self.window_sums = np.zeros((len(ROLLING_WINDOWS), n_vars))
+
+    def at(self, offset):
+        """Row ``offset`` hours before the latest (a view, not a copy)"""
+        return self.values[(self.head - offset) % self.capacity]
+
+    def push(self, row):
+        """Append the next hour, updating every window sum in O(1)"""
+        for i, window in enumerate(ROLLING_WINDOWS):
+            if self.count >= window:
+                self.window_sums[i] -= self.at(window - 1)
+            self.window_sums[i] += row
+
+        self.head = (self.head + 1) % self.capacity
+        self.values[self.head] = row
+        self.count = min(self.count + 1, self.capacity)
+
+        # Re-sum exactly once per lap to stop floating-point drift (amortized O(1))
+        if self.head == 0:
+            for i, window in enumerate(ROLLING_WINDOWS):
+                n = min(window, self.count)
+                self.window_sums[i] = sum(self.at(k) for k in range(n))
+
+    def replace(self, offset, row):
+        """Overwrite an hour already in the buffer, adjusting the windows that contain it"""
+        old = self.at(offset).copy()
+        for i, window in enumerate(ROLLING_WINDOWS):
+            if offset < min(window, self.count):
+                self.window_sums[i] += row - old
+        self.values[(self.head - offset) % self.capacity] = row
+
+
+class FeatureStore:
+    """
+    Rolling in-memory window of recent hourly observations per location
+
+    Lag and rolling-mean features are read from the ring buffer and running
+    sums, so updates and lookups are O(1) with no per-request I/O.
+    """
+
+    def __init__(self, capacity=48):
+        if capacity <= max(LAG_HOURS + ROLLING_WINDOWS):
+            raise ValueError('capacity must exceed the longest lag/window')
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hour(timestamp):
+        """Truncate a datetime or ISO string to the hour"""
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        return timestamp.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+    def update(self, location, timestamp, air_quality):
+        """
+        Record the reading for its hour; repeated readings within an hour replace it
+        """
+        row = np.array([
+            np.nan if air_quality.get(p) is None else float(air_quality[p])
+            for p in LAGGED_POLLUTANTS
+        ])
+        hour = self._hour(timestamp)
+
+        with self._lock:
+            buffer = self._buffers.get(location)
+            if buffer is None:
+                buffer = self._buffers[location] = _RingBuffer(self.capacity, len(LAGGED_POLLUTANTS))
+
+            if buffer.last_hour is not None:
+                # Carry the last known value over missing pollutants so the sums stay finite
+                row = np.where(np.isnan(row), buffer.at(0), row)
+            if np.isnan(row).any():
+                return
+
+            if buffer.last_hour is None:
+                buffer.push(row)
+                buffer.last_hour = hour
+                return
+
+            offset = int((buffer.last_hour - hour) / timedelta(hours=1))
+            if offset >= 0:
+                # Same hour or a late reading still inside the window
+                if offset < buffer.count:
+                    buffer.replace(offset, row)
+                return
+
+            # Forward-fill skipped hours (bounded by capacity), then append
+            gap = min(-offset - 1, self.capacity)
+            last = buffer.at(0).copy()
+            for _ in range(gap):
+                buffer.push(last)
+            buffer.push(row)
+            buffer.last_hour = hour
+
+    def features(self, location):
+        """
+        Lag and rolling-mean features for the latest hour, or None if no history
+        Lags older than the stored history fall back to the oldest value held
+        """
+        with self._lock:
+            buffer = self._buffers.get(location)
+            if buffer is None or buffer.count == 0:
+                return None
+
+            features = {}
+            for j, pollutant in enumerate(LAGGED_POLLUTANTS):
+                for lag in LAG_HOURS:
+                    features[f'{pollutant}_lag{lag}'] = float(buffer.at(min(lag, buffer.count - 1))[j])
+                for i, window in enumerate(ROLLING_WINDOWS):
+                    features[f'{pollutant}_roll{window}'] = float(
+                        buffer.window_sums[i][j] / min(window, buffer.count)
+                    )
+            return features
+
+    def warm_from_store(self, observation_store, hours=None):
+        """
+        Load the most recent hours of every location from the observation store (startup only)
+        """
+        start = local_now() - timedelta(hours=hours or self.capacity)
+        for row in observation_store.fetch(start=start):
+            self.update(row['location'], row['observed_at'], row)
@@ -1,58 +1,119 @@
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, TimeSeriesSplit
+from sklearn.base import clone
 from sklearn.metrics import mean_absolute_error, r2_score
 import joblib
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import os
+from config import Config
+from models.inference import InferencePipeline
+from models.feature_store import LAG_HOURS, ROLLING_WINDOWS, LAGGED_POLLUTANTS, lag_feature_names
+from utils import metrics, tracing
+from utils.clock import local_now
+
+# Model inputs before the lag/rolling features, in column order. Serving builds
+# feature rows as NumPy arrays in this order; pandas is only used for training.
+BASE_FEATURES = [
+    'pm25_current', 'pm10_current', 'no2_current', 'o3_current',
+    'temperature', 'humidity', 'wind_speed', 'hour_of_day',
+    'day_of_week', 'month'
+]
+
+# Weather inputs that take hourly forecast values when a weather forecast is available
+WEATHER_FEATURES = ['temperature', 'humidity', 'wind_speed']
+
+# Column of the current value each lag/rolling feature falls back to when missing
+LAG_FALLBACK_COLUMNS = [
+    (name, BASE_FEATURES.index(f"{name.split('_')[0]}_current")) for name in lag_feature_names()
+]
+
+# Estimator backends selectable via Config.FORECAST_BACKEND
+ESTIMATOR_BACKENDS = {
+    'random_forest': lambda n_jobs: RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs),
+    'hist_gradient_boosting': lambda n_jobs: HistGradientBoostingRegressor(max_iter=200, random_state=42),
+    'linear': lambda n_jobs: LinearRegression()
+}
 
 class AirQualityForecaster:
     """
     Machine Learning model for 24-hour air quality forecasting
+    With a ``location`` it saves and loads that location's own artifact
+    (see train_location_models)
     """
     
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+    def __init__(self, backend=None, n_jobs=-1, location=None):
+        self.backend = backend or Config.FORECAST_BACKEND
+        self.location = location
+        if self.backend not in ESTIMATOR_BACKENDS:
+            raise ValueError(
+                f"Unknown forecast backend '{self.backend}', expected one of {sorted(ESTIMATOR_BACKENDS)}"
+            )
+        self.n_jobs = n_jobs
+        self.model = ESTIMATOR_BACKENDS[self.backend](n_jobs)
         self.scaler = StandardScaler()
+        # Scaler and model fused for serving, rebuilt after every fit
+        self.pipeline = None
+        self.training_time = None
         self.is_trained = False
-        self.feature_names = [
-            'pm25_current', 'pm10_current', 'no2_current', 'o3_current',
-            'temperature', 'humidity', 'wind_speed', 'hour_of_day',
-            'day_of_week', 'month', 'pm25_lag1', 'pm10_lag1'
-        ]
-    
-    def prepare_features(self, current_data, weather_data, historical_data=None):
-        """
-        Prepare features for ML model
-        """
-        now = datetime.now()
-        
-        features = {
-            'pm25_current': current_data.get('pm25', 50),
-            'pm10_current': current_data.get('pm10', 80),
-            'no2_current': current_data.get('no2', 40),
-            'o3_current': current_data.get('o3', 100),
-            'temperature': weather_data.get('temperature', 28),
-            'humidity': weather_data.get('humidity', 75),
-            'wind_speed': weather_data.get('wind_speed', 10),
-            'hour_of_day': now.hour,
-            'day_of_week': now.weekday(),
-            'month': now.month,
-            'pm25_lag1': current_data.get('pm25', 50) * 0.9,  # Mock lag feature
-            'pm10_lag1': current_data.get('pm10', 80) * 0.9   # Mock lag feature
-        }
         
-        return pd.DataFrame([features])
+        # Incremental update state, reset by every full retrain
+        self.baseline_mae = None
+        self.trained_until = None
+        self.batches_since_full_train = 0
+        self.drift = {}
+        self._normal_equations = None
+        self.feature_names = BASE_FEATURES + lag_feature_names()
+        
+        # Saved artifact this instance serves (mtime), to notice models saved by other workers
+        self._artifact_mtime = None
+        self._artifact_checked_at = 0.0
+    
+    def prepare_features(self, current_data, weather_data, historical_data=None, when=None, out=None):
+        """
+        Prepare features for ML model: one row in feature_names order, written
+        into ``out`` (e.g. a row of a preallocated batch) or a new array
+        historical_data holds lag/rolling features from the FeatureStore;
+        any that are missing fall back to the current value (persistence)
+        """
+        when = when or local_now()
+        historical_data = historical_data or {}
+        if out is None:
+            out = np.empty(len(self.feature_names))
+        
+        out[:len(BASE_FEATURES)] = (
+            current_data.get('pm25', 50),
+            current_data.get('pm10', 80),
+            current_data.get('no2', 40),
+            current_data.get('o3', 100),
+            weather_data.get('temperature', 28),
+            weather_data.get('humidity', 75),
+            weather_data.get('wind_speed', 10),
+            when.hour,
+            when.weekday(),
+            when.month
+        )
+        
+        for column, (name, fallback) in enumerate(LAG_FALLBACK_COLUMNS, start=len(BASE_FEATURES)):
+            value = historical_data.get(name)
+            out[column] = out[fallback] if value is None else value
+        
+        return out
     
-    def generate_training_data(self, days=30):
+    def generate_training_data(self, days=30, seed=42):
         """
         Generate synthetic training data for demonstration
         In production, use real historical data
+        Rows are in chronological (hourly) order
         """
-        np.random.seed(42)
+        import pandas as pd
+        
+        np.random.seed(seed)
         training_data = []
         
         for day in range(days):
@@ -81,116 +142,354 @@ class AirQualityForecaster:
                     'wind_speed': max(0, wind),
                     'hour_of_day': hour,
                     'day_of_week': day % 7,
-                    'month': 11,  # November
-                    'pm25_lag1': max(5, base_pm25 * 0.95),
-                    'pm10_lag1': max(10, base_pm10 * 0.95),
-                    # Target: next hour's PM2.5 (simplified single target)
-                    'pm25_next': max(5, base_pm25 + np.random.normal(0, 5))
+                    'month': 11  # November
                 }
                 
                 training_data.append(features)
         
-        return pd.DataFrame(training_data)
+        # Lag/rolling features and the next-hour target come from the series itself
+        df = _add_lag_features(pd.DataFrame(training_data))
+        return df.dropna().reset_index(drop=True)
+    
+    def _split_training_data(self, df):
+        """Chronological train/test split (the last 20% of hours are held out)"""
+        X = df[self.feature_names].to_numpy()
+        y = df['pm25_next'].to_numpy()
+        
+        return train_test_split(X, y, test_size=0.2, shuffle=False)
     
-    def train_model(self):
+    def cross_validate(self, df, n_splits=None):
         """
-        Train the forecasting model
+        Rolling-origin evaluation: each fold trains on all hours before the
+        origin and is scored on the block of hours that follows it, so no
+        future observations leak into training
         """
-        print("Generating training data...")
-        df = self.generate_training_data(days=60)
+        n_splits = n_splits or Config.TRAINING_CV_SPLITS
+        X = df[self.feature_names].to_numpy()
+        y = df['pm25_next'].to_numpy()
         
-        # Prepare features and target
-        X = df[self.feature_names]
-        y = df['pm25_next']
+        fold_mae = []
+        fold_r2 = []
+        for train_idx, test_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+            scaler = StandardScaler()
+            model = clone(self.model)
+            model.fit(scaler.fit_transform(X[train_idx]), y[train_idx])
+            y_pred = model.predict(scaler.transform(X[test_idx]))
+            fold_mae.append(mean_absolute_error(y[test_idx], y_pred))
+            fold_r2.append(r2_score(y[test_idx], y_pred))
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        return {
+            'mae': float(np.mean(fold_mae)),
+            'r2_score': float(np.mean(fold_r2)),
+            'fold_mae': [round(float(m), 3) for m in fold_mae],
+            'n_splits': n_splits
+        }
+    
+    @tracing.traced('forecast.train_model')
+    def train_model(self, save=True, df=None, days=60):
+        """
+        Train the forecasting model
+        """
+        if df is None:
+            print("Generating training data...")
+            df = self.generate_training_data(days=days)
+        
+        # Evaluate on rolling-origin splits before fitting on the full history
+        print(f"Cross-validating {self.backend} model...")
+        cv_metrics = self.cross_validate(df)
         
         # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        X_scaled = self.scaler.fit_transform(df[self.feature_names].to_numpy())
         
         # Train model
-        print("Training Random Forest model...")
-        self.model.fit(X_train_scaled, y_train)
+        print(f"Training {self.backend} model...")
+        start = time.perf_counter()
+        self.model.fit(X_scaled, df['pm25_next'])
+        self.training_time = time.perf_counter() - start
+        metrics.MODEL_TRAIN_SECONDS.observe(self.training_time)
         
-        # Evaluate
-        y_pred = self.model.predict(X_test_scaled)
-        mae = mean_absolute_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
+        # Single-row predictions are faster without the joblib thread pool
+        if 'n_jobs' in self.model.get_params():
+            self.model.set_params(n_jobs=1)
+        self.pipeline = InferencePipeline(self.scaler, self.model, self.feature_names, self.backend)
         
+        mae = cv_metrics['mae']
+        r2 = cv_metrics['r2_score']
         print(f"Model Performance - MAE: {mae:.2f}, R²: {r2:.3f}")
         
         self.is_trained = True
+        self.baseline_mae = mae
+        self.trained_until = df['observed_at'].max() if 'observed_at' in df else None
+        self.batches_since_full_train = 0
+        self.drift = {}
+        if self.backend == 'linear':
+            self._normal_equations = self._accumulate_normal_equations(X_scaled, df['pm25_next'].to_numpy())
         
         # Save model
-        self.save_model()
+        if save:
+            self.save_model()
         
         return {
+            'backend': self.backend,
             'mae': mae,
             'r2_score': r2,
+            'cv_fold_mae': cv_metrics['fold_mae'],
+            'training_time_s': self.training_time,
             'status': 'trained'
         }
     
-    def predict_24h_forecast(self, current_data, weather_data):
+    @staticmethod
+    def _accumulate_normal_equations(X_scaled, y, normal_equations=None):
+        """Add a batch to the least-squares sufficient statistics (X'X, X'y)"""
+        X_aug = np.hstack([X_scaled, np.ones((len(X_scaled), 1))])
+        xtx = X_aug.T @ X_aug
+        xty = X_aug.T @ y
+        if normal_equations is not None:
+            xtx += normal_equations[0]
+            xty += normal_equations[1]
+        return xtx, xty
+    
+    def update_model(self, df, window=None):
         """
-        Generate 24-hour forecast
+        Fold a batch of new observations into the fitted model without
+        reprocessing history. ``window`` holds the recent rows (the batch
+        included) that new trees and iterations are fitted on, so no part of
+        the ensemble ever learns from a single small batch; default: the batch.
+        - random_forest: warm start adds trees fitted on the window, oldest trees are retired
+        - hist_gradient_boosting: warm start adds boosting iterations on the window
+        - linear: exact refit from accumulated sufficient statistics (batch only)
         """
         if not self.is_trained:
-            self.train_model()
+            raise RuntimeError('Model must be fully trained before incremental updates')
+        if len(df) == 0:
+            return {'status': 'skipped', 'reason': 'no new observations', 'drift': self.drift}
+        
+        X_scaled = self.scaler.transform(df[self.feature_names].to_numpy())
+        y = df['pm25_next'].to_numpy()
+        
+        # Prequential drift metrics: score the batch before learning from it; the MAE
+        # ratio (which can force a full retrain) needs DRIFT_MIN_BATCH_ROWS rows
+        batch_mae = float(mean_absolute_error(y, self.model.predict(X_scaled)))
+        feature_shift = np.abs(X_scaled.mean(axis=0))
+        judged = self.baseline_mae and len(df) >= Config.DRIFT_MIN_BATCH_ROWS
+        self.drift = {
+            'batch_mae': round(batch_mae, 3),
+            'baseline_mae': round(self.baseline_mae, 3),
+            'mae_ratio': round(batch_mae / self.baseline_mae, 3) if judged else None,
+            'max_feature_shift': round(float(feature_shift.max()), 3),
+            'most_shifted_feature': self.feature_names[int(feature_shift.argmax())],
+            'batch_size': len(df)
+        }
+        
+        if window is None:
+            window = df
+        X_window = self.scaler.transform(window[self.feature_names].to_numpy())
+        y_window = window['pm25_next'].to_numpy()
+        
+        start = time.perf_counter()
+        if self.backend == 'random_forest':
+            n_new = min(Config.INCREMENTAL_TREES, len(df))
+            self.model.set_params(warm_start=True, n_estimators=len(self.model.estimators_) + n_new)
+            self.model.fit(X_window, y_window)
+            # Sliding window over trees keeps the ensemble size (and latency) bounded
+            max_trees = Config.INCREMENTAL_MAX_TREES
+            if len(self.model.estimators_) > max_trees:
+                self.model.estimators_ = self.model.estimators_[-max_trees:]
+            self.model.set_params(warm_start=False, n_estimators=len(self.model.estimators_))
+        elif self.backend == 'hist_gradient_boosting':
+            self.model.set_params(
+                warm_start=True,
+                max_iter=self.model.n_iter_ + Config.INCREMENTAL_BOOSTING_ITERS
+            )
+            self.model.fit(X_window, y_window)
+            self.model.set_params(warm_start=False)
+        else:
+            self._normal_equations = self._accumulate_normal_equations(X_scaled, y, self._normal_equations)
+            solution = np.linalg.lstsq(self._normal_equations[0], self._normal_equations[1], rcond=None)[0]
+            self.model.coef_ = solution[:-1]
+            self.model.intercept_ = solution[-1]
+        self.pipeline = InferencePipeline(self.scaler, self.model, self.feature_names, self.backend)
+        update_time = time.perf_counter() - start
         
+        self.batches_since_full_train += 1
+        if 'observed_at' in df:
+            self.trained_until = df['observed_at'].max()
+        
+        return {
+            'status': 'updated',
+            'backend': self.backend,
+            'update_time_s': update_time,
+            'batches_since_full_train': self.batches_since_full_train,
+            'drift': self.drift,
+            'full_retrain_recommended': self.needs_full_retrain()
+        }
+    
+    def update_from_store(self, store):
+        """
+        Incrementally train on observations stored since the last (full or incremental)
+        fit; tree backends fit on the last INCREMENTAL_WINDOW_HOURS hours up to them
+        """
+        start = None
+        if self.trained_until:
+            # Recent window plus extra context so its first row has its longest lag feature
+            start = datetime.fromisoformat(self.trained_until) - timedelta(
+                hours=Config.INCREMENTAL_WINDOW_HOURS + max(LAG_HOURS + ROLLING_WINDOWS)
+            )
+        
+        history = build_training_frame(store.fetch(start=start))
+        df = history[history['observed_at'] > self.trained_until] if self.trained_until else history
+        if len(df) == 0:
+            return self.update_model(df)
+        
+        window_start = datetime.fromisoformat(df['observed_at'].max()) - timedelta(hours=Config.INCREMENTAL_WINDOW_HOURS)
+        return self.update_model(df, window=history[history['observed_at'] > window_start.isoformat()])
+    
+    def retrain_from_store(self, store, save=True):
+        """
+        Periodic full retrain on all stored history (synthetic data until enough is stored)
+        """
+        df = build_training_frame(store.fetch())
+        if len(df) < Config.MIN_STORE_TRAINING_ROWS:
+            return self.train_model(save=save)
+        return self.train_model(save=save, df=df)
+    
+    def needs_full_retrain(self):
+        """
+        Periodic full retrain: after too many incremental batches or when drift is detected
+        """
+        if not self.is_trained:
+            return True
+        if self.batches_since_full_train >= Config.INCREMENTAL_MAX_BATCHES:
+            return True
+        mae_ratio = self.drift.get('mae_ratio')
+        return mae_ratio is not None and mae_ratio > Config.DRIFT_MAE_RATIO
+    
+    def ensure_trained(self):
+        """
+        Load the saved model, or train (and save) one when none is usable;
+        once trained, pick up a newer model saved by another worker
+        """
+        if not self.is_trained:
+            if not self.load_model():
+                self.train_model()
+            return
+        self.reload_if_changed()
+    
+    def reload_if_changed(self):
+        """
+        Reload the saved artifact if another process replaced it (checked at most
+        every MODEL_RELOAD_CHECK_SECONDS); returns whether a new model was loaded
+        """
+        now = time.monotonic()
+        if now - self._artifact_checked_at < Config.MODEL_RELOAD_CHECK_SECONDS:
+            return False
+        self._artifact_checked_at = now
+        try:
+            mtime = os.stat(_artifact_path(self.location)).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        return mtime != self._artifact_mtime and self.load_model()
+    
+    def model_size_bytes(self):
+        """Serialized size of the fitted estimator"""
+        return len(pickle.dumps(self.model, protocol=pickle.HIGHEST_PROTOCOL))
+    
+    def predict_24h_forecast(self, current_data, weather_data, historical_data=None, future_weather=None):
+        """
+        Generate 24-hour forecast
+        future_weather maps weather variables to 24 hourly forecast values (NaN where
+        unknown, e.g. DataProcessor.get_future_weather); without it the current
+        weather is assumed for every hour
+        """
+        self.ensure_trained()
+        
+        started = time.perf_counter()
         forecasts = []
         
-        for hour in range(1, 25):  # Next 24 hours
-            # Prepare features for this hour
-            future_time = datetime.now() + timedelta(hours=hour)
-            
-            # Modify features based on time
-            modified_current = current_data.copy()
-            modified_weather = weather_data.copy()
-            
-            # Add time-based variations
-            if hour <= 12:  # Morning pollution increase
-                modified_current['pm25'] = current_data.get('pm25', 50) * (1 + 0.1 * hour/12)
-                modified_current['pm10'] = current_data.get('pm10', 80) * (1 + 0.1 * hour/12)
-            
-            features_df = self.prepare_features(modified_current, modified_weather)
-            features_df['hour_of_day'] = future_time.hour
-            features_df['day_of_week'] = future_time.weekday()
+        with tracing.span('forecast.predict_24h', {'backend': self.backend}):
+            # Local time, like the stored hours the model trained on and the future weather
+            now = local_now()
+            future_times = [now + timedelta(hours=hour) for hour in range(1, 25)]  # Next 24 hours
             
-            # Scale features
-            features_scaled = self.scaler.transform(features_df[self.feature_names])
-            
-            # Predict
-            predicted_pm25 = self.model.predict(features_scaled)[0]
-            
-            # Generate other pollutant predictions (simplified)
-            predicted_pm10 = predicted_pm25 * 1.8 + np.random.normal(0, 5)
-            predicted_no2 = max(10, 35 + np.random.normal(0, 8))
-            predicted_o3 = max(20, 85 + np.random.normal(0, 12))
+            # The hours do not depend on each other's predictions: fill one
+            # feature row per hour and score them in a single batch
+            with tracing.span('forecast.prepare_features', {'hours': 24}):
+                features = np.empty((24, len(self.feature_names)))
+                for hour, future_time in enumerate(future_times, start=1):
+                    # Modify features based on time
+                    modified_current = current_data.copy()
+                    
+                    # Add time-based variations
+                    if hour <= 12:  # Morning pollution increase
+                        modified_current['pm25'] = current_data.get('pm25', 50) * (1 + 0.1 * hour/12)
+                        modified_current['pm10'] = current_data.get('pm10', 80) * (1 + 0.1 * hour/12)
+                    
+                    self.prepare_features(modified_current, weather_data, historical_data,
+                                          when=future_time, out=features[hour - 1])
+                
+                if future_weather:
+                    for name in WEATHER_FEATURES:
+                        values = future_weather.get(name)
+                        if values is not None:
+                            column = features[:, BASE_FEATURES.index(name)]
+                            np.copyto(column, values, where=np.isfinite(values))
             
-            forecast = {
-                'hour': hour,
-                'datetime': future_time.isoformat(),
-                'pm25': max(5, round(predicted_pm25, 1)),
-                'pm10': max(10, round(predicted_pm10, 1)),
-                'no2': round(predicted_no2, 1),
-                'o3': round(predicted_o3, 1),
-                'confidence': 0.85 - (hour * 0.02)  # Confidence decreases with time
-            }
+            with tracing.span('forecast.model_predict', {'hours': 24}):
+                predicted = self.pipeline.predict(features)
             
-            forecasts.append(forecast)
+            for hour, (future_time, predicted_pm25) in enumerate(zip(future_times, predicted), start=1):
+                # Generate other pollutant predictions (simplified)
+                predicted_pm10 = predicted_pm25 * 1.8 + np.random.normal(0, 5)
+                predicted_no2 = max(10, 35 + np.random.normal(0, 8))
+                predicted_o3 = max(20, 85 + np.random.normal(0, 12))
+                
+                forecast = {
+                    'hour': hour,
+                    'datetime': future_time.isoformat(),
+                    'pm25': max(5, round(predicted_pm25, 1)),
+                    'pm10': max(10, round(predicted_pm10, 1)),
+                    'no2': round(predicted_no2, 1),
+                    'o3': round(predicted_o3, 1),
+                    'confidence': 0.85 - (hour * 0.02)  # Confidence decreases with time
+                }
+                if future_weather:
+                    forecast['weather'] = {
+                        name: round(float(values[hour - 1]), 1)
+                        for name, values in future_weather.items() if np.isfinite(values[hour - 1])
+                    }
+                
+                forecasts.append(forecast)
         
+        metrics.FORECAST_INFERENCE.observe(time.perf_counter() - started)
         return forecasts
     
+    def _incremental_state(self):
+        """Incremental update state saved with the artifact, so a reload can keep updating"""
+        return {
+            'baseline_mae': self.baseline_mae,
+            'trained_until': self.trained_until,
+            'batches_since_full_train': self.batches_since_full_train,
+            'drift': self.drift,
+            'normal_equations': self._normal_equations
+        }
+    
+    def _restore_incremental_state(self, state):
+        """Restore _incremental_state(); artifacts saved without it start a new cycle"""
+        state = state or {}
+        self.baseline_mae = state.get('baseline_mae')
+        self.trained_until = state.get('trained_until')
+        self.batches_since_full_train = state.get('batches_since_full_train', 0)
+        self.drift = state.get('drift', {})
+        self._normal_equations = state.get('normal_equations')
+    
     def save_model(self):
-        """Save trained model and scaler"""
+        """Save the trained scaler and model as one versioned inference artifact"""
         try:
             os.makedirs('models/saved', exist_ok=True)
-            joblib.dump(self.model, 'models/saved/aqi_model.pkl')
-            joblib.dump(self.scaler, 'models/saved/scaler.pkl')
+            self.pipeline.incremental_state = self._incremental_state()
+            path = _artifact_path(self.location)
+            joblib.dump(self.pipeline, path)
+            self._artifact_mtime = os.stat(path).st_mtime_ns
             print("Model saved successfully")
         except Exception as e:
             print(f"Error saving model: {e}")
@@ -198,11 +497,215 @@ class AirQualityForecaster:
     def load_model(self):
         """Load pre-trained model"""
         try:
-            self.model = joblib.load('models/saved/aqi_model.pkl')
-            self.scaler = joblib.load('models/saved/scaler.pkl')
+            started = time.perf_counter()
+            mtime = None
+            path = _artifact_path(self.location)
+            if os.path.exists(path):
+                mtime = os.stat(path).st_mtime_ns
+                pipeline = joblib.load(path)
+            else:
+                pipeline = self._load_legacy_model(self.location)
+            # A model saved by another backend, artifact version or feature set cannot serve
+            if pipeline is None or not pipeline.matches(self.feature_names, self.backend):
+                print(f"Saved model does not match the {self.backend} backend with "
+                      f"{len(self.feature_names)} features; not loading it")
+                return False
+            self.pipeline, self.model, self.scaler = pipeline, pipeline.model, pipeline.scaler
+            self._restore_incremental_state(getattr(pipeline, 'incremental_state', None))
+            self._artifact_mtime = mtime
+            metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - started)
             self.is_trained = True
             print("Model loaded successfully")
             return True
         except Exception as e:
             print(f"Error loading model: {e}")
             return False
+    
+    def _load_legacy_model(self, location=None):
+        """
+        Pipeline from the separate model and scaler pickles written by older
+        versions, or None if they do not fit this forecaster
+        """
+        suffix = _location_suffix(location)
+        model = joblib.load(f'models/saved/aqi_model{suffix}.pkl')
+        scaler = joblib.load(f'models/saved/scaler{suffix}.pkl')
+        if type(model) is not type(self.model) or \
+                getattr(scaler, 'n_features_in_', None) != len(self.feature_names):
+            return None
+        # Scalers fitted on DataFrames check column names on every call; serving
+        # passes arrays in feature_names order instead
+        if hasattr(scaler, 'feature_names_in_'):
+            if list(scaler.feature_names_in_) != self.feature_names:
+                return None
+            del scaler.feature_names_in_
+        return InferencePipeline(scaler, model, self.feature_names, self.backend)
+
+
+def _add_lag_features(df):
+    """
+    Offline (pandas) version of the FeatureStore lag/rolling features, plus
+    the next-hour PM2.5 target. Rows must be consecutive hours.
+    """
+    for pollutant in LAGGED_POLLUTANTS:
+        series = df[f'{pollutant}_current']
+        for lag in LAG_HOURS:
+            df[f'{pollutant}_lag{lag}'] = series.shift(lag)
+        for window in ROLLING_WINDOWS:
+            df[f'{pollutant}_roll{window}'] = series.rolling(window).mean()
+    
+    df['pm25_next'] = df['pm25_current'].shift(-1)
+    return df
+
+
+def build_training_frame(observations):
+    """
+    Turn stored hourly observations into supervised rows: features at hour t
+    (with lags and rolling means) and the PM2.5 observed at hour t+1 as the target
+    """
+    import pandas as pd
+    
+    columns = BASE_FEATURES + lag_feature_names() + ['pm25_next', 'observed_at']
+    if not observations:
+        return pd.DataFrame(columns=columns)
+    
+    frames = []
+    df = pd.DataFrame(observations)
+    df['observed_at'] = pd.to_datetime(df['observed_at'])
+    
+    for _, group in df.groupby('location'):
+        # Reindex onto a complete hourly axis so shifts only pair adjacent hours
+        group = group.set_index('observed_at').sort_index()
+        group = group.reindex(pd.date_range(group.index.min(), group.index.max(), freq='h'))
+        
+        frame = pd.DataFrame({
+            'pm25_current': group['pm25'],
+            'pm10_current': group['pm10'],
+            'no2_current': group['no2'],
+            'o3_current': group['o3'],
+            'temperature': group['temperature'],
+            'humidity': group['humidity'],
+            'wind_speed': group['wind_speed'],
+            'hour_of_day': group.index.hour,
+            'day_of_week': group.index.dayofweek,
+            'month': group.index.month,
+            'observed_at': group.index.strftime('%Y-%m-%dT%H:%M:%S')
+        }, index=group.index)
+        frames.append(_add_lag_features(frame).dropna())
+    
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def _location_suffix(location):
+    """File-name suffix for per-location model artifacts"""
+    if not location:
+        return ''
+    return '_' + location.lower().replace(' ', '_')
+
+
+def _artifact_path(location=None):
+    """Saved inference pipeline (scaler + model) for a location, or the default one"""
+    return f'models/saved/forecast_pipeline{_location_suffix(location)}.joblib'
+
+
+def has_location_model(location):
+    """Whether a model was trained for this location (see train_location_models)"""
+    return os.path.exists(_artifact_path(location))
+
+
+def _train_location_model(location, backend, db_path):
+    """Process-pool worker: train and save the model for one location from its stored history"""
+    from threadpoolctl import threadpool_limits
+    from models.observation_store import ObservationStore
+    
+    df = build_training_frame(ObservationStore(db_path).fetch(location=location))
+    if len(df) < Config.MIN_STORE_TRAINING_ROWS:
+        return {
+            'location': location,
+            'status': 'skipped',
+            'reason': f'{len(df)} training rows stored, {Config.MIN_STORE_TRAINING_ROWS} needed'
+        }
+    
+    # Parallelism comes from the process pool, so keep each worker single-threaded
+    with threadpool_limits(limits=1):
+        forecaster = AirQualityForecaster(backend=backend, n_jobs=1, location=location)
+        metrics = forecaster.train_model(df=df)
+    
+    metrics['location'] = location
+    return metrics
+
+
+def train_location_models(locations=None, backend=None, max_workers=None, db_path=None):
+    """
+    Train one model per location on its stored (real) observations, in parallel
+    across a process pool; locations without enough history keep the shared model
+    """
+    locations = locations or [loc['name'] for loc in Config.GOA_LOCATIONS]
+    max_workers = max_workers or Config.TRAINING_WORKERS or os.cpu_count()
+    backend = backend or Config.FORECAST_BACKEND
+    db_path = db_path or Config.OBSERVATION_DB_PATH
+    
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            _train_location_model,
+            locations,
+            [backend] * len(locations),
+            [db_path] * len(locations)
+        ))
+    
+    return {
+        'status': 'trained',
+        'backend': backend,
+        'locations': results,
+        'total_time_s': time.perf_counter() - start
+    }
+
+
+def benchmark_backends(backends=None, latency_samples=500):
+    """
+    Train every estimator backend on the same data and report training time,
+    single-row inference latency (p50/p99), serialized model size and MAE
+    """
+    results = []
+    
+    for backend in backends or ESTIMATOR_BACKENDS:
+        forecaster = AirQualityForecaster(backend=backend)
+        metrics = forecaster.train_model(save=False)
+        
+        # Time single-row predictions: per-call overhead dominates the forecast endpoint's 24-row batches
+        df = forecaster.generate_training_data(days=60)
+        _, X_test, _, _ = forecaster._split_training_data(df)
+        
+        timings = []
+        for i in range(latency_samples):
+            row = X_test[i % len(X_test):i % len(X_test) + 1]
+            start = time.perf_counter()
+            forecaster.pipeline.predict(row)
+            timings.append(time.perf_counter() - start)
+        
+        timings_ms = np.array(timings) * 1000
+        results.append({
+            'backend': backend,
+            'training_time_s': round(metrics['training_time_s'], 4),
+            'latency_p50_ms': round(float(np.percentile(timings_ms, 50)), 4),
+            'latency_p99_ms': round(float(np.percentile(timings_ms, 99)), 4),
+            'model_size_bytes': forecaster.model_size_bytes(),
+            'mae': round(metrics['mae'], 3)
+        })
+    
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='AirAlert forecasting model tools')
+    parser.add_argument('command', nargs='?', default='benchmark', choices=['benchmark', 'train-locations'])
+    parser.add_argument('--workers', type=int, default=None, help='Training processes (default: all cores)')
+    args = parser.parse_args()
+    
+    if args.command == 'train-locations':
+        print(train_location_models(max_workers=args.workers))
+    else:
+        for result in benchmark_backends():
+            print(result)
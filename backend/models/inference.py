@@ -0,0 +1,109 @@
+import threading
+import time
+
+import numpy as np
+import sklearn
+
+# Bump when the saved layout of InferencePipeline changes; older artifacts are retrained
+ARTIFACT_VERSION = 1
+
+
+class InferencePipeline:
+    """
+    Scaler and estimator fused into one serving object, saved as one artifact
+
+    Standardisation is applied in place into per-thread buffers sized for the
+    largest batch seen so far, in the dtype the estimator consumes (float32 for
+    forests, which would otherwise copy), so the input is never copied per
+    call. Forests are summed tree by tree into the output array, in the same
+    order as RandomForestRegressor.predict but without its per-call joblib
+    dispatch; each tree still returns a small (n, 1) array of its own. The linear backend folds the scaling into its
+    coefficients and is a single dot product. The fitted scaler and estimator
+    are kept for incremental updates.
+    """
+
+    def __init__(self, scaler, model, feature_names, backend):
+        self.scaler = scaler
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.backend = backend
+        self.version = ARTIFACT_VERSION
+        self.sklearn_version = sklearn.__version__
+        self.created_at = time.time()
+        # Forecaster incremental-update state (baseline MAE, normal equations, ...), set on save
+        self.incremental_state = None
+        self._fold()
+
+    def _fold(self):
+        """Precompute the hot-path parameters from the fitted scaler and estimator"""
+        self.mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+        self.scale = np.asarray(self.scaler.scale_, dtype=np.float64)
+        # Forests cast inputs to float32; boosting and linear models use float64
+        self.input_dtype = np.float32 if self.backend == 'random_forest' else np.float64
+        if self.backend == 'linear':
+            # w . (x - mean) / scale + b == (w / scale) . x + (b - w . mean / scale)
+            self.coef = self.model.coef_ / self.scale
+            self.intercept = float(self.model.intercept_ - self.coef @ self.mean)
+        self._buffers = threading.local()
+
+    def _scaled(self, features):
+        """Standardised copy of ``features`` in this thread's reusable buffer"""
+        n = len(features)
+        scratch = getattr(self._buffers, 'scratch', None)
+        if scratch is None or len(scratch) < n:
+            scratch = self._buffers.scratch = np.empty((n, len(self.mean)))
+            self._buffers.cast = (
+                None if self.input_dtype == np.float64 else np.empty((n, len(self.mean)), self.input_dtype)
+            )
+        rows = scratch[:n]
+        np.subtract(features, self.mean, out=rows)
+        np.divide(rows, self.scale, out=rows)
+        if self._buffers.cast is None:
+            return rows
+        cast = self._buffers.cast[:n]
+        np.copyto(cast, rows, casting='same_kind')
+        return cast
+
+    def predict(self, features):
+        """PM2.5 for each row of ``features`` (n x len(feature_names), feature_names order)"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features[None, :]
+        # Tree.predict indexes columns without checking the width
+        if features.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got {features.shape[1]}")
+        if self.backend == 'linear':
+            out = np.empty(len(features))
+            np.dot(features, self.coef, out=out)
+            out += self.intercept
+            return out
+        if self.backend == 'random_forest':
+            scaled = self._scaled(features)
+            out = np.zeros(len(features))
+            for tree in self.model.estimators_:
+                out += tree.tree_.predict(scaled)[:, 0]
+            out /= len(self.model.estimators_)
+            return out
+        return self.model.predict(self._scaled(features))
+
+    def matches(self, feature_names, backend):
+        """
+        Whether this artifact can serve a forecaster with these features and backend
+        (pickled estimators are only reliable under the scikit-learn version that saved them)
+        """
+        return (
+            getattr(self, 'version', None) == ARTIFACT_VERSION and
+            self.sklearn_version == sklearn.__version__ and
+            self.backend == backend and
+            self.feature_names == list(feature_names)
+        )
+
+    def __getstate__(self):
+        # Per-thread buffers are scratch space, rebuilt on load
+        state = self.__dict__.copy()
+        state.pop('_buffers', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buffers = threading.local()
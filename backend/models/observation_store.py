@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from config import Config
+from utils.clock import to_local
+
+class ObservationStore:
+    """
+    Local SQLite store of hourly observations per location
+    """
+
+    # Measurement columns kept for every (location, hour); tempo_* are TEMPO columns
+    # (molecules/cm^2) sampled at the location
+    VALUE_COLUMNS = [
+        'pm25', 'pm10', 'no2', 'o3', 'so2', 'co',
+        'temperature', 'humidity', 'wind_speed',
+        'tempo_no2', 'tempo_o3'
+    ]
+
+    # Ground readings: the columns is_mock describes
+    GROUND_COLUMNS = ['pm25', 'pm10', 'no2', 'o3', 'so2', 'co']
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or Config.OBSERVATION_DB_PATH
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Create the observations table and add any newer columns"""
+        with self._lock, self._conn:
+            if self.db_path != ':memory:':
+                # WAL lets several gunicorn workers read while one writes
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS observations ('
+                'location TEXT NOT NULL, '
+                'observed_at TEXT NOT NULL, '
+                'is_mock INTEGER NOT NULL DEFAULT 0, '
+                'ingested_at TEXT NOT NULL, '
+                'PRIMARY KEY (location, observed_at))'
+            )
+            existing = {row['name'] for row in self._conn.execute('PRAGMA table_info(observations)')}
+            for column in self.VALUE_COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f'ALTER TABLE observations ADD COLUMN {column} REAL')
+            if 'quality_flags' not in existing:
+                # Packed models.data_quality check bits, computed once at ingest
+                self._conn.execute('ALTER TABLE observations ADD COLUMN quality_flags INTEGER')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_observations_ingested ON observations (ingested_at)'
+            )
+
+    @staticmethod
+    def _hour_bucket(timestamp):
+        """Truncate a datetime or ISO string to the hour in Config.LOCAL_TIMEZONE"""
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        return to_local(timestamp).replace(minute=0, second=0, microsecond=0).isoformat()
+
+    def record(self, location, timestamp, air_quality, weather=None, is_mock=False, quality_flags=None,
+               satellite=None):
+        """
+        Store one integrated reading in its hourly bucket (latest reading wins)
+        satellite holds co-located TEMPO columns, e.g. {'tempo_no2': 2.1e15}
+        """
+        values = dict(air_quality or {})
+        values.update(weather or {})
+        values.update(satellite or {})
+        self.insert_many([{
+            'location': location,
+            'observed_at': timestamp,
+            'is_mock': is_mock,
+            'quality_flags': quality_flags,
+            **{column: values.get(column) for column in self.VALUE_COLUMNS}
+        }])
+
+    def insert_many(self, rows):
+        """
+        Bulk upsert observation rows in a single transaction
+        Rows may carry 'quality_flags' (see models.data_quality.flag_observations)
+
+        is_mock only describes ground readings: a row without any only fills in
+        weather or satellite columns and leaves the stored label alone, real
+        ground readings replace every mock one of the hour instead of merging with
+        it, and mock ground readings never touch an hour with real ones
+        """
+        ingested_at = datetime.now().isoformat()
+        columns = ['location', 'observed_at', 'is_mock', 'ingested_at', 'quality_flags'] + self.VALUE_COLUMNS
+        placeholders = ', '.join('?' for _ in columns)
+        # SET expressions all see the stored (pre-update) values
+        has_ground = '(' + ' OR '.join(f'excluded.{c} IS NOT NULL' for c in self.GROUND_COLUMNS) + ')'
+        stored_ground = '(' + ' OR '.join(f'{c} IS NOT NULL' for c in self.GROUND_COLUMNS) + ')'
+        replaces_mock = f'({has_ground} AND is_mock = 1 AND excluded.is_mock = 0)'
+        keeps_real = f'({stored_ground} AND is_mock = 0 AND excluded.is_mock = 1)'
+        updates = ', '.join(
+            f'{c} = CASE WHEN {replaces_mock} THEN excluded.{c} WHEN {keeps_real} THEN {c} '
+            f'ELSE COALESCE(excluded.{c}, {c}) END'
+            if c in self.GROUND_COLUMNS else f'{c} = COALESCE(excluded.{c}, {c})'
+            for c in self.VALUE_COLUMNS
+        )
+
+        params = [
+            (
+                row['location'],
+                self._hour_bucket(row['observed_at']),
+                int(bool(row.get('is_mock', False))),
+                ingested_at,
+                row.get('quality_flags'),
+                *[row.get(column) for column in self.VALUE_COLUMNS]
+            )
+            for row in rows
+        ]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'INSERT INTO observations ({", ".join(columns)}) VALUES ({placeholders}) '
+                f'ON CONFLICT (location, observed_at) DO UPDATE SET '
+                f'is_mock = CASE WHEN {keeps_real} THEN is_mock WHEN {has_ground} THEN excluded.is_mock '
+                f'ELSE is_mock END, '
+                f'ingested_at = excluded.ingested_at, '
+                f'quality_flags = CASE WHEN {keeps_real} THEN quality_flags '
+                f'ELSE COALESCE(excluded.quality_flags, quality_flags) END, {updates}',
+                params
+            )
+
+        return len(params)
+
+    def fetch(self, location=None, start=None, end=None, ingested_after=None, include_mock=False):
+        """
+        Fetch observations in chronological order as a list of dicts
+        """
+        clauses = []
+        params = []
+
+        if location is not None:
+            clauses.append('location = ?')
+            params.append(location)
+        if start is not None:
+            clauses.append('observed_at >= ?')
+            params.append(self._hour_bucket(start))
+        if end is not None:
+            clauses.append('observed_at <= ?')
+            params.append(self._hour_bucket(end))
+        if ingested_after is not None:
+            clauses.append('ingested_at > ?')
+            params.append(ingested_after)
+        if not include_mock:
+            clauses.append('is_mock = 0')
+
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT * FROM observations {where} ORDER BY location, observed_at', params
+            ).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def satellite_pairs(self, pollutant, start=None, end=None):
+        """
+        (location, hour, TEMPO column, ground value) for every stored hour with both,
+        real data only, oldest first; optionally only hours in [start, end)
+        """
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('AND observed_at >= ? ')
+            params.append(self._hour_bucket(start))
+        if end is not None:
+            clauses.append('AND observed_at < ? ')
+            params.append(self._hour_bucket(end))
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute(
+                f'SELECT location, observed_at, tempo_{pollutant}, {pollutant} FROM observations '
+                f'WHERE tempo_{pollutant} IS NOT NULL AND {pollutant} IS NOT NULL AND is_mock = 0 '
+                f'{"".join(clauses)}ORDER BY observed_at',
+                params
+            )]
+
+    def count(self):
+        """Total number of stored observation rows"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM observations').fetchone()[0]
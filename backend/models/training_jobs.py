@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import Config
+
+class TrainingJobManager:
+    """
+    Run model training off the request thread and track job status
+
+    Jobs run one at a time on a background executor. Each job builds a
+    complete replacement model and hands it to ``on_complete``, so the model
+    serving requests is swapped in one step and never seen half-trained.
+    Every status change is also written to a JSON file per job in a shared
+    directory, so any worker process can report a job another one runs.
+    """
+
+    def __init__(self, max_workers=1, max_jobs=100, directory=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='training')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+        self.directory = directory or Config.TRAINING_JOB_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def _save(self, job):
+        """Publish a job record atomically (caller holds the lock)"""
+        tmp_path = f'{self._path(job["job_id"])}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(job['job_id']))
+
+    def _prune(self):
+        """Remove the oldest finished job files beyond max_jobs (caller holds the lock)"""
+        paths = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.json')),
+            key=lambda path: os.stat(path).st_mtime
+        )
+        for path in paths[:max(0, len(paths) - self.max_jobs)]:
+            try:
+                with open(path) as f:
+                    if json.load(f)['status'] in ('queued', 'running'):
+                        continue
+                os.remove(path)
+            except (OSError, ValueError, KeyError):
+                continue
+
+    def submit(self, kind, train_fn, on_complete):
+        """
+        Queue ``train_fn() -> (model, metrics)``; ``on_complete(model)`` installs the result
+        """
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'kind': kind,
+            'status': 'queued',
+            'submitted_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'duration_s': None,
+            'metrics': None,
+            'error': None
+        }
+
+        with self._lock:
+            self._jobs[job['job_id']] = job
+            # Forget the oldest finished jobs once the history is full
+            while len(self._jobs) > self.max_jobs:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest['status'] in ('queued', 'running'):
+                    break
+                del self._jobs[oldest_id]
+            self._save(job)
+            self._prune()
+
+        self._executor.submit(self._run, job['job_id'], train_fn, on_complete)
+        return dict(job)
+
+    def _run(self, job_id, train_fn, on_complete):
+        """Executor body: run the job and record its outcome"""
+        self._update(job_id, status='running', started_at=datetime.now().isoformat())
+        start = time.perf_counter()
+
+        try:
+            model, metrics = train_fn()
+            on_complete(model)
+            outcome = {'status': 'done', 'metrics': metrics}
+        except Exception as e:
+            print(f"Error in training job {job_id}: {e}")
+            outcome = {'status': 'failed', 'error': str(e)}
+
+        # One update, so a finished job is never seen without its timing
+        self._update(
+            job_id,
+            finished_at=datetime.now().isoformat(),
+            duration_s=round(time.perf_counter() - start, 3),
+            **outcome
+        )
+
+    def _update(self, job_id, **fields):
+        """Update a job record under the lock"""
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+                self._save(self._jobs[job_id])
+
+    def get(self, job_id):
+        """
+        Snapshot of a job's status, or None if unknown; jobs submitted to other
+        worker processes are read from their published record
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        # Job ids are hex uuids; anything else cannot name a job file
+        if not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
@@ -0,0 +1,27 @@
+"""
+Unit tests for the backend
+
+Run from backend/ after installing the test tools:
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+
+On-disk state goes to a temporary directory; no test touches the network.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STATE_DIR = tempfile.mkdtemp(prefix='airalert-tests-')
+
+# Before anything imports config: keep test state out of backend/data
+os.environ.setdefault('OBSERVATION_DB_PATH', os.path.join(_STATE_DIR, 'observations.db'))
+os.environ.setdefault('UPSTREAM_SHARE_DIR', os.path.join(_STATE_DIR, 'upstream'))
+os.environ.setdefault('TEMPO_GRANULE_DIR', os.path.join(_STATE_DIR, 'tempo', 'granules'))
+os.environ.setdefault('TEMPO_CACHE_DIR', os.path.join(_STATE_DIR, 'tempo', 'cache'))
+os.environ.setdefault('TEMPO_GRID_DIR', os.path.join(_STATE_DIR, 'tempo', 'grid'))
+os.environ.setdefault('TRAINING_JOB_DIR', os.path.join(_STATE_DIR, 'training_jobs'))
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,22 @@
+"""Importing the app keeps the heavy dependencies off the import path"""
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use (or by app.warm_up), never by importing the app
+DEFERRED_MODULES = ('pandas', 'sklearn', 'joblib', 'requests', 'models.data_processor', 'models.forecast')
+
+
+def test_import_app_defers_heavy_modules():
+    result = subprocess.run(
+        [sys.executable, '-c', 'import sys, app; print(",".join(sys.modules))'],
+        cwd=BACKEND_DIR, env=dict(os.environ, PRELOAD_COMPONENTS='false'),
+        capture_output=True, text=True, check=True
+    )
+    modules = set(result.stdout.strip().splitlines()[-1].split(','))
+
+    assert 'app' in modules
+    loaded = sorted(name for name in DEFERRED_MODULES if name in modules)
+    assert not loaded, f'importing the app loaded {loaded}'
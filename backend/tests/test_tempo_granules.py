@@ -0,0 +1,84 @@
+"""Offline TEMPO ingestion from fixture granules"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from api import tempo_granules
+from api.tempo_granules import TempoGranuleReader, TempoIngestor, write_fixture_granule
+
+BBOX = {'min_lat': 14.85, 'max_lat': 15.85, 'min_lon': 73.65, 'max_lon': 74.35}
+OBSERVED = datetime(2025, 1, 1, 6)
+
+
+@pytest.fixture
+def ingestor(tmp_path):
+    return TempoIngestor(
+        granule_dir=str(tmp_path / 'granules'), cache_dir=str(tmp_path / 'cache'), bbox=BBOX, mirror_url=''
+    )
+
+
+def _refuse_reads(monkeypatch):
+    """Fail the test if a granule is opened from here on"""
+    def refuse(path):
+        raise AssertionError(f'granule re-read: {path}')
+    monkeypatch.setattr(tempo_granules, 'TempoGranuleReader', refuse)
+
+
+def _inside(latitude, longitude):
+    return (
+        (latitude >= BBOX['min_lat']) & (latitude <= BBOX['max_lat']) &
+        (longitude >= BBOX['min_lon']) & (longitude <= BBOX['max_lon'])
+    )
+
+
+def test_l3_subset_covers_bbox(ingestor):
+    write_fixture_granule(ingestor.granule_dir, 'NO2', 'L3', OBSERVED)
+    subset = ingestor.ingest(ingestor.list_granules('NO2')[0])
+
+    assert subset['pollutant'] == 'no2' and subset['level'] == 'L3'
+    assert subset['values'].shape == (len(subset['latitude']), len(subset['longitude']))
+    assert subset['latitude'].min() >= BBOX['min_lat'] and subset['latitude'].max() <= BBOX['max_lat']
+    assert subset['longitude'].min() >= BBOX['min_lon'] and subset['longitude'].max() <= BBOX['max_lon']
+    # The fixture's fill values and flagged pixels are masked, everything else is a column
+    values = subset['values']
+    assert np.isnan(values).any()
+    assert np.nanmin(values) > 1e15
+
+
+def test_l2_subset_keeps_every_pixel_in_bbox(ingestor):
+    path = write_fixture_granule(ingestor.granule_dir, 'NO2', 'L2', OBSERVED)
+    with TempoGranuleReader(path) as reader:
+        full = reader.subset('NO2', {'min_lat': -90, 'max_lat': 90, 'min_lon': -180, 'max_lon': 180})
+    subset = ingestor.ingest(ingestor.list_granules('NO2')[0])
+
+    assert subset['latitude'].shape == subset['longitude'].shape == subset['values'].shape
+    assert _inside(subset['latitude'], subset['longitude']).sum() == \
+        _inside(full['latitude'], full['longitude']).sum()
+    assert subset['values'].size < full['values'].size
+
+
+def test_cached_subset_is_served_without_reading_the_granule(ingestor, monkeypatch):
+    write_fixture_granule(ingestor.granule_dir, 'O3TOT', 'L3', OBSERVED)
+    granule = ingestor.list_granules('O3TOT')[0]
+    first = ingestor.ingest(granule)
+    assert ingestor.ingest(granule) is first
+
+    _refuse_reads(monkeypatch)
+    fresh = TempoIngestor(granule_dir=ingestor.granule_dir, cache_dir=ingestor.cache_dir, bbox=BBOX, mirror_url='')
+    cached = fresh.ingest(granule)
+
+    np.testing.assert_array_equal(cached['values'], first['values'])
+    np.testing.assert_array_equal(cached['latitude'], first['latitude'])
+
+
+@pytest.mark.parametrize('level', ['L2', 'L3'])
+def test_granule_outside_bbox_is_cached_as_uncovered(ingestor, level, monkeypatch):
+    write_fixture_granule(ingestor.granule_dir, 'NO2', level, OBSERVED, bounds=(30.0, 32.0, 80.0, 82.0))
+    granule = ingestor.list_granules('NO2')[0]
+    assert ingestor.ingest(granule) is None
+
+    _refuse_reads(monkeypatch)
+    assert ingestor.ingest(granule) is None
+    fresh = TempoIngestor(granule_dir=ingestor.granule_dir, cache_dir=ingestor.cache_dir, bbox=BBOX, mirror_url='')
+    assert fresh.ingest(granule) is None
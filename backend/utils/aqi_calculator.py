@@ -1,5 +1,5 @@
-import pandas as pd
 import numpy as np
+from utils import tracing
 
 class AQICalculator:
     """
@@ -58,6 +58,16 @@ class AQICalculator:
         ]
     }
     
+    # Main health effects of each pollutant
+    HEALTH_IMPACTS = {
+        'pm25': 'Respiratory and cardiovascular effects',
+        'pm10': 'Respiratory irritation, reduced lung function',
+        'no2': 'Respiratory inflammation, reduced immunity',
+        'o3': 'Respiratory irritation, chest pain',
+        'so2': 'Respiratory problems, eye irritation',
+        'co': 'Reduced oxygen delivery, heart problems'
+    }
+    
     @staticmethod
     def calculate_individual_aqi(concentration, pollutant):
         """Calculate AQI for individual pollutant"""
@@ -92,6 +102,41 @@ class AQICalculator:
         # Composite AQI is the maximum of all individual AQIs
         return max(aqi_values)
     
+    @staticmethod
+    def calculate_individual_aqi_batch(concentrations, pollutant):
+        """
+        calculate_individual_aqi over an array of concentrations (same results,
+        including 500 for values outside every breakpoint range); NaN where the
+        pollutant is unknown
+        """
+        concentrations = np.asarray(concentrations, dtype=float)
+        breakpoints = AQICalculator.AQI_BREAKPOINTS.get(pollutant.lower())
+        if breakpoints is None:
+            return np.full(concentrations.shape, np.nan)
+    
+        bp_low, bp_high, aqi_low, aqi_high = np.array(breakpoints, dtype=float).T
+        # First matching range wins, as in the scalar loop
+        in_range = (concentrations[..., None] >= bp_low) & (concentrations[..., None] <= bp_high)
+        row = in_range.argmax(axis=-1)
+        aqi = np.round((aqi_high[row] - aqi_low[row]) / (bp_high[row] - bp_low[row]) *
+                       (concentrations - bp_low[row]) + aqi_low[row])
+        return np.where(in_range.any(axis=-1), aqi, 500.0)
+    
+    @staticmethod
+    def calculate_composite_aqi_batch(pollutant_arrays):
+        """
+        calculate_composite_aqi for many readings at once
+        pollutant_arrays maps pollutant -> equal-length array (NaN or negative = missing);
+        returns a float array, NaN where no pollutant was usable
+        """
+        composite = None
+        for pollutant, concentrations in pollutant_arrays.items():
+            concentrations = np.asarray(concentrations, dtype=float)
+            aqi = AQICalculator.calculate_individual_aqi_batch(concentrations, pollutant)
+            aqi[~(concentrations >= 0)] = np.nan
+            composite = aqi if composite is None else np.fmax(composite, aqi)
+        return composite
+    
     @staticmethod
     def get_aqi_category(aqi_value):
         """Get AQI category and health implications"""
@@ -123,6 +168,39 @@ class AQICalculator:
             'color': '#7e0023'
         }
     
+    @staticmethod
+    @tracing.traced('aqi.pollutant_breakdown')
+    def pollutant_breakdown(air_quality):
+        """
+        Sub-index, category and health impact per pollutant plus the dominant pollutant,
+        in one pass over the readings
+        """
+        breakdown = {}
+        dominant = None
+        for pollutant, value in air_quality.items():
+            if value is None:
+                continue
+            individual_aqi = AQICalculator.calculate_individual_aqi(value, pollutant)
+            aqi_info = AQICalculator.get_aqi_category(individual_aqi)
+            breakdown[pollutant] = {
+                'value': value,
+                'unit': 'µg/m³',
+                'aqi': individual_aqi,
+                'category': aqi_info.get('category') if aqi_info else 'Unknown',
+                'health_impact': AQICalculator.HEALTH_IMPACTS.get(pollutant, 'Health impact data unavailable')
+            }
+            if individual_aqi is not None and (dominant is None or individual_aqi > breakdown[dominant]['aqi']):
+                dominant = pollutant
+        
+        max_aqi = breakdown[dominant]['aqi'] if dominant else None
+        for entry in breakdown.values():
+            entry['is_primary_concern'] = bool(entry['aqi']) and entry['aqi'] == max_aqi
+        
+        return {
+            'pollutant_breakdown': breakdown,
+            'dominant_pollutant': dominant
+        }
+    
     @staticmethod
     def _get_color(category):
         """Get color code for AQI category"""
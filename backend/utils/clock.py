@@ -0,0 +1,19 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from config import Config
+
+# Stored observation hours, feature windows and forecast hours all use this zone,
+# whatever the server's own clock is set to
+LOCAL_ZONE = ZoneInfo(Config.LOCAL_TIMEZONE)
+
+
+def local_now():
+    """Current time in Config.LOCAL_TIMEZONE as a naive datetime"""
+    return datetime.now(LOCAL_ZONE).replace(tzinfo=None)
+
+
+def to_local(timestamp):
+    """Naive Config.LOCAL_TIMEZONE time for an aware datetime; naive ones are taken as local already"""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(LOCAL_ZONE).replace(tzinfo=None)
@@ -0,0 +1,62 @@
+import copy
+import importlib.util
+import threading
+import time
+
+
+def require_modules(*names):
+    """
+    Raise ImportError if any of the named top-level packages is not installed,
+    without importing it (so the check costs a path lookup, not the import)
+    """
+    for name in names:
+        if importlib.util.find_spec(name) is None:
+            raise ImportError(f"No module named '{name}'")
+
+
+class LazyComponent:
+    """
+    Stand-in for a component that is expensive to import or build
+
+    The factory runs once, on the first attribute access (or ``get()``), and
+    every later access is forwarded to the object it returned. Importing the
+    app therefore stays cheap, and a server that preloads the app can build
+    components before forking with ``get()``.
+    """
+
+    __slots__ = ('name', '_factory', '_instance', '_lock')
+
+    def __init__(self, name, factory):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        """The component, built by the factory on first call"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    object.__setattr__(self, '_instance', self._factory())
+                    print(f"Loaded {self.name} in {time.perf_counter() - started:.2f}s")
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.get(), attr, value)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.get(), memo)
+
+    def __repr__(self):
+        state = repr(self._instance) if self.loaded else 'not loaded'
+        return f'<LazyComponent {self.name}: {state}>'
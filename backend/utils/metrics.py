@@ -0,0 +1,118 @@
+import os
+import time
+
+# prometheus_client is optional: without it every metric is a no-op and /metrics reports 503
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+    class _NoopMetric:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def observe(self, value):
+            pass
+
+        def inc(self, amount=1):
+            pass
+
+        def set(self, value):
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric
+
+# Request latencies span cache reads (~ms) to upstream timeouts (10 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    'airalert_request_duration_seconds', 'HTTP request latency by route',
+    ['route', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_LATENCY = Histogram(
+    'airalert_upstream_duration_seconds', 'Upstream call latency by source',
+    ['source'], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_CALLS = Counter(
+    'airalert_upstream_calls_total', 'Upstream calls by source and outcome (success, error, timeout, fallback)',
+    ['source', 'outcome']
+)
+CACHE_REQUESTS = Counter(
+    'airalert_cache_requests_total', 'Cache lookups by cache and result (hit/miss)',
+    ['cache', 'result']
+)
+SNAPSHOT_AGE = Gauge(
+    'airalert_snapshot_age_seconds', 'Age of the shared current-data snapshot per location',
+    ['location'], multiprocess_mode='livemin'
+)
+FORECAST_INFERENCE = Histogram(
+    'airalert_forecast_inference_seconds', 'Time to produce one 24-hour forecast',
+    buckets=LATENCY_BUCKETS
+)
+MODEL_LOAD_SECONDS = Gauge(
+    'airalert_model_load_seconds', 'Duration of the last model load',
+    multiprocess_mode='max'
+)
+MODEL_TRAIN_SECONDS = Histogram(
+    'airalert_model_train_seconds', 'Full model training duration',
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+
+
+def record_upstream(source, started, outcome):
+    """Record one upstream call started at ``started`` (time.perf_counter())"""
+    UPSTREAM_LATENCY.labels(source).observe(time.perf_counter() - started)
+    UPSTREAM_CALLS.labels(source, outcome).inc()
+
+
+def failure_outcome(error):
+    """'timeout' for requests/httpx timeouts, otherwise 'error'"""
+    name = type(error).__name__
+    return 'timeout' if 'Timeout' in name else 'error'
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def install_request_metrics(app):
+    """
+    Time every request by route template (bounded label set).
+    Register before other after_request hooks so their work is included.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.labels(route, request.method, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+
+def render_latest():
+    """
+    Prometheus text exposition; aggregates all gunicorn workers when
+    PROMETHEUS_MULTIPROC_DIR is set, otherwise reports this process
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return None
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
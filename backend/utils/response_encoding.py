@@ -0,0 +1,164 @@
+import gzip
+import numpy as np
+from flask import current_app, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from config import Config
+
+# Optional fast/compact encoders; responses fall back to stdlib JSON and gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Bodies worth compressing (PNG tiles are already deflated)
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/octet-stream', 'text/html', 'text/plain'} | set(MSGPACK_MIMETYPES)
+
+
+def _to_builtin(value):
+    """Convert NumPy scalars/arrays left in payloads to plain Python values"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not serializable')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson (several times faster than the stdlib encoder)
+    Payloads orjson cannot encode are handed to the default provider.
+    """
+
+    def _orjson_options(self):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, default=_to_builtin, option=self._orjson_options()).decode()
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=_to_builtin, option=self._orjson_options())
+        except TypeError:
+            return super().response(obj)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def install_json_provider(app):
+    """Use orjson for jsonify when it is installed"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+
+def columnar(records):
+    """
+    Arrays per field instead of an array of objects
+    Nested dicts are flattened to dotted names, e.g. aqi.category
+    """
+    columns = {}
+    for row, record in enumerate(records):
+        stack = [('', record)]
+        while stack:
+            prefix, value = stack.pop()
+            for key, item in value.items():
+                name = prefix + key
+                if isinstance(item, dict):
+                    stack.append((name + '.', item))
+                    continue
+                column = columns.get(name)
+                if column is None:
+                    # Field first seen after some rows: pad the earlier rows
+                    column = columns[name] = [None] * row
+                column.append(item)
+        for column in columns.values():
+            if len(column) <= row:
+                column.append(None)
+    return {'length': len(records), 'columns': columns}
+
+
+def negotiated_response(payload, records_path=()):
+    """
+    Serialize ``payload`` as the client asked:
+      ?format=columnar              records under ``records_path`` as columns
+      ?format=msgpack or Accept: application/msgpack   MessagePack body
+    Both can be combined (?format=columnar with a MessagePack Accept header).
+    """
+    requested = request.args.get('format', 'json').lower()
+    accept_mimetype = request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    use_msgpack = msgpack is not None and (requested == 'msgpack' or accept_mimetype in MSGPACK_MIMETYPES)
+
+    if requested == 'columnar':
+        # Rebuild only the containers on the path; the shared records stay untouched
+        def replace(container, path):
+            if not path:
+                return columnar(container)
+            if not isinstance(container, dict) or path[0] not in container:
+                return container
+            return {**container, path[0]: replace(container[path[0]], path[1:])}
+        payload = replace(payload, tuple(records_path))
+        payload['encoding'] = 'columnar'
+
+    if use_msgpack:
+        body = msgpack.packb(payload, default=_to_builtin, use_bin_type=True)
+        return current_app.response_class(body, mimetype=MSGPACK_MIMETYPES[0])
+
+    return jsonify(payload)
+
+
+def _best_encoding():
+    """Preferred Content-Encoding the client accepts: br, then gzip"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """
+    after_request hook: gzip/brotli-compress bodies when the client accepts it
+    """
+    response.vary.add('Accept-Encoding')
+
+    if (response.direct_passthrough or response.status_code < 200 or response.status_code == 204
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    encoding = _best_encoding()
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESSION_MIN_BYTES:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,231 @@
+import math
+import os
+import shutil
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from config import Config
+from utils import metrics
+
+TILE_SIZE = 256
+
+# Colour ramp for heatmaps, reusing the AQI category palette (low -> high)
+RAMP_COLORS = np.array([
+    [0x00, 0xe4, 0x00],
+    [0xff, 0xff, 0x00],
+    [0xff, 0x7e, 0x00],
+    [0xff, 0x00, 0x00],
+    [0x8f, 0x3f, 0x97],
+    [0x7e, 0x00, 0x23]
+], dtype=np.float64)
+
+# Value range per layer (molecules/cm^2) mapped onto the colour ramp
+LAYER_RANGES = {
+    'no2': (0.0, 1.5e16),
+    'o3': (6.0e18, 1.2e19),
+    'hcho': (0.0, 2.5e16)
+}
+
+# Binary tiles: little-endian uint16 per pixel, value = offset + q * scale, 65535 = no data
+NO_DATA = 65535
+
+TILE_FORMATS = {
+    'png': 'image/png',
+    'bin': 'application/octet-stream'
+}
+
+
+def tile_bounds(z, x, y):
+    """(min_lat, max_lat, min_lon, max_lon) of a web-mercator tile"""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), lat(y), x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_covering(bbox, z):
+    """All (x, y) tiles at zoom z that intersect the bbox"""
+    n = 2 ** z
+
+    def tile_x(lon):
+        return min(n - 1, int((lon + 180.0) / 360.0 * n))
+
+    def tile_y(lat):
+        lat_rad = math.radians(lat)
+        return min(n - 1, int((1 - math.asinh(math.tan(lat_rad)) / math.pi) / 2 * n))
+
+    xs = range(tile_x(bbox['min_lon']), tile_x(bbox['max_lon']) + 1)
+    ys = range(tile_y(bbox['max_lat']), tile_y(bbox['min_lat']) + 1)
+    return [(x, y) for x in xs for y in ys]
+
+
+def encode_png(rgba):
+    """Minimal RGBA PNG encoder (no imaging dependency)"""
+    height, width, _ = rgba.shape
+    # Filter type 0 (None) byte in front of every scanline
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, -1)], axis=1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+        + chunk(b'IEND', b'')
+    )
+
+
+class TileRenderer:
+    """
+    Render heatmap tiles (z/x/y) from the shared TEMPO grid with an LRU tile cache
+
+    Tiles are keyed by (grid version, layer, z, x, y, format). After each
+    ingest the Goa extent is pre-rendered to disk, so every worker serves map
+    pans from memory or disk without interpolating per request.
+    """
+
+    def __init__(self, grid, tile_dir=None, cache_size=None, zooms=None):
+        self.grid = grid
+        self.tile_dir = tile_dir or Config.TILE_DIR
+        self.zooms = zooms or Config.TILE_PRERENDER_ZOOMS
+        self.cache_size = cache_size or Config.TILE_CACHE_SIZE
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._empty = {}
+
+    def _cache_get(self, key):
+        """LRU read"""
+        with self._lock:
+            tile = self._cache.get(key)
+            if tile is not None:
+                self._cache.move_to_end(key)
+            return tile
+
+    def _cache_put(self, key, tile):
+        """LRU insert with eviction of the least recently used tiles"""
+        with self._lock:
+            self._cache[key] = tile
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _tile_path(self, version, layer, z, x, y, fmt):
+        """On-disk location of a pre-rendered tile"""
+        return os.path.join(self.tile_dir, str(version), layer, str(z), str(x), f'{y}.{fmt}')
+
+    def _empty_tile(self, fmt):
+        """Shared fully transparent / no-data tile"""
+        if fmt not in self._empty:
+            if fmt == 'png':
+                self._empty[fmt] = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+            else:
+                self._empty[fmt] = np.full(TILE_SIZE * TILE_SIZE, NO_DATA, dtype='<u2').tobytes()
+        return self._empty[fmt]
+
+    def _intersects(self, metadata, z, x, y):
+        """Whether a tile overlaps the published grid"""
+        min_lat, max_lat, min_lon, max_lon = tile_bounds(z, x, y)
+        ny, nx = metadata['shape']
+        grid_max_lat = metadata['min_lat'] + (ny - 1) * metadata['resolution']
+        grid_max_lon = metadata['min_lon'] + (nx - 1) * metadata['resolution']
+        return not (max_lat < metadata['min_lat'] or min_lat > grid_max_lat or
+                    max_lon < metadata['min_lon'] or min_lon > grid_max_lon)
+
+    def _sample_tile(self, state, layer, z, x, y):
+        """Grid values at the centre of every tile pixel"""
+        n = 2 ** z
+        pixel = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+        lons = (x + pixel) / n * 360.0 - 180.0
+        lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + pixel) / n))))
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        return self.grid.sample(lat_grid, lon_grid, layer, state=state)
+
+    @staticmethod
+    def _encode(values, layer, fmt):
+        """Encode sampled values as a coloured PNG or a quantized binary value tile"""
+        low, high = LAYER_RANGES[layer]
+        valid = np.isfinite(values)
+
+        if fmt == 'bin':
+            scale = (high - low) / (NO_DATA - 1)
+            quantized = np.clip(np.rint((np.where(valid, values, low) - low) / scale), 0, NO_DATA - 1)
+            quantized[~valid] = NO_DATA
+            return quantized.astype('<u2').tobytes()
+
+        t = np.clip((np.where(valid, values, low) - low) / (high - low), 0, 1)
+        stops = np.linspace(0, 1, len(RAMP_COLORS))
+        rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+        for channel in range(3):
+            rgba[..., channel] = np.interp(t, stops, RAMP_COLORS[:, channel]).astype(np.uint8)
+        rgba[..., 3] = np.where(valid, 180, 0)
+        return encode_png(rgba)
+
+    def get_tile(self, layer, z, x, y, fmt='png'):
+        """
+        Tile bytes and grid version, or (None, None) when no grid is published
+        """
+        state = self.grid.snapshot()
+        grid, metadata = state
+        if grid is None:
+            return None, None
+        version = metadata['version']
+
+        key = (version, layer, z, x, y, fmt)
+        tile = self._cache_get(key)
+        metrics.record_cache('tiles', tile is not None)
+        if tile is not None:
+            return tile, version
+
+        if layer not in metadata['variables'] or not self._intersects(metadata, z, x, y):
+            return self._empty_tile(fmt), version
+
+        path = self._tile_path(version, layer, z, x, y, fmt)
+        try:
+            with open(path, 'rb') as f:
+                tile = f.read()
+        except FileNotFoundError:
+            # Outside the pre-rendered zooms: render once, then serve from cache
+            tile = self._encode(self._sample_tile(state, layer, z, x, y), layer, fmt)
+
+        self._cache_put(key, tile)
+        return tile, version
+
+    def prerender(self):
+        """
+        Render every layer/format over the Goa extent for the current grid version to disk
+        """
+        state = self.grid.snapshot()
+        grid, metadata = state
+        if grid is None:
+            return 0
+
+        version = metadata['version']
+        bbox = Config.GOA_BBOX
+        count = 0
+        for layer in metadata['variables']:
+            if layer not in LAYER_RANGES:
+                continue
+            for z in self.zooms:
+                for x, y in tiles_covering(bbox, z):
+                    values = self._sample_tile(state, layer, z, x, y)
+                    for fmt in TILE_FORMATS:
+                        tile = self._encode(values, layer, fmt)
+                        path = self._tile_path(version, layer, z, x, y, fmt)
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with open(path + '.tmp', 'wb') as f:
+                            f.write(tile)
+                        os.replace(path + '.tmp', path)
+                        self._cache_put((version, layer, z, x, y, fmt), tile)
+                        count += 1
+
+        # Drop tile sets of older grid versions
+        for entry in os.listdir(self.tile_dir):
+            if entry != str(version):
+                shutil.rmtree(os.path.join(self.tile_dir, entry), ignore_errors=True)
+
+        return count
@@ -0,0 +1,319 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from config import Config
+
+# Active span of the current request/task; asyncio tasks and asyncio.to_thread inherit it
+_current_span = contextvars.ContextVar('airalert_current_span', default=None)
+
+
+class Span:
+    """
+    One timed operation, shaped after the OpenTelemetry span model
+    (W3C trace/span ids, parent id, attributes, OK/ERROR status)
+    """
+
+    __slots__ = ('name', 'trace', 'trace_id', 'span_id', 'parent_id', 'is_root', 'start_ns', 'end_ns',
+                 'attributes', 'status', 'error')
+
+    def __init__(self, name, trace, trace_id, parent_id, attributes, is_root=False):
+        self.name = name
+        self.is_root = is_root
+        self.trace = trace
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = 'UNSET'
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, error):
+        self.status = 'ERROR'
+        self.error = f'{type(error).__name__}: {error}'
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None
+
+    def to_otlp(self):
+        """Span in OTLP/JSON encoding"""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': {'UNSET': 0, 'OK': 1, 'ERROR': 2}[self.status]}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        if self.error:
+            span['status']['message'] = self.error
+        return span
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class _Trace:
+    """Spans of one local trace, exported together once its root span ends"""
+
+    __slots__ = ('spans', 'sampled', 'finished')
+
+    def __init__(self, sampled):
+        self.spans = []
+        self.sampled = sampled
+        self.finished = False
+
+
+class Tracer:
+    """
+    In-process span collection with tail sampling
+
+    Spans are buffered per trace until the local root span ends, then the
+    whole trace is kept if it was slow (``slow_ms``), failed, was sampled
+    upstream (W3C ``traceparent`` flag) or wins the ``sample_rate`` draw.
+    Kept traces go to a ring buffer (``recent``) and, if ``log_path`` is set,
+    are appended to it as OTLP/JSON lines that an OpenTelemetry collector's
+    file receiver can ingest. No collector or SDK is needed at runtime.
+    """
+
+    def __init__(self, enabled=None, slow_ms=None, sample_rate=None, buffer_size=None, log_path=None):
+        self.enabled = Config.TRACING_ENABLED if enabled is None else enabled
+        self.slow_ms = Config.TRACE_SLOW_MS if slow_ms is None else slow_ms
+        self.sample_rate = Config.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.log_path = Config.TRACE_LOG_PATH if log_path is None else log_path
+        self._traces = deque(maxlen=buffer_size or Config.TRACE_BUFFER_SIZE)
+        self._log_lock = threading.Lock()
+
+    def start_span(self, name, attributes=None, remote_parent=None):
+        """Start a child of the current span, or a new local root (optionally continuing ``remote_parent``)"""
+        parent = _current_span.get()
+        if parent is not None and not parent.trace.finished:
+            return Span(name, parent.trace, parent.trace_id, parent.span_id, attributes or {})
+        if remote_parent:
+            trace_id, parent_id, sampled = remote_parent
+        else:
+            trace_id, parent_id, sampled = '%032x' % random.getrandbits(128), None, False
+        return Span(name, _Trace(sampled), trace_id, parent_id, attributes or {}, is_root=True)
+
+    def end_span(self, span):
+        span.end_ns = time.time_ns()
+        if span.status == 'UNSET':
+            span.status = 'OK'
+        trace = span.trace
+        if trace.finished:
+            return
+        trace.spans.append(span)
+        if span.is_root:
+            # Spans still open in other threads after this point are dropped
+            trace.finished = True
+            if self._keep(span, trace):
+                self._export(span, trace.spans)
+
+    def _keep(self, root, trace):
+        if trace.sampled or root.duration_ms >= self.slow_ms:
+            return True
+        if any(s.status == 'ERROR' for s in trace.spans):
+            return True
+        return random.random() < self.sample_rate
+
+    def _export(self, root, spans):
+        self._traces.append((root, list(spans)))
+        if not self.log_path:
+            return
+        line = json.dumps(otlp_document(spans))
+        try:
+            with self._log_lock:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.log_path, 'a') as f:
+                    f.write(line + '\n')
+        except OSError as e:
+            print(f"Error writing trace log: {e}")
+
+    def recent(self, limit=20, min_duration_ms=0.0):
+        """Most recent kept traces, newest first"""
+        traces = [(root, spans) for root, spans in reversed(self._traces) if root.duration_ms >= min_duration_ms]
+        return traces[:limit]
+
+
+def otlp_document(spans):
+    """OTLP/JSON ExportTraceServiceRequest for one trace"""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'airalert-backend'}}]},
+            'scopeSpans': [{'scope': {'name': 'airalert'}, 'spans': [span.to_otlp() for span in spans]}]
+        }]
+    }
+
+
+def trace_summary(root, spans):
+    """Readable view of one trace: spans in start order with offsets from the root"""
+    return {
+        'trace_id': root.trace_id,
+        'name': root.name,
+        'duration_ms': round(root.duration_ms, 2),
+        'attributes': root.attributes,
+        'spans': [
+            {
+                'name': span.name,
+                'span_id': span.span_id,
+                'parent_id': span.parent_id,
+                'offset_ms': round((span.start_ns - root.start_ns) / 1e6, 2),
+                'duration_ms': round(span.duration_ms, 2),
+                'status': span.status,
+                'error': span.error,
+                'attributes': span.attributes
+            }
+            for span in sorted(spans, key=lambda s: s.start_ns)
+        ]
+    }
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def span(name, attributes=None, remote_parent=None):
+    """
+    Time a block as a span under the current one (or as a new root):
+
+        with tracing.span('forecast.predict', {'hours': 24}) as s:
+            ...
+            s.set_attribute('model', 'random_forest')
+    """
+    if not tracer.enabled:
+        yield _NOOP_SPAN
+        return
+    current = tracer.start_span(name, attributes, remote_parent)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.end_span(current)
+
+
+def traced(name=None):
+    """Decorator form of span(); the name defaults to the function's qualified name"""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with span(span_name):
+                return await fn(*args, **kwargs)
+
+        return async_wrapper if inspect.iscoroutinefunction(fn) else wrapper
+    return decorator
+
+
+async def traced_await(name, awaitable, attributes=None):
+    """Await ``awaitable`` inside a span; wrap coroutines before handing them to asyncio.gather"""
+    with span(name, attributes):
+        return await awaitable
+
+
+def propagate(fn):
+    """Wrap ``fn`` so calls on executor threads run under the caller's current span"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def parse_traceparent(header):
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None"""
+    parts = (header or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+def install_request_tracing(app):
+    """
+    Span per request (a root continuing any incoming traceparent, or a child of
+    the ASGI span) whose trace id is returned in the traceresponse header
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_span():
+        if not tracer.enabled:
+            return
+        request_span = tracer.start_span(
+            f'{request.method} {request.url_rule.rule if request.url_rule else "unmatched"}',
+            {'http.method': request.method, 'http.target': request.full_path.rstrip('?')},
+            remote_parent=parse_traceparent(request.headers.get('traceparent'))
+        )
+        g._trace_span = request_span
+        g._trace_token = _current_span.set(request_span)
+
+    @app.after_request
+    def _annotate_response(response):
+        request_span = g.get('_trace_span')
+        if request_span is not None:
+            request_span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                request_span.status = 'ERROR'
+            response.headers['traceresponse'] = f'00-{request_span.trace_id}-{request_span.span_id}-01'
+        return response
+
+    @app.teardown_request
+    def _end_request_span(error=None):
+        request_span = g.pop('_trace_span', None)
+        if request_span is None:
+            return
+        if error is not None:
+            request_span.record_exception(error)
+        _current_span.reset(g.pop('_trace_token'))
+        tracer.end_span(request_span)
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, error):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
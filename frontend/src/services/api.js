@@ -155,6 +155,9 @@ export const airQualityAPI = {
   getLocations: () => api.get('/api/locations'),
   getLocationData: (locationName) => 
     api.get(`/api/location/${encodeURIComponent(locationName)}/current`),
+  // Several locations and sections in one request, e.g.
+  // getBulk({ sections: ['current', 'alerts'], fields: { current: ['aqi', 'air_quality.pm25'] } })
+  getBulk: (request = {}) => api.post('/api/bulk', request),
   
   // Data validation
   getDataValidation: () => api.get('/api/data-validation'),